@@ -0,0 +1,136 @@
+"""Low-stock and near-expiry alerts kept in memory and updated incrementally.
+
+AlertIndex follows Supermarket through UpdatedAt (see table_index.py), so a
+checkout costs it only the rows the checkout changed. Thresholds come from
+the AlertThreshold table per Supplier.Category, with DEFAULT_LOW_STOCK_BELOW
+and DEFAULT_EXPIRY_WITHIN_DAYS for categories it does not list.
+
+Per category the index keeps the set of products below the low-stock
+threshold and a list of (ExpiryDate, ProductID) in date order, so reading k
+alerts costs O(k) plus a binary search, however large the table is.
+"""
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from table_index import TableIndex
+
+DEFAULT_LOW_STOCK_BELOW = 10     # units, for categories without a threshold
+DEFAULT_EXPIRY_WITHIN_DAYS = 7
+
+ALERT_THRESHOLDS_SQL = 'SELECT Category, LowStockBelow, ExpiryWithinDays FROM AlertThreshold'
+ALERT_PRODUCTS_SQL = '''
+    SELECT s.ProductID, s.ProductName, s.Quantity, s.ExpiryDate, p.Category, s.UpdatedAt
+    FROM Supermarket s
+    LEFT JOIN Supplier p ON p.ProductID = s.ProductID
+'''
+ALERT_CHANGES_SQL = ALERT_PRODUCTS_SQL + '    WHERE s.UpdatedAt >= %s\n'
+# AlertIndex.low_stock() as one query, for databases no index follows (other stores)
+LOW_STOCK_SQL = '''
+    SELECT s.ProductID, s.ProductName, s.Quantity, p.Category, COALESCE(t.LowStockBelow, %s)
+    FROM Supermarket s
+    LEFT JOIN Supplier p ON p.ProductID = s.ProductID
+    LEFT JOIN AlertThreshold t ON t.Category = p.Category
+    WHERE s.Quantity < COALESCE(t.LowStockBelow, %s)
+    ORDER BY s.Quantity, s.ProductID
+'''
+
+
+class AlertIndex(TableIndex):
+    name = 'stock alerts'
+    table = 'Supermarket'
+    # Writes to these change the thresholds of every product, not just some rows
+    reload_tables = {'Supplier', 'AlertThreshold'}
+    changes_sql = ALERT_CHANGES_SQL
+
+    def __init__(self, connect, **kwargs):
+        super().__init__(connect, **kwargs)
+        self._products = {}     # ProductID -> (ProductName, Quantity, ExpiryDate, Category)
+        self._low = {}          # Category -> ProductIDs below its low-stock threshold
+        self._expiry = {}       # Category -> sorted [(ExpiryDate, ProductID)]
+        self._thresholds = {}   # Category -> (LowStockBelow, ExpiryWithinDays)
+
+    def thresholds(self, category):
+        return self._thresholds.get(category, (DEFAULT_LOW_STOCK_BELOW, DEFAULT_EXPIRY_WITHIN_DAYS))
+
+    def _load(self, cursor):
+        cursor.execute(ALERT_THRESHOLDS_SQL)
+        self._thresholds = {category: (low, days) for category, low, days in cursor.fetchall()}
+        cursor.execute(ALERT_PRODUCTS_SQL)
+        return cursor.fetchall()
+
+    def _reset(self):
+        self._products, self._low, self._expiry = {}, {}, {}
+
+    def _apply(self, row, keep_sorted=False):
+        product_id, name, quantity, expiry, category = row
+        product = (name, quantity, expiry, category)
+        old = self._products.get(product_id)
+        if old == product:
+            return
+        if old is not None:
+            self._remove(product_id, old)
+        self._products[product_id] = product
+
+        if quantity < self.thresholds(category)[0]:
+            self._low.setdefault(category, set()).add(product_id)
+        entries = self._expiry.setdefault(category, [])
+        if keep_sorted:
+            insort(entries, (expiry, product_id))
+        else:
+            entries.append((expiry, product_id))
+
+    def _finish_load(self):
+        for entries in self._expiry.values():
+            entries.sort()
+
+    def _remove(self, product_id, product):
+        _, _, expiry, category = product
+        self._low.get(category, set()).discard(product_id)
+        entries = self._expiry[category]
+        i = bisect_left(entries, (expiry, product_id))
+        if i < len(entries) and entries[i] == (expiry, product_id):
+            del entries[i]
+
+    def low_stock(self):
+        """[(ProductID, ProductName, Quantity, Category, LowStockBelow)], lowest stock first."""
+        with self._lock:
+            self._ensure_fresh()
+            rows = []
+            for category, product_ids in self._low.items():
+                low_stock_below = self.thresholds(category)[0]
+                for product_id in product_ids:
+                    name, quantity, _, _ = self._products[product_id]
+                    rows.append((product_id, name, quantity, category, low_stock_below))
+        rows.sort(key=lambda row: (row[2], row[0]))
+        return rows
+
+    def near_expiry(self, today=None):
+        """[(ProductName, Quantity, ExpiryDate, DaysLeft, Category)], soonest first."""
+        today = today or date.today()
+        with self._lock:
+            self._ensure_fresh()
+            rows = []
+            for category, entries in self._expiry.items():
+                last_day = today + timedelta(days=self.thresholds(category)[1])
+                start = bisect_left(entries, (today,))
+                end = bisect_left(entries, (last_day + timedelta(days=1),))
+                for expiry, product_id in entries[start:end]:
+                    name, quantity, _, _ = self._products[product_id]
+                    rows.append((name, quantity, expiry, (expiry - today).days, category))
+        rows.sort(key=lambda row: (row[2], row[0]))
+        return rows
+
+    def low_stock_below(self, product_id):
+        """Low-stock threshold for a product's category."""
+        with self._lock:
+            self._ensure_fresh()
+            product = self._products.get(product_id)
+            return self.thresholds(product[3] if product else None)[0]
+
+    def stats(self):
+        return {
+            'products': len(self._products),
+            'low_stock': sum(len(ids) for ids in self._low.values()),
+            'categories': len(self._thresholds),
+            **super().stats(),
+        }
@@ -0,0 +1,241 @@
+"""JSON API for POS terminals, on the same data helpers and connection pool as app.py.
+
+    pip install aiohttp
+    python api.py --port 8080
+
+A till records a sale with one small request instead of a Streamlit rerun:
+
+    curl -X POST localhost:8080/purchases -H 'Idempotency-Key: till7-000123' \\
+         -d '{"customer_id": 42, "lines": [[101, 2], [105, 1]], "payment_method": "Cash"}'
+
+    GET  /products                   products in stock
+    GET  /products/{product_id}      one product in stock, or 404
+    GET  /customers?q=ravi           typeahead over names and phone numbers
+    GET  /customers?name=Ravi Kumar  exact name lookup
+    POST /customers                  {"name": ..., "phone_number": ...}
+    POST /purchases                  {"customer_id": ..., "lines": [[product_id, quantity], ...],
+                                      "payment_method": ..., "idempotency_key": ...}
+    GET  /alerts/low-stock
+    GET  /alerts/near-expiry
+    GET  /health
+    GET  /metrics                    Prometheus text, as written by SUP_METRICS_FILE
+
+Reads come from the query cache and the in-memory indexes, which the refresher
+keeps warm; writes run the database.py helpers on worker threads, one
+transaction each; a checkout's Finance rows follow shortly after through the
+write-behind queue in outbox.py. Resend a checkout with the same idempotency key (body field
+or Idempotency-Key header) and it is recorded once; a checkout sent without
+a key is given one, returned in the response.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from aiohttp import web
+
+import async_database
+import database
+from refresher import refresher_stats, start_refresher
+from tracing import tracer
+
+PAYMENT_METHODS = ('Cash', 'Card', 'UPI', 'Bank Transfer')
+MAX_BASKET_LINES = 200
+
+PRODUCT_COLUMNS = ('ProductID', 'ProductName', 'Quantity')
+CUSTOMER_COLUMNS = ('CustomerID', 'Name', 'PhoneNumber')
+LOW_STOCK_COLUMNS = ('ProductID', 'ProductName', 'Quantity', 'Category', 'LowStockBelow')
+NEAR_EXPIRY_COLUMNS = ('ProductName', 'Quantity', 'ExpiryDate', 'DaysLeft', 'Category')
+
+routes = web.RouteTableDef()
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+_dumps = functools.partial(json.dumps, default=_default)
+
+
+def _json(data, status=200):
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+def _error(message, status=400):
+    return _json({'error': message}, status)
+
+
+def _rows(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+async def _blocking(func, *args):
+    """Runs a database.py helper on a worker thread; it takes a pooled connection there."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+@web.middleware
+async def traced(request, handler):
+    # One root span per request, like a page load in app.py
+    resource = request.match_info.route.resource
+    name = f'{request.method} {resource.canonical if resource else request.path}'
+    with tracer.span('request', name, root=True):
+        return await handler(request)
+
+
+@routes.get('/health')
+async def health(request):
+    return _json({'status': 'ok', 'refresher': refresher_stats().get('running', False)})
+
+
+@routes.get('/metrics')
+async def metrics(request):
+    return web.Response(text=tracer.prometheus_text(runtime_stats()), content_type='text/plain')
+
+
+@routes.get('/products')
+async def products(request):
+    return _json(_rows(PRODUCT_COLUMNS, await async_database.get_available_products()))
+
+
+_products_by_id = (None, {})  # (cached product list, ProductID -> row) built from it
+
+
+@routes.get('/products/{product_id:\\d+}')
+async def product(request):
+    global _products_by_id
+    product_id = int(request.match_info['product_id'])
+    rows = await async_database.get_available_products()
+    # Index the cached list once instead of scanning it per request
+    if _products_by_id[0] is not rows:
+        _products_by_id = (rows, {row[0]: row for row in rows})
+    row = _products_by_id[1].get(product_id)
+    if row is None:
+        return _error(f'Product {product_id} is not in stock', 404)
+    return _json(dict(zip(PRODUCT_COLUMNS, row)))
+
+
+@routes.get('/customers')
+async def customers(request):
+    if 'name' in request.query:
+        row = await async_database.check_customer_exists(request.query['name'])
+        return _json(_rows(CUSTOMER_COLUMNS, [row] if row else []))
+    term = request.query.get('q', '').strip()
+    if not term:
+        return _error('Pass q (name or phone prefix) or name')
+    try:
+        limit = min(int(request.query.get('limit', database.SEARCH_LIMIT)), 100)
+    except ValueError:
+        return _error('limit must be a number')
+    return _json(_rows(CUSTOMER_COLUMNS, await _blocking(database.search_customers, term, limit)))
+
+
+@routes.post('/customers')
+async def add_customer(request):
+    body = await _body(request)
+    if body is None:
+        return _error('Expected a JSON object')
+    name = str(body.get('name') or '').strip()
+    phone_number = str(body.get('phone_number') or '').strip()
+    if not name or not phone_number:
+        return _error('name and phone_number are required')
+    customer_id = await _blocking(database.create_customer, name, phone_number)
+    if customer_id is None:
+        return _error('Customer could not be created; the phone number may already be registered', 409)
+    return _json({'CustomerID': customer_id, 'Name': name, 'PhoneNumber': phone_number}, 201)
+
+
+@routes.post('/purchases')
+async def add_purchase(request):
+    body = await _body(request)
+    if body is None:
+        return _error('Expected a JSON object')
+    customer_id = body.get('customer_id')
+    lines = body.get('lines')
+    payment_method = body.get('payment_method', 'Cash')
+    idempotency_key = body.get('idempotency_key') or request.headers.get('Idempotency-Key')
+
+    if not _positive_int(customer_id):
+        return _error('customer_id must be a positive integer')
+    if not isinstance(lines, list) or not 0 < len(lines) <= MAX_BASKET_LINES:
+        return _error(f'lines must be a list of 1 to {MAX_BASKET_LINES} [product_id, quantity] pairs')
+    if not all(isinstance(line, list) and len(line) == 2 and all(map(_positive_int, line)) for line in lines):
+        return _error('every line must be [product_id, quantity] with positive integers')
+    if payment_method not in PAYMENT_METHODS:
+        return _error(f"payment_method must be one of {', '.join(PAYMENT_METHODS)}")
+    if idempotency_key is not None and (not isinstance(idempotency_key, str) or len(idempotency_key) > 64):
+        return _error('idempotency_key must be a string of at most 64 characters')
+    # Without a key of its own the client gets this one back, to resend the checkout with
+    idempotency_key = idempotency_key or uuid.uuid4().hex
+
+    ok = await _blocking(
+        database.create_basket_purchase, customer_id, [tuple(line) for line in lines], payment_method, idempotency_key
+    )
+    if not ok:
+        return _error('Checkout was not recorded: out of stock, unknown product or customer, or a database error', 409)
+    return _json({'recorded': True, 'idempotency_key': idempotency_key}, 201)
+
+
+@routes.get('/alerts/low-stock')
+async def low_stock(request):
+    return _json(_rows(LOW_STOCK_COLUMNS, await async_database.get_low_stock_products()))
+
+
+@routes.get('/alerts/near-expiry')
+async def near_expiry(request):
+    return _json(_rows(NEAR_EXPIRY_COLUMNS, await async_database.get_near_expiry_products()))
+
+
+def runtime_stats():
+    return {
+        'query_cache': database.cache_stats(), 'connection_pool': database.pool_stats(),
+        'refresher': refresher_stats(), 'alerts': database.alert_stats(),
+        'customer_index': database.customer_index_stats(), 'sales_rollup': database.sales_rollup_stats(),
+        'bookkeeping': database.bookkeeping_stats(), 'replica': database.replica_stats(),
+        'stores': database.store_stats(),
+    }
+
+
+def make_app():
+    app = web.Application(middlewares=[traced])
+    app.add_routes(routes)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSON API for POS terminals.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    # The same background warming as app.py, so reads rarely wait for MySQL
+    if os.environ.get('SUP_REFRESHER', '1') != '0':
+        start_refresher()
+    # Book checkouts an earlier run left in the outbox
+    if database.WRITE_BEHIND:
+        database.get_bookkeeper()
+    web.run_app(make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Drive api.py with concurrent tills and report requests/s and latency per endpoint.
+
+    SUP_DB_NAME=sup_bench python api.py --port 8080   # in another shell
+    python api_loadtest.py --requests 20000 --concurrency 64 --checkout-share 0.1
+
+Each simulated till sends a mix of requests: product lookups, customer
+typeahead, alert queries and, if --checkout-share is above zero, checkouts.
+Checkouts write to the database, so point the API at the benchmark database
+(see benchmark.py generate). Each checkout is a basket of one to
+BASKET_LINES products for one of CUSTOMERS customers created for the run.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from benchmark import percentile
+
+SEED = 42
+CUSTOMERS = 20       # created for a run's checkouts
+BASKET_LINES = 5     # most products in one checkout
+SEARCH_TERMS = ('Amit', 'Priya', 'Ravi', 'Divya', '800', '8000012', 'Ha', 'Gopal 1')
+
+
+async def _get_json(session, url):
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+async def setup(session, base_url, checkouts, run_id):
+    """Returns (product IDs, customer IDs for the checkouts)."""
+    products = [p['ProductID'] for p in await _get_json(session, f'{base_url}/products') if p['Quantity'] > 100]
+    if not products:
+        raise SystemExit('No products in stock; run benchmark.py generate first')
+    customers = []
+    for i in range(min(checkouts, CUSTOMERS)):
+        body = {'name': f'Till {run_id} {i}', 'phone_number': f'7{run_id % 10**4:04d}{i:05d}'}
+        async with session.post(f'{base_url}/customers', json=body) as response:
+            if response.status != 201:
+                raise SystemExit(f'Could not create a customer: {await response.text()}')
+            customers.append((await response.json())['CustomerID'])
+    return products, customers
+
+
+def plan(requests, checkouts, products, customers, run_id, rng):
+    """Returns the (endpoint name, method, path, body) of every request, shuffled."""
+    checkouts = [
+        ('POST /purchases', 'POST', '/purchases', {
+            'customer_id': rng.choice(customers),
+            'lines': [[product_id, 1] for product_id in
+                      rng.sample(products, rng.randint(1, min(BASKET_LINES, len(products))))],
+            'payment_method': 'Cash',
+            'idempotency_key': f'api-{run_id}-{i}',
+        })
+        for i in range(checkouts)
+    ]
+    reads = []
+    for _ in range(requests - len(checkouts)):
+        pick = rng.random()
+        if pick < 0.4:
+            reads.append(('GET /products/{id}', 'GET', f'/products/{rng.choice(products)}', None))
+        elif pick < 0.7:
+            reads.append(('GET /customers?q=', 'GET', f'/customers?q={rng.choice(SEARCH_TERMS)}', None))
+        elif pick < 0.8:
+            reads.append(('GET /products', 'GET', '/products', None))
+        elif pick < 0.9:
+            reads.append(('GET /alerts/low-stock', 'GET', '/alerts/low-stock', None))
+        else:
+            reads.append(('GET /alerts/near-expiry', 'GET', '/alerts/near-expiry', None))
+    work = checkouts + reads
+    rng.shuffle(work)
+    return work
+
+
+async def run(base_url, requests=10000, concurrency=64, checkout_share=0.0, seed=SEED):
+    rng = random.Random(seed)
+    run_id = int(time.time())
+    timings = {}   # endpoint -> [seconds]
+    errors = {}    # endpoint -> count
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        checkouts = int(requests * checkout_share)
+        products, customers = await setup(session, base_url, checkouts, run_id)
+        queue = asyncio.Queue()
+        for item in plan(requests, checkouts, products, customers, run_id, rng):
+            queue.put_nowait(item)
+
+        async def till():
+            while not queue.empty():
+                name, method, path, body = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    async with session.request(method, base_url + path, json=body) as response:
+                        await response.read()
+                        ok = response.status < 400
+                except aiohttp.ClientError:
+                    ok = False
+                timings.setdefault(name, []).append(time.perf_counter() - started)
+                if not ok:
+                    errors[name] = errors.get(name, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(till() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {
+        name: {
+            'requests': len(values),
+            'errors': errors.get(name, 0),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+        }
+        for name, values in sorted(timings.items())
+    }
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        'errors': sum(errors.values()),
+        'endpoints': endpoints,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for the POS JSON API (api.py).')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=64, help='simultaneous tills')
+    parser.add_argument('--checkout-share', type=float, default=0.0, help='fraction of requests that are checkouts')
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+    if aiohttp is None:
+        parser.error('the load test needs aiohttp (pip install aiohttp)')
+
+    report = asyncio.run(run(args.url.rstrip('/'), args.requests, args.concurrency, args.checkout_share))
+    print(f"{report['requests']:,} requests from {report['concurrency']} tills in {report['seconds']:.2f}s "
+          f"({report['requests_per_second']:,.0f}/s), {report['errors']:,} errors")
+    for name, result in report['endpoints'].items():
+        print(f"{name:<26} {result['requests']:>8,}  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+              f"p99 {result['p99_ms']:8.2f} ms  {result['errors']:,} errors")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
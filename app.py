@@ -1,790 +1,865 @@
+import os
+import tempfile
+import uuid
+
+import altair as alt
 import streamlit as st
-import pymysql
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+
+import async_database
+from async_database import PAGE_QUERY_TIMEOUT, run_page_queries, submit
+from database import (
+    get_column_names, get_column_types, build_search_filter, rows_to_frame,
+    get_finance_date_bounds, date_range_filter, finance_range_filter, get_net_profit, get_net_profit_by_store,
+    check_customer_exists, create_customer, create_basket_purchase, search_customers,
+    add_supplier, add_warehouse_entry, refresh_schema, set_alert_threshold,
+    alert_stats, bookkeeping_stats, cache_stats, customer_index_stats, pool_stats, replica_stats, sales_rollup_stats,
+    store_stats, get_bookkeeper, STORE_ID, STORES, WRITE_BEHIND,
+)
+from archiver import ArchiveError, read_archive
+from exporter import EXPORT_FORMATS, ExportError, export_table
+from importer import IMPORTABLE_TABLES, BulkImportError, import_file
+from refresher import refresher_stats, snapshot_stats, start_refresher
+from tracing import start_file_exporter, tracer
+
+# Function to collect the flat stats exported next to the span totals
+def runtime_stats():
+    return {
+        'query_cache': cache_stats(), 'connection_pool': pool_stats(), 'refresher': refresher_stats(),
+        'alerts': alert_stats(), 'customer_index': customer_index_stats(), 'sales_rollup': sales_rollup_stats(),
+        'bookkeeping': bookkeeping_stats(), 'replica': replica_stats(), 'stores': store_stats(),
+    }
+
+# Keep the product, customer and supplier lists warm in the background
+if os.environ.get('SUP_REFRESHER', '1') != '0':
+    start_refresher()
+
+# Book checkouts an earlier run left in the outbox
+if WRITE_BEHIND:
+    get_bookkeeper()
+
+# Write Prometheus metrics for the node_exporter textfile collector, if asked to
+if os.environ.get('SUP_METRICS_FILE'):
+    start_file_exporter(os.environ['SUP_METRICS_FILE'], extra_gauges=runtime_stats)
 
 # Initialize session state for search term
 if 'search_term' not in st.session_state:
     st.session_state.search_term = ""
 
-# Database connection
-def connect_to_database():
-    return pymysql.connect(
-        host='localhost',
-        user='root',
-        password='jichu',
-        database='sup'
+# Function to show one page of a table with Previous/Next navigation
+def show_table_page(table_name, columns, search=None, key='table'):
+    page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1, key=f"{key}_page_size")
+
+    # Remember where each visited page starts so Previous works without OFFSET scans
+    pager = st.session_state.setdefault('pager', {})
+    page_state = pager.get((key, table_name))
+    if page_state is None or page_state['page_size'] != page_size or page_state['search'] != search:
+        page_state = pager[(key, table_name)] = {'page_size': page_size, 'search': search, 'starts': [None], 'page': 0}
+
+    page = page_state['page']
+    # The page and its row count are independent, so fetch them concurrently
+    found = run_page_queries(
+        page=async_database.get_table_page(table_name, columns, page_state['starts'][page], page_size, search, prefetch=True),
+        count=async_database.count_rows(table_name, search),
     )
+    rows, next_key = found['page']
+    with tracer.span('render', 'build dataframe'):
+        df = rows_to_frame(table_name, columns, rows)
 
-# Function to get table data
-def get_table_data(table_name):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute(f'SELECT * FROM {table_name}')
-    data = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return data
-
-# Function to get column names
-def get_column_names(table_name):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute(f'DESCRIBE {table_name}')
-    columns = [column[0] for column in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    return columns
-
-# Function to get available products
-def get_available_products():
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute('SELECT ProductID, ProductName, Quantity FROM Supermarket WHERE Quantity > 0')
-    products = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return products
-
-# Function to get available customers
-def get_available_customers():
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute('SELECT CustomerID, Name, PhoneNumber FROM Customer')
-    customers = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return customers
-
-# Function to check if customer name exists
-def check_customer_exists(name):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute('SELECT CustomerID, Name, PhoneNumber FROM Customer WHERE Name = %s', (name,))
-    customer = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return customer
-
-# Function to create a new customer
-def create_customer(name, phone_number):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        # Insert new customer with default cost of 0
-        cursor.execute(
-            'INSERT INTO Customer (Name, PhoneNumber, Cost) VALUES (%s, %s, 0.00)',
-            (name, phone_number)
-        )
-        conn.commit()
-        # Get the new customer ID
-        customer_id = cursor.lastrowid
-        return customer_id
-    except Exception as e:
-        conn.rollback()
-        print(f"Error creating customer: {e}")
-        return None
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to create a new purchase
-def create_purchase(customer_id, product_id, quantity, payment_method):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        # Start transaction
-        cursor.execute("START TRANSACTION")
-        
-        # Insert into Purchase table
-        cursor.execute(
-            'INSERT INTO Purchase (CustomerID, ProductID, Quantity) VALUES (%s, %s, %s)',
-            (customer_id, product_id, quantity)
-        )
-        
-        # Get supplier ID for the product
-        cursor.execute('SELECT SupplierID FROM Supplier WHERE ProductID = %s', (product_id,))
-        supplier_id = cursor.fetchone()[0]
-        
-        # Insert into Finance table
-        cost = quantity * 50.00  # Assuming ₹50/unit as per the trigger
-        cursor.execute(
-            'INSERT INTO Finance (TransactionType, PaymentMethod, Amount, SupplierID, CustomerID) VALUES (%s, %s, %s, %s, %s)',
-            ('Purchase', payment_method, cost, supplier_id, customer_id)
-        )
-        
-        # Commit transaction
-        cursor.execute("COMMIT")
-        return True
-    except Exception as e:
-        cursor.execute("ROLLBACK")
-        print(f"Error in create_purchase: {str(e)}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to calculate net profit
-def calculate_net_profit(df, start_date, end_date):
-    # Convert date objects to datetime
-    start_datetime = pd.to_datetime(start_date)
-    end_datetime = pd.to_datetime(end_date) + pd.Timedelta(days=1)  # Include the entire end date
-    
-    # Filter data by date range
-    mask = (df['TransactionDate'] >= start_datetime) & (df['TransactionDate'] < end_datetime)
-    filtered_df = df.loc[mask]
-    
-    # Calculate total supply amount (negative as it's an expense)
-    supply_amount = -filtered_df[filtered_df['TransactionType'] == 'Supply']['Amount'].sum()
-    
-    # Calculate total purchase amount (positive as it's income)
-    purchase_amount = filtered_df[filtered_df['TransactionType'] == 'Purchase']['Amount'].sum()
-    
-    # Calculate net profit
-    net_profit = supply_amount + purchase_amount
-    
-    return net_profit, filtered_df
-
-# Function to add new supplier
-def add_supplier(supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            'INSERT INTO Supplier (SupplierID, ProductID, SupplierName, Email, Address, ContactNumber, Category, UnitCost, Quantity) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
-            (supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity)
-        )
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error adding supplier: {str(e)}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to generate GST number
-def generate_gst():
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT generate_gst_number()')
-        gst_no = cursor.fetchone()[0]
-        return gst_no
-    except Exception as e:
-        print(f"Error generating GST: {str(e)}")
-        return None
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to add new warehouse entry
-def add_warehouse_entry(product_id, product_name, arrival_date, expiry_date, available_stock, gst_no):
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            'INSERT INTO Warehouse (ProductID, ProductName, ArrivalDate, ExpiryDate, AvailableStock, GSTNo) VALUES (%s, %s, %s, %s, %s, %s)',
-            (product_id, product_name, arrival_date, expiry_date, available_stock, gst_no)
-        )
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error adding warehouse entry: {str(e)}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to get near expiry products (within 7 days)
-def get_near_expiry_products():
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            SELECT ProductName, Quantity, ExpiryDate, 
-                   DATEDIFF(ExpiryDate, CURDATE()) as DaysLeft
-            FROM Supermarket 
-            WHERE DATEDIFF(ExpiryDate, CURDATE()) <= 7 
-            AND DATEDIFF(ExpiryDate, CURDATE()) >= 0
-            ORDER BY DaysLeft ASC
-        ''')
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to get low stock products (less than 10 units)
-def get_low_stock_products():
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            SELECT ProductID, ProductName, Quantity
-            FROM Supermarket 
-            WHERE Quantity < 10
-            ORDER BY Quantity ASC
-        ''')
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
-
-# Function to update IsNeeded and StockFeedback
-def update_stock_status(product_id, current_quantity):
-    conn = connect_to_database()
-    cursor = conn.cursor()
+    with tracer.span('render', 'show dataframe'):
+        if search and df.empty:
+            st.write("No matching records found.")
+        else:
+            st.dataframe(df)
+
+    total_rows, is_exact = found['count']
+    total_pages = max(1, -(-total_rows // page_size))
+    col_prev, col_info, col_next = st.columns([1, 4, 1])
+    with col_prev:
+        if st.button("◀ Previous", disabled=page == 0, key=f"{key}_prev_page"):
+            page_state['page'] -= 1
+            st.rerun()
+    with col_info:
+        approx = "" if is_exact else "~"
+        noun = "matching rows" if search else "rows"
+        st.markdown(f"Page {page + 1} of {approx}{total_pages:,} ({approx}{total_rows:,} {noun})")
+    with col_next:
+        if st.button("Next ▶", disabled=next_key is None, key=f"{key}_next_page"):
+            if len(page_state['starts']) == page + 1:
+                page_state['starts'].append(next_key)
+            page_state['page'] += 1
+            st.rerun()
+    return df
+
+# Function to export the whole table, or the rows the search selects, as a download
+def show_export(table_name, columns, search=None, key='table'):
+    with st.expander("Export"):
+        file_format = st.radio("Format", EXPORT_FORMATS, horizontal=True, key=f"{key}_export_format")
+        if st.button("Export matching rows" if search else "Export table", key=f"{key}_run_export"):
+            progress_text = st.empty()
+            export_file = tempfile.NamedTemporaryFile(suffix=f'.{file_format}', delete=False)
+            export_file.close()
+            try:
+                result = export_table(
+                    table_name, export_file.name, file_format, columns, search,
+                    progress=lambda r: progress_text.write(f"{r['rows']:,} rows ({r['rows_per_second']:,.0f} rows/s)")
+                )
+            except ExportError as e:
+                st.error(str(e))
+            else:
+                st.success(
+                    f"Exported {result['rows']:,} rows in {result['seconds']:.1f}s "
+                    f"({result['rows_per_second']:,.0f} rows/s)"
+                )
+                with open(export_file.name, 'rb') as f:
+                    st.download_button("Download", f, file_name=f"{table_name}.{file_format}", key=f"{key}_download")
+            finally:
+                os.remove(export_file.name)
+
+ARCHIVE_PREVIEW_ROWS = 1000
+
+# Function to show the archived rows of a date range, read from archiver.py's Parquet files
+def show_archived(table_name, start_date, end_date):
     try:
-        # Start transaction
-        cursor.execute("START TRANSACTION")
-        
-        # Update IsNeeded if quantity < 10
-        is_needed = 1 if current_quantity < 10 else 0
-        cursor.execute(
-            'UPDATE Supermarket SET IsNeeded = %s WHERE ProductID = %s',
-            (is_needed, product_id)
-        )
-        
-        # If IsNeeded is 1, update or insert into StockFeedback
-        if is_needed:
-            cursor.execute('''
-                INSERT INTO StockFeedback (ProductID, QuantityNeeded, BadReview)
-                VALUES (%s, 50, 'Low stock - needs reorder')
-                ON DUPLICATE KEY UPDATE 
-                QuantityNeeded = 50,
-                BadReview = 'Low stock - needs reorder'
-            ''', (product_id,))
-        
-        cursor.execute("COMMIT")
-    except Exception as e:
-        cursor.execute("ROLLBACK")
-        print(f"Error updating stock status: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+        archived = read_archive(table_name, start_date, end_date, limit=ARCHIVE_PREVIEW_ROWS)
+    except ArchiveError as e:
+        st.warning(str(e))
+        return
+    if archived.empty:
+        return
+    shown = f'the first {ARCHIVE_PREVIEW_ROWS:,}' if len(archived) == ARCHIVE_PREVIEW_ROWS else f'{len(archived):,}'
+    st.write(f'Archived rows in this range ({shown}); `python archiver.py history` exports them all')
+    st.dataframe(archived, hide_index=True)
+
+# Function to chart the Dashboard's sales figures, read from the sales rollups
+def show_sales_analytics(hourly, products, categories):
+    if not hourly:
+        st.info('No sales in this range.')
+        return
+    sales = pd.DataFrame(hourly, columns=['SaleHour', 'Revenue', 'Lines', 'Baskets', 'Units'])
+    sales['SaleHour'] = pd.to_datetime(sales['SaleHour'])
+    sales['Revenue'] = sales['Revenue'].astype(float)
+    revenue, baskets = sales['Revenue'].sum(), sales['Baskets'].sum()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric('Revenue', f'₹{revenue:,.2f}')
+    col2.metric('Baskets', f'{baskets:,}')
+    col3.metric('Average basket', f'₹{revenue / baskets:,.2f}' if baskets else '-')
+    col4.metric('Items per basket', f"{sales['Units'].sum() / baskets:,.1f}" if baskets else '-')
+
+    st.write('#### Revenue by day')
+    st.line_chart(sales.set_index('SaleHour')['Revenue'].resample('D').sum())
+
+    st.write('#### Revenue by weekday and hour')
+    heatmap = sales.assign(Weekday=sales['SaleHour'].dt.day_name().str[:3], Hour=sales['SaleHour'].dt.hour)
+    heatmap = heatmap.groupby(['Weekday', 'Hour'], as_index=False)['Revenue'].sum()
+    st.altair_chart(alt.Chart(heatmap).mark_rect().encode(
+        x='Hour:O',
+        y=alt.Y('Weekday:O', sort=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']),
+        color=alt.Color('Revenue:Q', scale=alt.Scale(scheme='blues')),
+        tooltip=['Weekday', 'Hour', alt.Tooltip('Revenue:Q', format=',.2f')],
+    ), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write('#### Top products')
+        top = pd.DataFrame(products, columns=['ProductID', 'ProductName', 'Category', 'Revenue', 'Units'])
+        top['Revenue'] = top['Revenue'].astype(float)
+        top['ProductName'] = top['ProductName'].fillna(top['ProductID'].astype(str))
+        st.altair_chart(alt.Chart(top).mark_bar().encode(
+            x='Revenue:Q', y=alt.Y('ProductName:N', sort='-x', title=None), tooltip=['Category', 'Revenue', 'Units'],
+        ), use_container_width=True)
+    with col2:
+        st.write('#### Top categories')
+        top = pd.DataFrame(categories, columns=['Category', 'Revenue', 'Units'])
+        top['Revenue'] = top['Revenue'].astype(float)
+        st.altair_chart(alt.Chart(top).mark_bar().encode(
+            x='Revenue:Q', y=alt.Y('Category:N', sort='-x', title=None), tooltip=['Revenue', 'Units'],
+        ), use_container_width=True)
+
+# Hidden diagnostics page, opened with ?diagnostics=1
+def show_diagnostics():
+    st.write('### Diagnostics')
+    if st.button('Reset statistics'):
+        tracer.reset()
+        st.rerun()
+
+    st.write('#### Slowest statements')
+    st.caption(f'Statements slower than {tracer.slow_query_ms:g} ms, slowest first')
+    slow = tracer.slow_queries()
+    if slow:
+        st.dataframe(pd.DataFrame(slow)[['duration_ms', 'rows', 'bytes', 'parent', 'sql', 'params', 'started_at']], hide_index=True)
+    else:
+        st.info('No slow statements recorded.')
+
+    st.write('#### Totals')
+    totals = pd.DataFrame(
+        [dict(kind=kind, name=name, **values) for (kind, name), values in tracer.totals().items()],
+        columns=['kind', 'name', 'count', 'errors', 'seconds', 'max_seconds', 'rows', 'bytes']
+    )
+    totals['avg_ms'] = totals['seconds'] / totals['count'] * 1000
+    st.dataframe(totals.sort_values('seconds', ascending=False), hide_index=True)
+
+    st.write('#### Recent page loads')
+    pages = tracer.recent('page')
+    if pages:
+        st.dataframe(pd.DataFrame(pages)[['started_at', 'name', 'duration_ms', 'rows', 'bytes']].iloc[::-1], hide_index=True)
+
+    errors = [span for span in tracer.recent() if span['error']]
+    if errors:
+        st.write('#### Recent errors')
+        st.dataframe(pd.DataFrame(errors)[['started_at', 'kind', 'name', 'parent', 'error', 'params']].iloc[::-1], hide_index=True)
+
+    st.write('#### Cache, connection pool and refresher')
+    stats = runtime_stats()
+    st.json(stats)
+    snapshots = snapshot_stats()
+    if snapshots:
+        st.caption('Reference data kept warm by the refresher')
+        st.dataframe(pd.DataFrame.from_dict(snapshots, orient='index'))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button('Prometheus metrics', tracer.prometheus_text(stats), file_name='metrics.prom')
+    with col2:
+        st.download_button('Recent spans (JSON lines)', tracer.json_lines(), file_name='spans.jsonl')
+
+if st.query_params.get('diagnostics') == '1':
+    show_diagnostics()
+    st.stop()
 
 # Streamlit app
 st.title('Supermarket Management System')
 
 # Sidebar for table selection
 st.sidebar.title('Navigation')
+if len(STORES) > 1:
+    st.sidebar.caption(f"Store {STORE_ID}: {STORES[STORE_ID]['name']}")
 table_name = st.sidebar.selectbox(
     'Select Table',
     ['Dashboard'] + ['Supplier', 'Warehouse', 'Supermarket', 'Customer', 'Finance', 'StockFeedback', 'Transactions', 'Purchase']
 )
 
-# Get data for selected table
-if table_name == 'Dashboard':
-    # Add custom CSS for the dashboard
-    st.markdown("""
-        <style>
-        .stApp {
-            background: linear-gradient(135deg, #000051 0%, #1a237e 100%);
-            color: white;
-        }
-        .dashboard-header {
-            text-align: center;
-            padding: 2rem 0;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            margin-bottom: 2rem;
-        }
-        .welcome-section {
-            background: rgba(26, 35, 126, 0.5);
-            padding: 2rem;
-            border-radius: 10px;
-            border-left: 5px solid #4051b5;
-            margin: 1rem 0;
-        }
-        .info-box {
-            background: rgba(255, 255, 255, 0.1);
-            padding: 1.5rem;
-            border-radius: 10px;
-            margin: 1rem 0;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }
-        .highlight-text {
-            color: #90caf9;
-            font-weight: bold;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-    
-    # Dashboard Header
-    st.markdown("""
-        <div class="dashboard-header">
-            <h1>🏪 Supermarket Management System</h1>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    # Welcome Section
-    st.markdown("""
-        <div class="welcome-section">
-            <h2>👋 Welcome to Your Dashboard</h2>
-            <p>Your central hub for managing supermarket operations</p>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    # Quick Access Sections in columns
-    col1, col2 = st.columns(2)
-    
-    with col1:
+# Everything below is timed as one page load, also when st.rerun() or an error ends it early; see show_diagnostics()
+with tracer.span('page', table_name, root=True):
+    # Table metadata is cached; reload it after running a migration
+    if st.sidebar.button('Refresh schema'):
+        refresh_schema()
+
+    # Get data for selected table
+    if table_name == 'Dashboard':
+        # Add custom CSS for the dashboard
         st.markdown("""
-            <div class="info-box">
-                <h3>📦 Inventory Management</h3>
-                <p>Access the <span class="highlight-text">Warehouse</span> and <span class="highlight-text">Supermarket</span> tables to manage your stock</p>
-            </div>
+            <style>
+            .stApp {
+                background: linear-gradient(135deg, #000051 0%, #1a237e 100%);
+                color: white;
+            }
+            .dashboard-header {
+                text-align: center;
+                padding: 2rem 0;
+                background: rgba(255, 255, 255, 0.1);
+                border-radius: 10px;
+                margin-bottom: 2rem;
+            }
+            .welcome-section {
+                background: rgba(26, 35, 126, 0.5);
+                padding: 2rem;
+                border-radius: 10px;
+                border-left: 5px solid #4051b5;
+                margin: 1rem 0;
+            }
+            .info-box {
+                background: rgba(255, 255, 255, 0.1);
+                padding: 1.5rem;
+                border-radius: 10px;
+                margin: 1rem 0;
+                border: 1px solid rgba(255, 255, 255, 0.2);
+            }
+            .highlight-text {
+                color: #90caf9;
+                font-weight: bold;
+            }
+            </style>
         """, unsafe_allow_html=True)
-        
+
+        # Dashboard Header
         st.markdown("""
-            <div class="info-box">
-                <h3>🤝 Customer Relations</h3>
-                <p>View <span class="highlight-text">Customer</span> information and manage <span class="highlight-text">Purchase</span> records</p>
+            <div class="dashboard-header">
+                <h1>🏪 Supermarket Management System</h1>
             </div>
         """, unsafe_allow_html=True)
-    
-    with col2:
+
+        # Welcome Section
         st.markdown("""
-            <div class="info-box">
-                <h3>💰 Financial Overview</h3>
-                <p>Track your finances and transactions in the <span class="highlight-text">Finance</span> section</p>
+            <div class="welcome-section">
+                <h2>👋 Welcome to Your Dashboard</h2>
+                <p>Your central hub for managing supermarket operations</p>
             </div>
         """, unsafe_allow_html=True)
-        
+
+        # Quick Access Sections in columns
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("""
+                <div class="info-box">
+                    <h3>📦 Inventory Management</h3>
+                    <p>Access the <span class="highlight-text">Warehouse</span> and <span class="highlight-text">Supermarket</span> tables to manage your stock</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+            st.markdown("""
+                <div class="info-box">
+                    <h3>🤝 Customer Relations</h3>
+                    <p>View <span class="highlight-text">Customer</span> information and manage <span class="highlight-text">Purchase</span> records</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+        with col2:
+            st.markdown("""
+                <div class="info-box">
+                    <h3>💰 Financial Overview</h3>
+                    <p>Track your finances and transactions in the <span class="highlight-text">Finance</span> section</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+            st.markdown("""
+                <div class="info-box">
+                    <h3>📊 Supply Chain</h3>
+                    <p>Manage <span class="highlight-text">Suppliers</span> and monitor <span class="highlight-text">Stock Feedback</span></p>
+                </div>
+            """, unsafe_allow_html=True)
+
+        # Sales analytics, read from the rollups kept by sales_analytics.py
+        st.markdown("### 📈 Sales Analytics")
+        today = datetime.now().date()
+        col1, col2 = st.columns(2)
+        with col1:
+            sales_start = st.date_input('From', today - timedelta(days=29), key='sales_start')
+        with col2:
+            sales_end = st.date_input('To', today, key='sales_end')
+
+        # The sales figures and the alerts are independent, so fetch them concurrently
+        queries = dict(
+            sales=async_database.get_sales_summary(sales_start, sales_end),
+            low_stock=async_database.get_low_stock_products(),
+            near_expiry=async_database.get_near_expiry_products(),
+        )
+        if len(STORES) > 1:
+            queries['store_low_stock'] = async_database.get_low_stock_by_store()
+        found = run_page_queries(**queries)
+        with tracer.span('render', 'sales charts'):
+            show_sales_analytics(*found['sales'])
+
+        # Stock alerts, read from the in-memory alert index
+        st.markdown("### 🚨 Stock Alerts")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric('Low stock', len(found['low_stock']))
+            if found['low_stock']:
+                st.dataframe(pd.DataFrame(
+                    found['low_stock'], columns=['ProductID', 'ProductName', 'Quantity', 'Category', 'Threshold']
+                ), hide_index=True)
+            else:
+                st.success('No product is below its low-stock threshold.')
+        with col2:
+            st.metric('Near expiry', len(found['near_expiry']))
+            if found['near_expiry']:
+                st.dataframe(pd.DataFrame(
+                    found['near_expiry'], columns=['ProductName', 'Quantity', 'ExpiryDate', 'DaysLeft', 'Category']
+                ), hide_index=True)
+            else:
+                st.success('No product expires within its alert window.')
+
+        if 'store_low_stock' in found:
+            store_rows, store_errors = found['store_low_stock']
+            with st.expander(f'Low stock in all {len(STORES)} stores'):
+                st.dataframe(pd.DataFrame(
+                    [(STORES[store_id]['name'], *row) for store_id, rows in store_rows.items() for row in rows],
+                    columns=['Store', 'ProductID', 'ProductName', 'Quantity', 'Category', 'Threshold']
+                ), hide_index=True)
+                for store_id, error in store_errors.items():
+                    st.warning(f"{STORES[store_id]['name']} did not answer: {error}")
+
+        with st.expander('Alert thresholds'):
+            with st.form('alert_threshold'):
+                category = st.text_input('Category')
+                low_stock_below = st.number_input('Low stock below (units)', min_value=0, value=10)
+                expiry_within_days = st.number_input('Near expiry within (days)', min_value=0, value=7)
+                if st.form_submit_button('Save threshold'):
+                    if not category.strip():
+                        st.error('Please enter a category.')
+                    elif set_alert_threshold(category.strip(), low_stock_below, expiry_within_days):
+                        st.success(f'Thresholds for {category.strip()} saved.')
+                        st.rerun()
+                    else:
+                        st.error('Failed to save thresholds.')
+
+        # Footer section
         st.markdown("""
-            <div class="info-box">
-                <h3>📊 Supply Chain</h3>
-                <p>Manage <span class="highlight-text">Suppliers</span> and monitor <span class="highlight-text">Stock Feedback</span></p>
+            <div class="info-box" style="text-align: center; margin-top: 2rem;">
+                <p>Use the navigation menu on the left to access different sections of the system</p>
             </div>
         """, unsafe_allow_html=True)
-    
-    # Footer section
-    st.markdown("""
-        <div class="info-box" style="text-align: center; margin-top: 2rem;">
-            <p>Use the navigation menu on the left to access different sections of the system</p>
-        </div>
-    """, unsafe_allow_html=True)
-
-else:
-    # Get data for selected table
-    data = get_table_data(table_name)
-    columns = get_column_names(table_name)
-    
-    # Remove Cost column from display if this is the Customer table
-    if table_name == 'Customer':
-        cost_index = columns.index('Cost')
-        columns = columns[:cost_index] + columns[cost_index + 1:]
-        data = [row[:cost_index] + row[cost_index + 1:] for row in data]
-    
-    df = pd.DataFrame(data, columns=columns)
 
-    # Display table name
-    st.write(f'### {table_name} Table')
+    else:
+        # Start the Warehouse form's supplier list while the table page loads
+        suppliers_future = submit(async_database.get_suppliers()) if table_name == 'Warehouse' else None
+
+        columns = get_column_names(table_name)
 
-    # Create two columns for the search interface
-    col1, col2 = st.columns([1, 3])
+        # Remove Cost column from display if this is the Customer table
+        if table_name == 'Customer':
+            columns = [c for c in columns if c != 'Cost']
 
-    # Add dropdown for search field selection
-    with col1:
-        search_field = st.selectbox(
-            "Search by:",
-            columns
-        )
+        # Display table name
+        st.write(f'### {table_name} Table')
 
-    # Add search input with clear button
-    with col2:
-        # Create a container for the search input and clear button
-        search_container = st.container()
-        with search_container:
-            col_search, col_clear = st.columns([6, 1])
-            with col_search:
-                search_term = st.text_input("Enter search term:", value=st.session_state.search_term, key="search_input")
-            with col_clear:
-                if search_term:
-                    if st.button("✕", key="clear_button"):
-                        st.session_state.search_term = ""
-                        st.rerun()
+        # Create two columns for the search interface
+        col1, col2 = st.columns([1, 3])
 
-    # Filter DataFrame based on search term and selected field
-    if search_term:
-        # Convert search term to lowercase for case-insensitive search
-        search_term = search_term.lower()
-        
-        # Filter DataFrame based on selected field and search term
-        if df[search_field].dtype == 'object':  # For string columns
-            filtered_df = df[df[search_field].astype(str).str.lower().str.contains(search_term)]
-        else:  # For numeric columns
-            filtered_df = df[df[search_field].astype(str).str.contains(search_term)]
-        
-        # Display filtered data
-        if not filtered_df.empty:
-            st.dataframe(filtered_df)
-        else:
-            st.write("No matching records found.")
-    else:
-        # Display all data if no search term
-        st.dataframe(df)
-
-# Set background color based on table
-if table_name == 'Supplier':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #1a237e;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #283593;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Warehouse':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #1b5e20;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #2e7d32;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Supermarket':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #b71c1c;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #c62828;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Customer':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #4a148c;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #6a1b9a;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Finance':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #e65100;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #ef6c00;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'StockFeedback':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #880e4f;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #ad1457;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Transactions':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #006064;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #00838f;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-elif table_name == 'Purchase':
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #263238;
-            color: white;
-        }
-        .stDataFrame {
-            background-color: #37474f;
-            color: white;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
-# Special handling for Purchase table
-if table_name == 'Purchase':
-    st.write('### Create New Purchase')
-    
-    # Get available products and customers
-    products = get_available_products()
-    customers = get_available_customers()
-    
-    # Create tabs for customer selection
-    customer_tab = st.tabs(["Existing Customer", "New Customer"])
-    
-    with customer_tab[0]:  # Existing Customer tab
-        # Customer selection
-        customer_options = {f"{c[0]} - {c[1]} ({c[2]})": (c[0], c[1]) for c in customers}
-        selected_customer = st.selectbox("Select Customer", list(customer_options.keys()))
-        customer_id, customer_name = customer_options[selected_customer]
-        
-        with st.form("existing_customer_purchase"):
-            st.write(f"Selected Customer: {customer_name}")
-            
-            # Product selection
-            st.write("#### Product Information")
-            product_options = {f"{p[0]} - {p[1]}": (p[0], p[2]) for p in products}
-            
-            # Create columns for product selection and quantity info
+        # Add dropdown for search field selection
+        with col1:
+            search_field = st.selectbox(
+                "Search by:",
+                columns
+            )
+
+        # Add search input with clear button
+        with col2:
+            # Create a container for the search input and clear button
+            search_container = st.container()
+            with search_container:
+                col_search, col_clear = st.columns([6, 1])
+                with col_search:
+                    search_term = st.text_input("Enter search term:", value=st.session_state.search_term, key="search_input")
+                with col_clear:
+                    if search_term:
+                        if st.button("✕", key="clear_button"):
+                            st.session_state.search_term = ""
+                            st.rerun()
+
+        match_anywhere = st.checkbox("Match anywhere in text (slower, cannot use indexes)", key="match_anywhere")
+
+        # Translate the search into a WHERE clause so MySQL does the filtering
+        search = None
+        if search_term:
+            column_types = get_column_types(table_name)
+            search = build_search_filter(table_name, search_field, search_term, column_types[search_field], match_anywhere)
+
+        # Display one page at a time
+        df = show_table_page(table_name, columns, search)
+        show_export(table_name, columns, search)
+
+        # Bulk import for catalogue tables
+        if table_name in IMPORTABLE_TABLES:
+            with st.expander("Bulk import"):
+                uploaded = st.file_uploader("CSV or Parquet file", type=['csv', 'parquet'], key=f"import_{table_name}")
+                if uploaded and st.button("Import", key="run_import"):
+                    progress_text = st.empty()
+                    rejects_file = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+                    rejects_file.close()
+                    try:
+                        result = import_file(
+                            table_name, uploaded, rejects_path=rejects_file.name,
+                            progress=lambda r: progress_text.write(
+                                f"{r['rows_read']:,} read, {r['rows_loaded']:,} loaded, {r['rows_rejected']:,} rejected"
+                            )
+                        )
+                    except BulkImportError as e:
+                        st.error(str(e))
+                    else:
+                        st.success(
+                            f"Loaded {result['rows_loaded']:,} of {result['rows_read']:,} rows "
+                            f"in {result['seconds']:.1f}s ({result['rows_per_second']:,.0f} rows/s)"
+                        )
+                        if result['rows_rejected']:
+                            st.warning(f"{result['rows_rejected']:,} rows were rejected.")
+                            with open(rejects_file.name, 'rb') as f:
+                                st.download_button("Download rejected rows", f.read(), file_name=f"{table_name}_rejected.csv")
+                    finally:
+                        os.remove(rejects_file.name)
+
+    # Set background color based on table
+    if table_name == 'Supplier':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #1a237e;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #283593;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Warehouse':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #1b5e20;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #2e7d32;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Supermarket':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #b71c1c;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #c62828;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Customer':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #4a148c;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #6a1b9a;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Finance':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #e65100;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #ef6c00;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'StockFeedback':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #880e4f;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #ad1457;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Transactions':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #006064;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #00838f;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+    elif table_name == 'Purchase':
+        st.markdown("""
+            <style>
+            .stApp {
+                background-color: #263238;
+                color: white;
+            }
+            .stDataFrame {
+                background-color: #37474f;
+                color: white;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+
+    # Special handling for Purchase table
+    if table_name == 'Purchase':
+        st.write('### Create New Purchase')
+
+        # Get available products; customers are looked up as they are typed
+        products = run_page_queries(products=async_database.get_available_products())['products']
+
+        product_options = {f"{p[0]} - {p[1]}": (p[0], p[2]) for p in products}
+        product_names = {p[0]: p[1] for p in products}
+        available = {p[0]: p[2] for p in products}
+
+        # Basket shared by both customer tabs, product_id -> quantity
+        cart = st.session_state.setdefault('cart', {})
+        # One idempotency key per basket, so a double-submitted form checks out once
+        checkout_key = st.session_state.setdefault('checkout_key', uuid.uuid4().hex)
+
+        def finish_checkout():
+            cart.clear()
+            del st.session_state['checkout_key']
+
+        st.write("#### Basket")
+        with st.form("add_to_basket", clear_on_submit=True):
             col1, col2 = st.columns([3, 1])
             with col1:
-                selected_product = st.selectbox("Select Product", list(product_options.keys()), key="existing_product")
-            
-            # Get selected product info
-            product_id, available_quantity = product_options[selected_product]
-            
-            # Show available quantity in second column
+                selected_product = st.selectbox("Select Product", list(product_options.keys()), key="basket_product")
             with col2:
-                st.markdown("&nbsp;")  # Add some spacing
-                st.markdown(f"**Available: {available_quantity}**")
-            
-            # Quantity and payment in columns
+                quantity = st.number_input("Enter quantity", min_value=1, value=1, key="basket_qty")
+
+            if st.form_submit_button("Add to basket"):
+                product_id, available_quantity = product_options[selected_product]
+                if cart.get(product_id, 0) + quantity > available_quantity:
+                    st.error(f"Only {available_quantity} available for {product_names[product_id]}.")
+                else:
+                    cart[product_id] = cart.get(product_id, 0) + quantity
+
+        # Drop lines for products that have since sold out
+        for product_id in [p for p in cart if p not in available]:
+            del cart[product_id]
+
+        if cart:
+            basket_df = pd.DataFrame(
+                [(product_id, product_names[product_id], qty, available[product_id]) for product_id, qty in cart.items()],
+                columns=['ProductID', 'ProductName', 'Quantity', 'Available']
+            )
+            st.dataframe(basket_df, hide_index=True)
+            if st.button("Clear basket"):
+                finish_checkout()
+                st.rerun()
+        else:
+            st.info("Add products to the basket to create a purchase.")
+
+        def basket_summary():
+            return "\n".join(f"- {product_names[product_id]} x {qty}" for product_id, qty in cart.items())
+
+        # Create tabs for customer selection
+        customer_tab = st.tabs(["Existing Customer", "New Customer"])
+
+        with customer_tab[0]:  # Existing Customer tab
+            # Customer selection from the top matches for the typed name or phone number
+            customer_search = st.text_input("Search customer", placeholder="Name or phone number")
+            matches = search_customers(customer_search) if customer_search.strip() else []
+            customer_options = {f"{c[0]} - {c[1]} ({c[2]})": (c[0], c[1]) for c in matches}
+            if customer_options:
+                selected_customer = st.selectbox("Select Customer", list(customer_options.keys()))
+                customer_id, customer_name = customer_options[selected_customer]
+            else:
+                if customer_search.strip():
+                    st.info("No customer name or phone number starts with that.")
+                customer_id, customer_name = None, None
+
+            with st.form("existing_customer_purchase"):
+                st.write(f"Selected Customer: {customer_name or '-'}")
+                payment_method = st.selectbox("Payment Method", ["Cash", "Card", "UPI", "Bank Transfer"])
+
+                # Submit button
+                submitted = st.form_submit_button("Create Purchase", disabled=not cart or customer_id is None)
+
+                if submitted:
+                    if create_basket_purchase(customer_id, list(cart.items()), payment_method, checkout_key):
+                        st.success(f"""
+                        Purchase completed successfully!
+                        - Customer: {customer_name}
+                        - Payment: {payment_method}
+                        {basket_summary()}
+                        """)
+                        finish_checkout()
+                        st.rerun()
+                    else:
+                        st.error("Failed to create purchase. Please check available stock and try again.")
+
+        with customer_tab[1]:  # New Customer tab
+            with st.form("new_customer_purchase"):
+                st.write("#### Customer Information")
+                col1, col2 = st.columns(2)
+                with col1:
+                    new_customer_name = st.text_input("Customer Name")
+                with col2:
+                    new_customer_phone = st.text_input("Phone Number")
+                payment_method = st.selectbox("Payment Method", ["Cash", "Card", "UPI", "Bank Transfer"])
+
+                # Submit button
+                submitted = st.form_submit_button("Create Purchase", disabled=not cart)
+
+                if submitted:
+                    if not new_customer_name or not new_customer_phone:
+                        st.error("Please enter customer name and phone number.")
+                    else:
+                        # Check if customer exists
+                        existing_customer = check_customer_exists(new_customer_name)
+                        if existing_customer:
+                            st.warning(f"Customer '{new_customer_name}' already exists with ID {existing_customer[0]}")
+                            st.info("Please switch to the 'Existing Customer' tab to select them.")
+                        else:
+                            # Create new customer
+                            new_customer_id = create_customer(new_customer_name, new_customer_phone)
+                            if new_customer_id:
+                                # Create purchase
+                                if create_basket_purchase(new_customer_id, list(cart.items()), payment_method, checkout_key):
+                                    st.success(f"""
+                                    Purchase completed successfully!
+                                    - New Customer: {new_customer_name}
+                                    - Payment: {payment_method}
+                                    {basket_summary()}
+                                    """)
+                                    finish_checkout()
+                                    st.rerun()
+                                else:
+                                    st.error("Failed to create purchase. Please check available stock and try again.")
+                            else:
+                                st.error("Failed to create customer. Please try again.")
+
+    # Special handling for Finance table
+    elif table_name == 'Finance':
+        # Date range selector
+        first_date, last_date = get_finance_date_bounds()
+        today = datetime.now().date()
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input('Start Date', first_date or today)
+        with col2:
+            end_date = st.date_input('End Date', last_date or today)
+
+        # Net profit comes from the daily rollup, not the Finance rows
+        net_profit, breakdown = get_net_profit(start_date, end_date)
+
+        # Display net profit
+        st.write('### Net Profit Analysis')
+        st.write(f'Net Profit: ₹{net_profit:,.2f}')
+        if breakdown:
+            st.dataframe(
+                pd.DataFrame(breakdown, columns=['TransactionType', 'PaymentMethod', 'Amount', 'Transactions']),
+                hide_index=True
+            )
+
+        # Every store's net profit, queried in parallel
+        if len(STORES) > 1:
+            st.write('### All Stores')
+            profits, store_errors = get_net_profit_by_store(start_date, end_date)
+            st.dataframe(pd.DataFrame(
+                [(store_id, STORES[store_id]['name'], profit) for store_id, (profit, _) in profits.items()],
+                columns=['StoreID', 'Store', 'NetProfit']
+            ), hide_index=True)
+            st.write(f'Net Profit, all stores: ₹{sum(profit for profit, _ in profits.values()):,.2f}')
+            for store_id, error in store_errors.items():
+                st.warning(f"{STORES[store_id]['name']} did not answer: {error}")
+
+        # Display the transactions in the range, only when asked for
+        st.write('### Financial Transactions')
+        if st.checkbox('Show transactions in this range', key='show_finance_transactions'):
+            show_table_page('Finance', get_column_names('Finance'), finance_range_filter(start_date, end_date), key='finance_range')
+            show_export('Finance', get_column_names('Finance'), finance_range_filter(start_date, end_date), key='finance_range')
+            show_archived('Finance', start_date, end_date)
+
+    # Special handling for different tables
+    if table_name == 'Customer':
+        st.write("### Add New Customer")
+        with st.form("add_customer_form"):
             col1, col2 = st.columns(2)
             with col1:
-                quantity = st.number_input("Enter quantity", min_value=1, max_value=available_quantity, value=min(1, available_quantity), key="existing_qty")
-            
+                name = st.text_input("Customer Name")
             with col2:
-                payment_method = st.selectbox("Payment Method", ["Cash", "Card", "UPI", "Bank Transfer"])
-            
-            # Submit button
-            submitted = st.form_submit_button("Create Purchase")
-            
+                phone = st.text_input("Phone Number")
+
+            submitted = st.form_submit_button("Add Customer")
             if submitted:
-                if create_purchase(customer_id, product_id, quantity, payment_method):
-                    st.success(f"""
-                    Purchase completed successfully!
-                    - Customer: {customer_name}
-                    - Product: {selected_product.split(' - ')[1]}
-                    - Quantity: {quantity}
-                    - Payment: {payment_method}
-                    """)
-                    st.rerun()
+                if not name or not phone:
+                    st.error("Please fill in all required fields.")
                 else:
-                    st.error("Failed to create purchase. Please check available stock and try again.")
-    
-    with customer_tab[1]:  # New Customer tab
-        with st.form("new_customer_purchase"):
-            st.write("#### Customer Information")
-            col1, col2 = st.columns(2)
-            with col1:
-                new_customer_name = st.text_input("Customer Name")
-            with col2:
-                new_customer_phone = st.text_input("Phone Number")
-            
-            # Product selection
-            st.write("#### Product Information")
-            product_options = {f"{p[0]} - {p[1]}": (p[0], p[2]) for p in products}
-            
-            # Create columns for product selection and quantity info
-            col1, col2 = st.columns([3, 1])
+                    if create_customer(name, phone):
+                        st.success(f"Customer {name} added successfully!")
+                        st.rerun()
+                    else:
+                        st.error("Failed to add customer. Phone number might already exist.")
+
+    elif table_name == 'Supplier':
+        st.write("### Add New Supplier")
+        with st.form("add_supplier_form"):
+            col1, col2, col3 = st.columns(3)
             with col1:
-                selected_product = st.selectbox("Select Product", list(product_options.keys()), key="new_product")
-            
-            # Get selected product info
-            product_id, available_quantity = product_options[selected_product]
-            
-            # Show available quantity in second column
+                supplier_id = st.number_input("Supplier ID", min_value=1)
+                product_id = st.number_input("Product ID", min_value=1)
+                name = st.text_input("Supplier Name")
             with col2:
-                st.markdown("&nbsp;")  # Add some spacing
-                st.markdown(f"**Available: {available_quantity}**")
-            
-            # Quantity and payment in columns
+                email = st.text_input("Email")
+                contact = st.text_input("Contact Number")
+                category = st.selectbox("Category", ["Vegetables", "Spices", "Dairy", "Grains", "Fruits", 
+                                                   "Seafood", "Leafy Greens", "Poultry", "Confectionery", 
+                                                   "Organic Veggies", "Sweets", "Baked Goods"])
+            with col3:
+                address = st.text_input("Address")
+                unit_cost = st.number_input("Unit Cost", min_value=0.0)
+                quantity = st.number_input("Quantity", min_value=0)
+
+            submitted = st.form_submit_button("Add Supplier")
+            if submitted:
+                if not all([name, email, address, contact, category]):
+                    st.error("Please fill in all required fields.")
+                else:
+                    if add_supplier(supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity):
+                        st.success(f"Supplier {name} added successfully!")
+                        st.rerun()
+                    else:
+                        st.error("Failed to add supplier. ID/Email/Contact might already exist.")
+
+    elif table_name == 'Warehouse':
+        st.write("### Add New Warehouse Entry")
+
+        # Get available suppliers for dropdown
+        suppliers = suppliers_future.result(PAGE_QUERY_TIMEOUT)
+
+        with st.form("add_warehouse_form"):
             col1, col2 = st.columns(2)
             with col1:
-                quantity = st.number_input("Enter quantity", min_value=1, max_value=available_quantity, value=min(1, available_quantity), key="new_qty")
-            
+                supplier_option = st.selectbox(
+                    "Select Supplier", 
+                    [f"{s[0]} - {s[1]} (Product ID: {s[2]})" for s in suppliers]
+                )
+                product_id = int(supplier_option.split(" - ")[0])
+                product_name = st.text_input("Product Name")
+                gst_no = st.text_input("GST Number")
+
             with col2:
-                payment_method = st.selectbox("Payment Method", ["Cash", "Card", "UPI", "Bank Transfer"])
-            
-            # Submit button
-            submitted = st.form_submit_button("Create Purchase")
-            
+                arrival_date = st.date_input("Arrival Date")
+                expiry_date = st.date_input("Expiry Date")
+                available_stock = st.number_input("Available Stock", min_value=0)
+
+            submitted = st.form_submit_button("Add to Warehouse")
             if submitted:
-                if not new_customer_name or not new_customer_phone:
-                    st.error("Please enter customer name and phone number.")
+                if not all([product_name, gst_no]):
+                    st.error("Please fill in all required fields.")
                 else:
-                    # Check if customer exists
-                    existing_customer = check_customer_exists(new_customer_name)
-                    if existing_customer:
-                        st.warning(f"Customer '{new_customer_name}' already exists with ID {existing_customer[0]}")
-                        st.info("Please switch to the 'Existing Customer' tab to select them.")
+                    if add_warehouse_entry(product_id, product_name, arrival_date, expiry_date, available_stock, gst_no):
+                        st.success(f"Warehouse entry added successfully!")
+                        st.rerun()
                     else:
-                        # Create new customer
-                        new_customer_id = create_customer(new_customer_name, new_customer_phone)
-                        if new_customer_id:
-                            # Create purchase
-                            if create_purchase(new_customer_id, product_id, quantity, payment_method):
-                                st.success(f"""
-                                Purchase completed successfully!
-                                - New Customer: {new_customer_name}
-                                - Product: {selected_product.split(' - ')[1]}
-                                - Quantity: {quantity}
-                                - Payment: {payment_method}
-                                """)
-                                st.rerun()
-                            else:
-                                st.error("Failed to create purchase. Please check available stock and try again.")
-                        else:
-                            st.error("Failed to create customer. Please try again.")
-
-# Special handling for Finance table
-elif table_name == 'Finance':
-    # Convert TransactionDate to datetime
-    df['TransactionDate'] = pd.to_datetime(df['TransactionDate'])
-    
-    # Date range selector
-    col1, col2 = st.columns(2)
-    with col1:
-        start_date = st.date_input('Start Date', df['TransactionDate'].min().date())
-    with col2:
-        end_date = st.date_input('End Date', df['TransactionDate'].max().date())
-    
-    # Calculate and display net profit
-    net_profit, filtered_df = calculate_net_profit(df, start_date, end_date)
-    
-    # Display net profit
-    st.write('### Net Profit Analysis')
-    st.write(f'Net Profit: ₹{net_profit:,.2f}')
-    
-    # Display the filtered data
-    st.write('### Financial Transactions')
-    st.dataframe(filtered_df)
-
-# Special handling for different tables
-if table_name == 'Customer':
-    st.write("### Add New Customer")
-    with st.form("add_customer_form"):
-        col1, col2 = st.columns(2)
-        with col1:
-            name = st.text_input("Customer Name")
-        with col2:
-            phone = st.text_input("Phone Number")
-        
-        submitted = st.form_submit_button("Add Customer")
-        if submitted:
-            if not name or not phone:
-                st.error("Please fill in all required fields.")
-            else:
-                if create_customer(name, phone):
-                    st.success(f"Customer {name} added successfully!")
-                    st.rerun()
-                else:
-                    st.error("Failed to add customer. Phone number might already exist.")
+                        st.error("Failed to add warehouse entry.")
 
-elif table_name == 'Supplier':
-    st.write("### Add New Supplier")
-    with st.form("add_supplier_form"):
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            supplier_id = st.number_input("Supplier ID", min_value=1)
-            product_id = st.number_input("Product ID", min_value=1)
-            name = st.text_input("Supplier Name")
-        with col2:
-            email = st.text_input("Email")
-            contact = st.text_input("Contact Number")
-            category = st.selectbox("Category", ["Vegetables", "Spices", "Dairy", "Grains", "Fruits", 
-                                               "Seafood", "Leafy Greens", "Poultry", "Confectionery", 
-                                               "Organic Veggies", "Sweets", "Baked Goods"])
-        with col3:
-            address = st.text_input("Address")
-            unit_cost = st.number_input("Unit Cost", min_value=0.0)
-            quantity = st.number_input("Quantity", min_value=0)
-        
-        submitted = st.form_submit_button("Add Supplier")
-        if submitted:
-            if not all([name, email, address, contact, category]):
-                st.error("Please fill in all required fields.")
-            else:
-                if add_supplier(supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity):
-                    st.success(f"Supplier {name} added successfully!")
-                    st.rerun()
-                else:
-                    st.error("Failed to add supplier. ID/Email/Contact might already exist.")
-
-elif table_name == 'Warehouse':
-    st.write("### Add New Warehouse Entry")
-    
-    # Get available suppliers for dropdown
-    conn = connect_to_database()
-    cursor = conn.cursor()
-    cursor.execute('SELECT ProductID, SupplierName, ProductID FROM Supplier')
-    suppliers = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    with st.form("add_warehouse_form"):
+    # Special handling for Transactions table
+    elif table_name == 'Transactions':
+        # Date range selector; the months archiver.py moved out are read from the archive
+        st.write('### Transaction History')
+        today = datetime.now().date()
         col1, col2 = st.columns(2)
         with col1:
-            supplier_option = st.selectbox(
-                "Select Supplier", 
-                [f"{s[0]} - {s[1]} (Product ID: {s[2]})" for s in suppliers]
-            )
-            product_id = int(supplier_option.split(" - ")[0])
-            product_name = st.text_input("Product Name")
-            gst_no = st.text_input("GST Number")
-        
+            start_date = st.date_input('Start Date', today - timedelta(days=30), key='transactions_start')
         with col2:
-            arrival_date = st.date_input("Arrival Date")
-            expiry_date = st.date_input("Expiry Date")
-            available_stock = st.number_input("Available Stock", min_value=0)
-        
-        submitted = st.form_submit_button("Add to Warehouse")
-        if submitted:
-            if not all([product_name, gst_no]):
-                st.error("Please fill in all required fields.")
-            else:
-                if add_warehouse_entry(product_id, product_name, arrival_date, expiry_date, available_stock, gst_no):
-                    st.success(f"Warehouse entry added successfully!")
-                    st.rerun()
-                else:
-                    st.error("Failed to add warehouse entry.")
-
-# Special handling for Transactions table
-elif table_name == 'Transactions':
-    # Convert TransactionDate to datetime for better display
-    df['TransactionDate'] = pd.to_datetime(df['TransactionDate']).dt.strftime('%Y-%m-%d')
-    
-    # Display the transactions with a better format
-    st.write('### Transaction History')
-    
-    if not df.empty:
-        # Create a more readable display format
-        df = df.rename(columns={
-            'TransactionID': 'ID',
-            'SupplierID': 'Supplier ID',
-            'SupplierName': 'Supplier Name',
-            'TransactionDate': 'Date'
-        })
-        st.dataframe(df)
-    else:
-        st.info("No transactions found. Transactions will be recorded when new stock is added to the warehouse.") 
\ No newline at end of file
+            end_date = st.date_input('End Date', today, key='transactions_end')
+
+        date_range = date_range_filter('TransactionDate', start_date, end_date)
+        if df.empty:
+            st.info("No transactions found. Transactions will be recorded when new stock is added to the warehouse.")
+        else:
+            show_table_page('Transactions', columns, date_range, key='transactions_range')
+            show_export('Transactions', columns, date_range, key='transactions_range')
+        show_archived('Transactions', start_date, end_date)
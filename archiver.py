@@ -0,0 +1,292 @@
+"""Monthly partitions of Finance, Purchase and Transactions, and the archive of old months.
+
+The three tables are range-partitioned by month on their date column
+(migrations/012_partitioning.sql). A query with a date range, such as the
+Finance page's transactions or a sales rollup refresh, reads only the
+partitions of the months it covers, and a whole month leaves a table by
+dropping its partition instead of deleting its rows one by one.
+
+    python archiver.py partition                   # split pfuture into months, up to PARTITIONS_AHEAD ahead
+    python archiver.py archive --keep-months 12    # move older months to Parquet files
+    python archiver.py history Finance --from 2023-01-01 --to 2023-03-31
+
+`partition` splits the catch-all pfuture partition into one partition per
+month, from the oldest row to PARTITIONS_AHEAD months ahead; run it monthly,
+for example from cron. `archive` writes each month older than --keep-months
+to a zstd-compressed Parquet file, one per table and month in the archive
+directory (SUP_ARCHIVE_PATH, default archive_<database>), checks that the
+file holds as many rows as the partition and drops the partition. The hot
+tables then hold a bounded number of months whatever the length of the
+history.
+
+Net profit (FinanceDaily) and the Dashboard's sales rollups stay in MySQL
+and still cover the archived months. read_archive() returns the archived
+rows of a date range, and read_history() the archived and hot rows together,
+with the column types of get_table_frame().
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+from database import (
+    connect_to_database, day_after, get_column_names, get_table_frame, get_table_schema, local_file_path,
+    query_cache, rows_to_frame,
+)
+from exporter import ExportError, export_table
+
+# Partitioned table -> the date column it is partitioned on
+PARTITIONED_TABLES = {
+    'Finance': 'TransactionDate',
+    'Purchase': 'PurchaseDateTime',
+    'Transactions': 'TransactionDate',
+}
+PARTITIONS_AHEAD = 3     # months of empty partitions kept ready ahead of today
+KEEP_MONTHS = 12         # full months kept in MySQL besides the current one
+ARCHIVE_COMPRESSION = 'zstd'
+TO_DAYS_OFFSET = 365     # TO_DAYS(d) = d.toordinal() + 365
+
+PARTITIONS_SQL = '''
+    SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    ORDER BY PARTITION_ORDINAL_POSITION
+'''
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _date_column(table_name):
+    if table_name not in PARTITIONED_TABLES:
+        raise ArchiveError(f'{table_name} is not partitioned by month')
+    return PARTITIONED_TABLES[table_name]
+
+
+def archive_directory():
+    return local_file_path('archive', '')
+
+
+def list_partitions(cursor, table_name):
+    """Returns [(partition, first date past it)] in order; the date is None for pfuture."""
+    cursor.execute(PARTITIONS_SQL, (table_name,))
+    rows = cursor.fetchall()
+    if not rows or rows[0][0] is None:
+        raise ArchiveError(f'{table_name} is not partitioned; apply migrations/012_partitioning.sql first')
+    return [
+        (name, date.fromordinal(int(bound) - TO_DAYS_OFFSET) if bound != 'MAXVALUE' else None)
+        for name, bound in rows
+    ]
+
+
+def add_partitions(table_name, ahead=PARTITIONS_AHEAD):
+    """Splits pfuture into months up to ahead months past this one; returns the partitions added."""
+    column = _date_column(table_name)
+    conn = connect_to_database()
+    try:
+        with conn.cursor() as cursor:
+            partitions = list_partitions(cursor, table_name)
+            if partitions[-1][1] is not None:
+                raise ArchiveError(f'The last partition of {table_name} must be pfuture, VALUES LESS THAN MAXVALUE')
+            if len(partitions) > 1:
+                month = partitions[-2][1]
+            else:
+                cursor.execute(f'SELECT MIN({column}) FROM {table_name}')
+                oldest = cursor.fetchone()[0]
+                month = _month_start(oldest or date.today())
+            stop = _add_months(_month_start(date.today()), ahead + 1)
+            added = []
+            definitions = []
+            while month < stop:
+                added.append(f'p{month:%Y%m}')
+                month = _add_months(month, 1)
+                definitions.append(f'PARTITION {added[-1]} VALUES LESS THAN ({month.toordinal() + TO_DAYS_OFFSET})')
+            if added:
+                # pfuture is empty past the last month, so this moves no rows once the months exist
+                cursor.execute(
+                    f"ALTER TABLE {table_name} REORGANIZE PARTITION {partitions[-1][0]} INTO "
+                    f"({', '.join(definitions)}, PARTITION {partitions[-1][0]} VALUES LESS THAN MAXVALUE)"
+                )
+    finally:
+        conn.close()
+    return added
+
+
+def archive_file(table_name, month, directory=None):
+    return os.path.join(directory or archive_directory(), table_name, f'{month:%Y-%m}.parquet')
+
+
+def archived_months(table_name, directory=None):
+    """Returns [(month, path)] of the table's archive files, oldest first."""
+    table_directory = os.path.join(directory or archive_directory(), table_name)
+    if not os.path.isdir(table_directory):
+        return []
+    months = []
+    for name in sorted(os.listdir(table_directory)):
+        stem, extension = os.path.splitext(name)
+        if extension == '.parquet':
+            year, month = stem.split('-')
+            months.append((date(int(year), int(month), 1), os.path.join(table_directory, name)))
+    return months
+
+
+def archive_table(table_name, keep_months=KEEP_MONTHS, directory=None, progress=None):
+    """Moves the months before the last keep_months to Parquet files, oldest first.
+
+    Returns [(partition, rows)] of the partitions archived and dropped;
+    progress, if given, is called with each of them.
+    """
+    column = _date_column(table_name)
+    cutoff = _add_months(_month_start(date.today()), -keep_months)
+    archived = []
+    conn = connect_to_database()
+    try:
+        with conn.cursor() as cursor:
+            partitions = list_partitions(cursor, table_name)
+        previous = None
+        for name, end in partitions:
+            if end is None or end > cutoff:
+                break
+            # The oldest partition also holds anything dated before its month
+            search = (f'{column} < %s', [end]) if previous is None else \
+                (f'{column} >= %s AND {column} < %s', [previous, end])
+            path = archive_file(table_name, _add_months(end, -1), directory)
+            rows = _archive_partition(conn, table_name, name, search, path)
+            archived.append((name, rows))
+            if progress:
+                progress(name, rows)
+            previous = end
+    finally:
+        conn.close()
+    if archived:
+        query_cache.invalidate(table_name)
+    return archived
+
+
+def _archive_partition(conn, table_name, partition, search, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.partial'
+    try:
+        result = export_table(table_name, partial, 'parquet', search=search, compression=ARCHIVE_COMPRESSION)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    with conn.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {table_name} PARTITION ({partition})')
+        rows = cursor.fetchone()[0]
+        if rows != result['rows']:
+            os.remove(partial)
+            raise ArchiveError(
+                f"{table_name} partition {partition} has {rows:,} rows but {result['rows']:,} were written; "
+                f"it was kept"
+            )
+        # An earlier run may have written the file and stopped before the drop
+        os.replace(partial, path)
+        cursor.execute(f'ALTER TABLE {table_name} DROP PARTITION {partition}')
+    return rows
+
+
+def read_archive(table_name, start_date=None, end_date=None, columns=None, limit=None, directory=None):
+    """Returns the archived rows dated from start_date to end_date (inclusive) as a DataFrame.
+
+    Either end may be None for no bound; limit caps the rows read.
+    """
+    column = _date_column(table_name)
+    columns = list(columns or get_column_names(table_name))
+    start = pd.to_datetime(start_date).date() if start_date is not None else None
+    end = day_after(end_date) if end_date is not None else None
+    # A file holds no rows dated after its month
+    files = [
+        path for month, path in archived_months(table_name, directory)
+        if start is None or _add_months(month, 1) > start
+    ]
+    if not files:
+        return rows_to_frame(table_name, columns, [])
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ArchiveError('Reading archived rows needs pyarrow (pip install pyarrow)')
+
+    dataset = ds.dataset(files, format='parquet')
+    condition = None
+    for bound in (ds.field(column) >= pd.Timestamp(start) if start is not None else None,
+                  ds.field(column) < pd.Timestamp(end) if end is not None else None):
+        if bound is not None:
+            condition = bound if condition is None else condition & bound
+    if limit is not None:
+        rows = dataset.head(limit, columns=columns, filter=condition)
+    else:
+        rows = dataset.to_table(columns=columns, filter=condition)
+    dtypes = get_table_schema(table_name).dtypes()
+    return rows.to_pandas().astype({c: dtypes[c] for c in columns if c in dtypes})
+
+
+def read_history(table_name, start_date, end_date, columns=None, directory=None):
+    """Returns the archived and the hot rows dated from start_date to end_date (inclusive), oldest first."""
+    column = _date_column(table_name)
+    columns = list(columns or get_column_names(table_name))
+    search = (f'{column} >= %s AND {column} < %s', [start_date, day_after(end_date)])
+    hot = get_table_frame(table_name, columns, search=search)
+    archived = read_archive(table_name, start_date, end_date, columns, directory=directory)
+    if archived.empty:
+        return hot
+    return pd.concat([archived, hot], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Partition Finance, Purchase and Transactions by month and archive old months.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    partition = commands.add_parser('partition', help='add the monthly partitions up to a few months ahead')
+    partition.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD, help='months of partitions to keep ready')
+    archive = commands.add_parser('archive', help='move old months to Parquet files and drop their partitions')
+    archive.add_argument('--keep-months', type=int, default=KEEP_MONTHS,
+                         help='full months to keep in MySQL besides the current one')
+    history = commands.add_parser('history', help='export archived and hot rows of a date range')
+    history.add_argument('table', choices=sorted(PARTITIONED_TABLES))
+    history.add_argument('path', help='CSV file to write')
+    history.add_argument('--from', dest='start', required=True, help='first date (YYYY-MM-DD)')
+    history.add_argument('--to', dest='end', required=True, help='last date (YYYY-MM-DD), inclusive')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'partition':
+            for table_name in PARTITIONED_TABLES:
+                added = add_partitions(table_name, args.ahead)
+                print(f"{table_name}: added {', '.join(added) if added else 'no partitions'}")
+        elif args.command == 'archive':
+            if args.keep_months < 1:
+                parser.error('--keep-months must be at least 1')
+            for table_name in PARTITIONED_TABLES:
+                archived = archive_table(
+                    table_name, args.keep_months,
+                    progress=lambda name, rows: print(f"{table_name}: archived {name}, {rows:,} rows")
+                )
+                if not archived:
+                    print(f"{table_name}: nothing older than {args.keep_months} months")
+        else:
+            frame = read_history(args.table, args.start, args.end)
+            frame.to_csv(args.path, index=False)
+            print(f"Wrote {len(frame):,} rows of {args.table} to {args.path}")
+    except (ArchiveError, ExportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
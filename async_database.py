@@ -0,0 +1,232 @@
+"""asyncio versions of the read helpers in database.py.
+
+A page fires the independent queries it needs at once and renders when the
+slowest one is back, instead of waiting for each in turn:
+
+    found = run_page_queries(products=get_available_products(), customers=get_available_customers())
+
+The helpers share database.py's SQL, query cache, catalogue replica and
+tracing. With aiomysql
+installed they use their own aiomysql pool; without it each query runs on a
+worker thread with a connection from database.py's pool, which still runs
+them concurrently. Writes stay in database.py, one transaction per helper.
+"""
+import asyncio
+import threading
+
+import database
+from database import (
+    AVAILABLE_PRODUCTS_SQL, CUSTOMER_BY_NAME_SQL, CUSTOMERS_SQL, DB_CONFIG, EXACT_COUNT_BELOW,
+    FINANCE_BOUNDS_SQL, NET_PROFIT_SQL, PAGE_SIZE, POOL_SIZE, SALES_HOURLY_SQL, SUPPLIERS_SQL,
+    TABLE_ROWS_ESTIMATE_SQL, TOP_CATEGORIES_SQL, TOP_N, TOP_PRODUCTS_SQL, day_after, query_cache,
+)
+from tracing import current_span, finish_query, set_current_span, start_query, tracer
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+PAGE_QUERY_TIMEOUT = 60  # seconds run_page_queries waits for the slowest query
+
+_loop = None
+_loop_lock = threading.Lock()
+_pool = None
+_pool_lock = None
+
+
+# One event loop per process, on a background thread; Streamlit reruns are
+# synchronous and hand their queries to it
+def _event_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+async def _get_pool():
+    global _pool, _pool_lock
+    if aiomysql is None:
+        return None
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=DB_CONFIG['host'], user=DB_CONFIG['user'], password=DB_CONFIG['password'],
+                db=DB_CONFIG['database'], autocommit=True, minsize=1, maxsize=POOL_SIZE,
+            )
+    return _pool
+
+
+def _fetchall_blocking(sql, params):
+    with database.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+async def fetchall(sql, params=None):
+    pool = await _get_pool()
+    if pool is None:
+        return await asyncio.get_running_loop().run_in_executor(None, _fetchall_blocking, sql, params)
+    span, token = start_query(sql, params)
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                rows = await cursor.fetchall()
+    except Exception as e:
+        tracer.finish(span, token, error=e)
+        raise
+    finish_query(span, token, rows)
+    return rows
+
+
+async def fetchone(sql, params=None):
+    rows = await fetchall(sql, params)
+    return rows[0] if rows else None
+
+
+async def replica_read(tables, sql, params=()):
+    """database.replica_read() on a worker thread, since the replica may sync with MySQL first."""
+    if not database.REPLICA:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(None, database.replica_read, tables, sql, params)
+
+
+def submit(coroutine):
+    """Starts a coroutine on the background loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop())
+
+
+def run_page_queries(timeout=PAGE_QUERY_TIMEOUT, **queries):
+    """Runs independent helper coroutines concurrently; returns their results by name."""
+    parent = current_span()
+
+    async def gather():
+        # Time the queries as part of the caller's page
+        set_current_span(parent)
+        return await asyncio.gather(*queries.values())
+
+    results = submit(gather()).result(timeout)
+    return dict(zip(queries, results))
+
+
+# Read helpers, as in database.py
+
+@tracer.traced
+@query_cache.cached('Supermarket.ProductID', 'Supermarket.ProductName', 'Supermarket.Quantity')
+async def get_available_products():
+    rows = await replica_read(('Supermarket',), AVAILABLE_PRODUCTS_SQL)
+    return rows if rows is not None else await fetchall(AVAILABLE_PRODUCTS_SQL)
+
+
+@tracer.traced
+@query_cache.cached('Customer.CustomerID', 'Customer.Name', 'Customer.PhoneNumber')
+async def get_available_customers():
+    rows = await replica_read(('Customer',), CUSTOMERS_SQL)
+    return rows if rows is not None else await fetchall(CUSTOMERS_SQL)
+
+
+@tracer.traced
+@query_cache.cached('Supplier.ProductID', 'Supplier.SupplierName')
+async def get_suppliers():
+    rows = await replica_read(('Supplier',), SUPPLIERS_SQL)
+    return rows if rows is not None else await fetchall(SUPPLIERS_SQL)
+
+
+@tracer.traced
+async def check_customer_exists(name):
+    rows = await replica_read(('Customer',), CUSTOMER_BY_NAME_SQL, (name,))
+    if rows is not None:
+        return rows[0] if rows else None
+    return await fetchone(CUSTOMER_BY_NAME_SQL, (name,))
+
+
+# Alerts come from database.alert_index, which may sync with MySQL first
+@tracer.traced
+async def get_near_expiry_products():
+    return await asyncio.get_running_loop().run_in_executor(None, database.alert_index.near_expiry)
+
+
+@tracer.traced
+async def get_low_stock_products():
+    return await asyncio.get_running_loop().run_in_executor(None, database.alert_index.low_stock)
+
+
+@tracer.traced
+@query_cache.cached('Finance')
+async def get_finance_date_bounds():
+    return await fetchone(FINANCE_BOUNDS_SQL)
+
+
+@tracer.traced
+@query_cache.cached('Finance')
+async def get_net_profit(start_date, end_date):
+    breakdown = await fetchall(NET_PROFIT_SQL, (start_date, end_date))
+    return database._net_profit(breakdown), breakdown
+
+
+# Reports across stores run on database.store_router's threads, one per store
+@tracer.traced
+async def get_low_stock_by_store(store_ids=None):
+    return await asyncio.get_running_loop().run_in_executor(None, database.get_low_stock_by_store, store_ids)
+
+
+# Sales figures come from database.sales_rollup, which may refresh first
+@tracer.traced
+async def get_sales_summary(start_date, end_date, top=TOP_N):
+    await asyncio.get_running_loop().run_in_executor(None, database.sales_rollup.warm)
+    return await _sales_summary(start_date, end_date, top)
+
+
+@query_cache.cached('SalesHourly', 'SalesDailyProduct', 'Supplier.Category', 'Supermarket.ProductName')
+async def _sales_summary(start_date, end_date, top):
+    end = day_after(end_date)
+    hourly, products, categories = await asyncio.gather(
+        fetchall(SALES_HOURLY_SQL, (start_date, end)),
+        fetchall(TOP_PRODUCTS_SQL, (start_date, end, top)),
+        fetchall(TOP_CATEGORIES_SQL, (start_date, end, top)),
+    )
+    return hourly, products, categories
+
+
+@tracer.traced
+async def get_table_page(table_name, columns=None, after_key=None, page_size=PAGE_SIZE, search=None, prefetch=False):
+    slot = database._page_slot(table_name, columns, after_key, page_size, search)
+    # Pages prefetched by database.get_table_page() are used here too; waiting
+    # for one that is still loading must not block the loop
+    page = await asyncio.get_running_loop().run_in_executor(None, database._take_prefetched, slot)
+    if page is None:
+        sql, params = database._page_query(*slot)
+        rows = await replica_read((table_name,), sql, params) if search is None else None
+        if rows is None:
+            rows = await fetchall(sql, params)
+        page = rows, database._next_key(table_name, slot[1], rows, page_size)
+    rows, next_key = page
+
+    if prefetch and next_key is not None:
+        database._prefetch(database._following_slot(slot, next_key))
+    return rows, next_key
+
+
+@tracer.traced
+async def count_rows(table_name, search=None):
+    database._check_table(table_name)
+    if search is not None:
+        row = await fetchone(f'SELECT COUNT(*) FROM {table_name} WHERE {search[0]}', search[1])
+        return row[0], True
+    rows = await replica_read((table_name,), f'SELECT COUNT(*) FROM {table_name}')
+    if rows is not None:
+        return rows[0][0], True
+    row = await fetchone(TABLE_ROWS_ESTIMATE_SQL, (table_name,))
+    estimate = row[0] if row else None
+    if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+        return int(estimate), False
+    row = await fetchone(f'SELECT COUNT(*) FROM {table_name}')
+    return row[0], True
@@ -0,0 +1,536 @@
+"""Benchmark the data-access helpers against a generated dataset.
+
+    python benchmark.py generate --finance-rows 1000000
+    python benchmark.py run --output results/ --compare results/previous.json
+
+`generate` (re)creates a separate database (sup_bench by default) from
+supermarket.sql without its sample rows and fills it with deterministic
+synthetic data; the triggers are installed after the load. `run` times the
+helpers in database.py against it and writes p50/p95/p99 latencies and
+rows/s to a JSON file so results can be compared between versions.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import database
+from database import DB_CONFIG, connect_to_database
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supermarket.sql')
+BENCH_DATABASE = 'sup_bench'
+BATCH_SIZE = 5000
+SEED = 42
+BOOKKEEPING_TIMEOUT = 120  # seconds to wait for the write-behind queue to book the checkouts
+
+CATEGORIES = ['Vegetables', 'Spices', 'Dairy', 'Grains', 'Fruits', 'Seafood', 'Leafy Greens', 'Poultry',
+              'Confectionery', 'Organic Veggies', 'Sweets', 'Baked Goods']
+CITIES = ['Chennai', 'Coimbatore', 'Madurai', 'Salem', 'Trichy', 'Tuticorin', 'Erode', 'Karur', 'Namakkal',
+          'Ooty', 'Kochi', 'Thrissur', 'Tirunelveli', 'Hyderabad', 'Mumbai']
+NAMES = ['Amit', 'Bhavna', 'Chetan', 'Divya', 'Eshan', 'Fatima', 'Gopal', 'Harini', 'Ishaan', 'Jyoti',
+         'Karan', 'Lakshmi', 'Manav', 'Neha', 'Omkar', 'Priya', 'Rahul', 'Sneha', 'Tarun', 'Uma']
+PAYMENT_METHODS = ['Cash', 'Card', 'UPI', 'Bank Transfer', 'Cheque']
+
+
+# Schema loading
+
+def split_sql_script(script):
+    """Split a mysql client script into statements, honouring DELIMITER lines."""
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER '):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buffer and (not stripped or stripped.startswith('--')):
+            continue
+        # A trailing "-- comment" may follow the delimiter
+        code = re.sub(r'\s+--\s.*$', '', stripped)
+        if code.endswith(delimiter):
+            buffer.append(code[:-len(delimiter)])
+            statements.append('\n'.join(buffer).strip())
+            buffer = []
+        else:
+            buffer.append(line)
+    if buffer and '\n'.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+
+def schema_phases(script):
+    """Returns (tables, triggers): DDL to run before the load and after it.
+
+    Database selection and the sample INSERT ... VALUES rows are dropped.
+    """
+    tables, triggers = [], []
+    for statement in split_sql_script(script):
+        head = re.sub(r'\s+', ' ', statement[:60]).upper()
+        if head.startswith(('CREATE DATABASE', 'USE ', 'DROP DATABASE')):
+            continue
+        if head.startswith('INSERT INTO') and re.search(r'\)\s*VALUES\s*\(', statement, re.I):
+            continue
+        if triggers or head.startswith(('CREATE TRIGGER', 'CREATE PROCEDURE', 'CREATE FUNCTION')):
+            triggers.append(statement)
+        else:
+            tables.append(statement)
+    return tables, triggers
+
+
+# Data generation
+
+def _insert_batches(cursor, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def _random_time(rng, days):
+    midnight = datetime.combine(date.today(), datetime.min.time())
+    return midnight - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def _finance_rows(rng, count, products, customers, days):
+    for _ in range(count):
+        if rng.random() < 0.8:
+            yield ('Purchase', rng.choice(PAYMENT_METHODS[:4]), _random_time(rng, days),
+                   round(rng.uniform(10, 2000), 2), rng.randint(1, products), rng.randint(1, customers))
+        else:
+            yield ('Supply', rng.choice(PAYMENT_METHODS), _random_time(rng, days),
+                   round(rng.uniform(500, 10000), 2), rng.randint(1, products), None)
+
+
+def generate(database_name, finance_rows, products=None, customers=None, purchases=None, days=365, seed=SEED):
+    products = products or max(100, finance_rows // 1000)
+    customers = customers or max(100, finance_rows // 10)
+    purchases = purchases or finance_rows
+    rng = random.Random(seed)
+    today = date.today()
+    sizes = {'Supplier': products, 'Warehouse': products, 'Supermarket': products,
+             'Customer': customers, 'Purchase': purchases, 'Finance': finance_rows}
+
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        tables, triggers = schema_phases(f.read())
+
+    conn = connect_to_database(database=None)
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS {database_name}')
+            cursor.execute(f'CREATE DATABASE {database_name}')
+            cursor.execute(f'USE {database_name}')
+            for statement in tables:
+                cursor.execute(statement)
+
+            print(f'Generating {sizes}', file=sys.stderr)
+            _insert_batches(
+                cursor,
+                'INSERT INTO Supplier (SupplierID, ProductID, SupplierName, Email, Address, ContactNumber, '
+                'Category, UnitCost, Quantity) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                ((i, 1000 + i, f'Supplier {i}', f'supplier{i}@example.com', f'{rng.choice(CITIES)} Road {i}',
+                  f'9{i:09d}', rng.choice(CATEGORIES), round(rng.uniform(5, 100), 2), rng.randint(50, 500))
+                 for i in range(1, products + 1))
+            )
+            _insert_batches(
+                cursor,
+                'INSERT INTO Warehouse (ProductID, ProductName, ArrivalDate, ExpiryDate, AvailableStock, GSTNo) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                ((1000 + i, f'Product {i}', today - timedelta(days=rng.randint(0, 30)),
+                  today + timedelta(days=rng.randint(-5, 365)), 10_000_000, f'33GST{i:08d}')
+                 for i in range(1, products + 1))
+            )
+            _insert_batches(
+                cursor,
+                'INSERT INTO Supermarket (ProductID, ProductName, GSTNo, Quantity, IsNeeded, ExpiryDate, Perishable) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                ((1000 + i, f'Product {i}', f'33GST{i:08d}', 10_000_000 if i % 50 else rng.randint(0, 9),
+                  False, today + timedelta(days=rng.randint(-5, 365)), rng.random() < 0.4)
+                 for i in range(1, products + 1))
+            )
+            _insert_batches(
+                cursor,
+                'INSERT INTO Customer (CustomerID, Name, PhoneNumber, Cost) VALUES (%s, %s, %s, %s)',
+                ((i, f'{rng.choice(NAMES)} {i}', f'8{i:09d}', round(rng.uniform(0, 500), 2))
+                 for i in range(1, customers + 1))
+            )
+
+            _insert_batches(
+                cursor,
+                'INSERT INTO Purchase (CustomerID, ProductID, Quantity, PurchaseDateTime) VALUES (%s, %s, %s, %s)',
+                ((rng.randint(1, customers), 1000 + rng.randint(1, products), rng.randint(1, 10),
+                  _random_time(rng, days))
+                 for _ in range(purchases))
+            )
+            _insert_batches(
+                cursor,
+                'INSERT INTO Finance (TransactionType, PaymentMethod, TransactionDate, Amount, SupplierID, CustomerID) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                _finance_rows(rng, finance_rows, products, customers, days)
+            )
+
+            for statement in triggers:
+                cursor.execute(statement)
+            cursor.execute('ANALYZE TABLE Supplier, Warehouse, Supermarket, Customer, Purchase, Finance, FinanceDaily')
+            cursor.fetchall()
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f'Generated {sum(sizes.values()):,} rows in {elapsed:.1f}s', file=sys.stderr)
+    return sizes
+
+
+# Timing
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * pct / 100
+    low = int(index)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def measure(name, func, repeat, warmup=1):
+    """Times func() repeat times. func returns the number of rows it produced."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = func() or 0
+        timings.append(time.perf_counter() - started)
+    p50 = percentile(timings, 50)
+    result = {
+        'name': name,
+        'repeat': repeat,
+        'rows': rows,
+        'p50_ms': p50 * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000,
+        'rows_per_second': rows / p50 if p50 else 0.0,
+    }
+    print(f"{name:<40} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+          f"p99 {result['p99_ms']:9.2f} ms  {result['rows_per_second']:12,.0f} rows/s", file=sys.stderr)
+    return result
+
+
+def _table_size(table_name):
+    return database.count_rows(table_name)[0]
+
+
+def benchmarks(repeat, full_scan_limit):
+    """Yields (name, func, repeat) for every helper worth timing."""
+    import pandas as pd
+
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    finance_rows = _table_size('Finance')
+    finance_columns = database.get_column_names('Finance')
+
+    def page(table_name, search=None):
+        return lambda: len(database.get_table_page(table_name, search=search)[0])
+
+    def last_page():
+        with database.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT MAX(FinanceID) FROM Finance')
+                last_id = cursor.fetchone()[0] or 0
+        return len(database.get_table_page('Finance', after_key=(max(0, last_id - 150),))[0])
+
+    yield 'get_table_page(Finance) first page', page('Finance'), repeat
+    yield 'get_table_page(Finance) last page', last_page, repeat
+    yield 'count_rows(Finance)', lambda: database.count_rows('Finance')[0], repeat
+    if finance_rows <= full_scan_limit:
+        yield 'get_table_data(Finance) full table', lambda: len(database.get_table_data('Finance')), max(1, repeat // 10)
+    yield 'get_table_data(Supermarket) full table', lambda: len(database.get_table_data('Supermarket')), repeat
+
+    name_search = database.build_search_filter('Customer', 'Name', 'Priya', 'varchar')
+    anywhere_search = database.build_search_filter('Customer', 'Name', 'riya 1', 'varchar', match_anywhere=True)
+    address_search = database.build_search_filter('Supplier', 'Address', 'Chennai', 'text')
+    yield 'search Customer.Name prefix', page('Customer', name_search), repeat
+    yield 'search Customer.Name count', lambda: database.count_rows('Customer', name_search)[0], repeat
+    yield 'search Customer.Name anywhere', page('Customer', anywhere_search), max(1, repeat // 10)
+    yield 'search Supplier.Address fulltext', page('Supplier', address_search), repeat
+
+    def pandas_net_profit():
+        sql, params = database.finance_range_filter(month_ago, today)
+        with database.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f'SELECT * FROM Finance WHERE {sql}', params)
+                df = pd.DataFrame(cursor.fetchall(), columns=finance_columns)
+        df['TransactionDate'] = pd.to_datetime(df['TransactionDate'])
+        df['Amount'] = df['Amount'].astype(float)
+        database.calculate_net_profit(df, month_ago, today)
+        return len(df)
+
+    yield 'calculate_net_profit (30 days, pandas)', pandas_net_profit, max(1, repeat // 10)
+    yield 'get_net_profit (30 days, rollup)', lambda: len(database.get_net_profit.uncached(month_ago, today)[1]), repeat
+    yield 'get_net_profit (1 year, rollup)', \
+        lambda: len(database.get_net_profit.uncached(today - timedelta(days=365), today)[1]), repeat
+
+    def sales_refresh():
+        database.sales_rollup.on_invalidate(('Finance',))
+        database.sales_rollup.interval = 0
+        rows_read = database.sales_rollup.stats()['rows_read']
+        database.sales_rollup.warm()
+        return database.sales_rollup.stats()['rows_read'] - rows_read
+
+    def sales_summary(days):
+        return lambda: len(database._sales_summary.uncached(today - timedelta(days=days), today, database.TOP_N)[0])
+
+    # The Dashboard charts read the rollups; a rebuild is what the first start on a big database costs
+    yield 'rebuild_sales_rollups (all history)', lambda: database.rebuild_sales_rollups() or 0, 1
+    yield 'SalesRollup refresh (latest day)', sales_refresh, max(1, repeat // 10)
+    yield 'get_sales_summary (30 days)', sales_summary(30), repeat
+    yield 'get_sales_summary (1 year)', sales_summary(365), repeat
+
+    def alert_full_load():
+        database.alert_index.on_invalidate(())
+        return len(database.alert_index.low_stock())
+
+    # Alerts are read from the in-memory index; the full load is what a reload costs
+    yield 'AlertIndex full load', alert_full_load, max(1, repeat // 10)
+    yield 'get_low_stock_products', lambda: len(database.get_low_stock_products()), repeat
+    yield 'get_near_expiry_products', lambda: len(database.get_near_expiry_products()), repeat
+    yield 'get_available_products', lambda: len(database.get_available_products.uncached()), repeat
+
+    def customer_index_load():
+        database.customer_index.on_invalidate(())
+        database.customer_index.warm()
+        return database.customer_index.stats()['customers']
+
+    # The Existing Customer typeahead, against loading every customer as before
+    yield 'CustomerIndex full load', customer_index_load, max(1, repeat // 10)
+    yield 'search_customers name prefix', lambda: len(database.search_customers('Priya')), repeat
+    yield 'search_customers phone prefix', lambda: len(database.search_customers('800001')), repeat
+    yield 'get_available_customers', lambda: len(database.get_available_customers.uncached()), max(1, repeat // 10)
+
+
+def frame_benchmarks(repeat, full_scan_limit):
+    """Yields (name, build, repeat) for the table views; build returns a DataFrame."""
+    import pandas as pd
+
+    for table_name in ('Finance', 'Customer'):
+        if _table_size(table_name) > full_scan_limit:
+            continue
+        columns = database.get_column_names(table_name)
+        # Before: a list of tuples, then an object-dtype frame with Decimal cells
+        yield f'{table_name} DataFrame from tuples', \
+            lambda t=table_name, c=columns: pd.DataFrame(database.get_table_data(t), columns=c), max(1, repeat // 10)
+        yield f'{table_name} DataFrame typed', \
+            lambda t=table_name: database.get_table_frame(t), max(1, repeat // 10)
+
+
+def frame_footprint(build):
+    """Peak Python allocation while building a DataFrame, and the size of the result, in MB."""
+    tracemalloc.start()
+    try:
+        frame = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_mb': peak / 2**20, 'frame_mb': frame.memory_usage(deep=True).sum() / 2**20}
+
+
+# Server counters that show how much work one checkout line costs
+WRITE_COUNTERS = ('Innodb_rows_inserted', 'Innodb_rows_updated', 'Innodb_rows_read', 'Questions')
+
+
+def _server_counters(cursor):
+    cursor.execute(
+        f"SHOW GLOBAL STATUS WHERE Variable_name IN ({', '.join(['%s'] * len(WRITE_COUNTERS))})",
+        WRITE_COUNTERS
+    )
+    return {name: int(value) for name, value in cursor.fetchall()}
+
+
+def _finance_count(cursor):
+    cursor.execute('SELECT COUNT(*) FROM Finance')
+    return cursor.fetchone()[0]
+
+
+def _wait_for_bookkeeping(timeout=BOOKKEEPING_TIMEOUT):
+    """Waits until the write-behind queue has no ready checkouts left; returns the seconds waited."""
+    started = time.perf_counter()
+    # Pending events are left only by failed checkouts, and stay until the outbox's pending timeout
+    while database.bookkeeping_stats().get('ready') and time.perf_counter() - started < timeout:
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def purchase_throughput(purchases, basket_size):
+    """Checks out baskets for fresh customers; returns a result like measure().
+
+    Also reports write amplification: server rows inserted/updated/read, Finance
+    rows and client round-trips per basket line. The counters are server-wide,
+    so run it on an otherwise idle server. With write-behind on they are read
+    once the queue has booked the checkouts, so they include its writes.
+    """
+    products = [p[0] for p in database.get_available_products.uncached()][:max(basket_size, 1) * 10]
+    run_id = int(time.time())
+    customers = [database.create_customer(f'Bench {run_id} {i}', f'7{run_id % 10**5:05d}{i:05d}')
+                 for i in range(purchases)]
+    with database.get_connection() as conn:
+        with conn.cursor() as cursor:
+            counters_before, finance_before = _server_counters(cursor), _finance_count(cursor)
+
+    timings = []
+    failures = 0
+    for i, customer_id in enumerate(customers):
+        basket = [(products[(i + j) % len(products)], 1) for j in range(basket_size)]
+        started = time.perf_counter()
+        if not database.create_basket_purchase(customer_id, basket, 'Cash'):
+            failures += 1
+        timings.append(time.perf_counter() - started)
+    total = sum(timings)
+    bookkeeping_seconds = _wait_for_bookkeeping()
+
+    with database.get_connection() as conn:
+        with conn.cursor() as cursor:
+            counters_after, finance_after = _server_counters(cursor), _finance_count(cursor)
+    lines = (purchases - failures) * basket_size
+    per_line = {f'{name.lower()}_per_line': (counters_after[name] - counters_before[name]) / lines if lines else 0.0
+                for name in WRITE_COUNTERS}
+    per_line['finance_rows_per_line'] = (finance_after - finance_before) / lines if lines else 0.0
+
+    return {
+        'name': f'create_basket_purchase ({basket_size} lines)',
+        'repeat': purchases,
+        'rows': basket_size,
+        'failures': failures,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000 if timings else 0.0,
+        'rows_per_second': purchases * basket_size / total if total else 0.0,
+        'purchases_per_second': purchases / total if total else 0.0,
+        'bookkeeping_wait_ms': bookkeeping_seconds * 1000,
+        **per_line,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def run(repeat=20, purchases=50, basket_sizes=(1, 10, 30), full_scan_limit=1_000_000):
+    results = []
+    for name, func, times in benchmarks(repeat, full_scan_limit):
+        results.append(measure(name, func, times))
+    for name, build, times in frame_benchmarks(repeat, full_scan_limit):
+        result = measure(name, lambda: len(build()), times)
+        result.update(frame_footprint(build))
+        print(f"{'  memory':<40} {result['frame_mb']:9.1f} MB frame, {result['peak_mb']:9.1f} MB peak while building",
+              file=sys.stderr)
+        results.append(result)
+    for basket_size in basket_sizes:
+        result = purchase_throughput(purchases, basket_size)
+        print(f"{result['name']:<40} p50 {result['p50_ms']:9.2f} ms  "
+              f"{result['purchases_per_second']:9,.1f} purchases/s  {result['failures']} failed", file=sys.stderr)
+        print(f"{'  per line':<40} {result['innodb_rows_inserted_per_line']:.1f} rows inserted, "
+              f"{result['innodb_rows_updated_per_line']:.1f} updated, {result['innodb_rows_read_per_line']:.1f} read, "
+              f"{result['finance_rows_per_line']:.1f} Finance rows, {result['questions_per_line']:.2f} round-trips, "
+              f"{result['bookkeeping_wait_ms']:.0f} ms until booked", file=sys.stderr)
+        results.append(result)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'database': DB_CONFIG['database'],
+        'python': platform.python_version(),
+        'table_rows': {t: _table_size(t) for t in ('Supplier', 'Customer', 'Purchase', 'Finance')},
+        'pool': database.pool_stats(),
+        'results': results,
+    }
+
+
+def compare(current, previous, threshold=0.2):
+    """Prints p50 changes against an earlier run; returns the names that got slower."""
+    before = {r['name']: r for r in previous['results']}
+    regressions = []
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):", file=sys.stderr)
+    for result in current['results']:
+        old = before.get(result['name'])
+        if not old or not old['p50_ms']:
+            continue
+        change = result['p50_ms'] / old['p50_ms'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{result['name']:<40} {old['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms ({change:+.0%}){flag}",
+              file=sys.stderr)
+        if flag:
+            regressions.append(result['name'])
+        for key in sorted(k for k in result if k.endswith(('_per_line', '_mb')) and k in old):
+            print(f"{'  ' + key:<40} {old[key]:9.2f} -> {result[key]:9.2f}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the supermarket data-access layer.')
+    parser.add_argument('--database', default=BENCH_DATABASE, help=f'defaults to {BENCH_DATABASE}')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='create the benchmark database with synthetic data')
+    gen.add_argument('--finance-rows', type=int, default=100_000)
+    gen.add_argument('--products', type=int, help='defaults to finance rows / 1000')
+    gen.add_argument('--customers', type=int, help='defaults to finance rows / 10')
+    gen.add_argument('--purchases', type=int, help='defaults to the number of finance rows')
+    gen.add_argument('--days', type=int, default=365, help='days of history to spread rows over')
+    gen.add_argument('--seed', type=int, default=SEED)
+
+    bench = commands.add_parser('run', help='time the helpers and save the results as JSON')
+    bench.add_argument('--repeat', type=int, default=20)
+    bench.add_argument('--purchases', type=int, default=50, help='baskets to check out per basket size')
+    bench.add_argument('--basket-sizes', default='1,10,30')
+    bench.add_argument('--full-scan-limit', type=int, default=1_000_000,
+                       help='skip the full-table runs of tables with more rows than this')
+    bench.add_argument('--output', default='benchmark-results', help='directory for the JSON results')
+    bench.add_argument('--compare', help='earlier JSON result to compare against')
+    bench.add_argument('--threshold', type=float, default=0.2, help='p50 slowdown that counts as a regression')
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        generate(args.database, args.finance_rows, args.products, args.customers, args.purchases,
+                 args.days, args.seed)
+        return 0
+
+    # Point the shared pool at the benchmark database before first use
+    DB_CONFIG['database'] = args.database
+    report = run(args.repeat, args.purchases, [int(n) for n in args.basket_sizes.split(',')], args.full_scan_limit)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"benchmark-{report['timestamp'].replace(':', '')}-{report['commit'] or 'local'}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f'Results written to {path}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
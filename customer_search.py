@@ -0,0 +1,108 @@
+"""Typeahead over customer names and phone numbers.
+
+CustomerIndex follows Customer through UpdatedAt (see table_index.py) and
+keeps two sorted lists: every word-initial tail of each name ('ravi kumar'
+and 'kumar' for Ravi Kumar), and the digits of each phone number. A prefix
+is found with one binary search and the top k matches are the next k
+entries, so a search costs O(log n + k) whatever the number of customers.
+"""
+import re
+from bisect import bisect_left, insort
+
+from table_index import TableIndex
+
+SEARCH_LIMIT = 10
+MIN_PHONE_DIGITS = 3  # shorter digit strings are matched against names
+
+CUSTOMER_INDEX_SQL = 'SELECT CustomerID, Name, PhoneNumber, UpdatedAt FROM Customer'
+CUSTOMER_CHANGES_SQL = CUSTOMER_INDEX_SQL + ' WHERE UpdatedAt >= %s'
+
+_NOT_DIGITS = re.compile(r'[\s()+-]')
+
+
+def _normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def _name_keys(name):
+    words = _normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+def _phone_key(phone):
+    return _NOT_DIGITS.sub('', phone)
+
+
+class CustomerIndex(TableIndex):
+    name = 'customer index'
+    table = 'Customer'
+    changes_sql = CUSTOMER_CHANGES_SQL
+
+    def __init__(self, connect, **kwargs):
+        super().__init__(connect, **kwargs)
+        self._customers = {}  # CustomerID -> (Name, PhoneNumber)
+        self._names = []      # sorted [(name tail, CustomerID)]
+        self._phones = []     # sorted [(digits, CustomerID)]
+
+    def _load(self, cursor):
+        cursor.execute(CUSTOMER_INDEX_SQL)
+        return cursor.fetchall()
+
+    def _reset(self):
+        self._customers, self._names, self._phones = {}, [], []
+
+    def _apply(self, row, keep_sorted=False):
+        customer_id, name, phone = row
+        old = self._customers.get(customer_id)
+        if old == (name, phone):
+            return
+        if old is not None:
+            self._remove(customer_id, old)
+        self._customers[customer_id] = (name, phone)
+
+        entries = [(self._names, (key, customer_id)) for key in _name_keys(name)]
+        entries.append((self._phones, (_phone_key(phone), customer_id)))
+        for keys, entry in entries:
+            if keep_sorted:
+                insort(keys, entry)
+            else:
+                keys.append(entry)
+
+    def _finish_load(self):
+        self._names.sort()
+        self._phones.sort()
+
+    def _remove(self, customer_id, customer):
+        name, phone = customer
+        entries = [(self._names, (key, customer_id)) for key in _name_keys(name)]
+        entries.append((self._phones, (_phone_key(phone), customer_id)))
+        for keys, entry in entries:
+            i = bisect_left(keys, entry)
+            if i < len(keys) and keys[i] == entry:
+                del keys[i]
+
+    def search(self, term, limit=SEARCH_LIMIT):
+        """Up to limit (CustomerID, Name, PhoneNumber) whose name or phone starts with term."""
+        digits = _phone_key(term)
+        phone = len(digits) >= MIN_PHONE_DIGITS and digits.isdigit()
+        prefix = digits if phone else _normalize(term)
+        if not prefix:
+            return []
+
+        with self._lock:
+            # A reload replaces the key lists, so pick one only once the index is fresh
+            self._ensure_fresh()
+            keys = self._phones if phone else self._names
+            found = {}
+            # Tuples sort by key first, so (prefix,) sorts before every entry starting with it
+            i = bisect_left(keys, (prefix,))
+            while i < len(keys) and len(found) < limit:
+                key, customer_id = keys[i]
+                if not key.startswith(prefix):
+                    break
+                found.setdefault(customer_id, self._customers[customer_id])
+                i += 1
+        return [(customer_id, name, phone) for customer_id, (name, phone) in found.items()]
+
+    def stats(self):
+        return {'customers': len(self._customers), 'name_keys': len(self._names), **super().stats()}
@@ -0,0 +1,1127 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+import pymysql
+from pandas.api.types import union_categoricals
+
+from alerts import DEFAULT_LOW_STOCK_BELOW, LOW_STOCK_SQL, AlertIndex
+from customer_search import SEARCH_LIMIT, CustomerIndex
+from outbox import Bookkeeper, Outbox
+from query_cache import QueryCache
+from replica import REPLICA_TABLES, CatalogueReplica
+from sales_analytics import SalesRollup
+from schema_cache import SchemaCache
+from stores import StoreRouter, load_stores
+from tracing import TracedCursor, TracedSSCursor, tracer
+
+# Database connection settings
+DB_CONFIG = {
+    'host': os.environ.get('SUP_DB_HOST', 'localhost'),
+    'user': os.environ.get('SUP_DB_USER', 'root'),
+    'password': os.environ.get('SUP_DB_PASSWORD', 'jichu'),
+    'database': os.environ.get('SUP_DB_NAME', 'sup'),
+}
+
+# The store this process works for, and the database of every store (see stores.py)
+STORE_ID = int(os.environ.get('SUP_STORE_ID', 1))
+STORES = load_stores(os.environ.get('SUP_STORES_FILE'), DB_CONFIG, STORE_ID)
+DB_CONFIG.update(STORES[STORE_ID]['connection'])
+
+# Connection pool settings
+POOL_SIZE = int(os.environ.get('SUP_DB_POOL_SIZE', 8))
+POOL_TIMEOUT = float(os.environ.get('SUP_DB_POOL_TIMEOUT', 10))     # seconds to wait for a free connection
+POOL_IDLE_TIMEOUT = float(os.environ.get('SUP_DB_POOL_IDLE', 300))  # close connections idle longer than this
+POOL_PING_AFTER = float(os.environ.get('SUP_DB_POOL_PING', 30))     # health-check connections idle longer than this
+
+# Checkout retries on lock conflicts
+PURCHASE_RETRIES = int(os.environ.get('SUP_PURCHASE_RETRIES', 3))
+PURCHASE_BACKOFF = 0.05     # seconds before the first retry, doubled on each one
+LOCK_ERRORS = {1205, 1213}  # lock wait timeout, deadlock
+LOCK_WAIT_TIMEOUT = 50      # seconds, MySQL's default innodb_lock_wait_timeout
+# Longest a checkout can take: every attempt may wait for a connection and a
+# lock, then back off. The outbox resolves a checkout that has not reported
+# back only after twice this long.
+CHECKOUT_SECONDS = (
+    (PURCHASE_RETRIES + 1) * (POOL_TIMEOUT + LOCK_WAIT_TIMEOUT)
+    + PURCHASE_BACKOFF * 1.5 * (2 ** PURCHASE_RETRIES - 1)
+)
+# Leave a checkout's Finance and StockFeedback rows to the outbox.py queue
+WRITE_BEHIND = os.environ.get('SUP_WRITE_BEHIND', '1') != '0'
+
+# Serve catalogue reads from the local replica in replica.py
+REPLICA = os.environ.get('SUP_REPLICA', '1') != '0'
+
+# Primary key of every browsable table, used for keyset pagination
+TABLE_KEYS = {
+    'Supplier': ('SupplierID',),
+    'Warehouse': ('TransactionID',),
+    'Supermarket': ('ProductID',),
+    'Customer': ('CustomerID',),
+    'Finance': ('FinanceID',),
+    'StockFeedback': ('ProductID',),
+    'Transactions': ('TransactionID',),
+    'Purchase': ('PurchaseID',),
+}
+
+PAGE_SIZE = 100
+EXACT_COUNT_BELOW = 100000  # use the information_schema estimate for larger tables
+PREFETCH_SLOTS = 8
+PREFETCH_TTL = 30  # seconds a prefetched page stays usable
+
+FULLTEXT_MIN_WORD = 3  # InnoDB innodb_ft_min_token_size
+FRAME_BATCH_ROWS = 50000  # rows converted to typed columns at a time by get_table_frame()
+TOP_N = 10  # products and categories listed by get_sales_summary()
+
+# Hot queries, kept as constants so explain_check.py can EXPLAIN exactly what runs.
+# Filters compare bare columns so the indexes in supermarket.sql can be used.
+CUSTOMER_BY_NAME_SQL = 'SELECT CustomerID, Name, PhoneNumber FROM Customer WHERE Name = %s'
+AVAILABLE_PRODUCTS_SQL = 'SELECT ProductID, ProductName, Quantity FROM Supermarket WHERE Quantity > 0'
+CUSTOMERS_SQL = 'SELECT CustomerID, Name, PhoneNumber FROM Customer'
+SUPPLIERS_SQL = 'SELECT ProductID, SupplierName, ProductID FROM Supplier'
+FINANCE_BOUNDS_SQL = 'SELECT MIN(SummaryDate), MAX(SummaryDate) FROM FinanceDaily'
+NET_PROFIT_SQL = '''
+    SELECT TransactionType, PaymentMethod, SUM(TotalAmount), SUM(TransactionCount)
+    FROM FinanceDaily
+    WHERE SummaryDate BETWEEN %s AND %s
+    GROUP BY TransactionType, PaymentMethod
+    ORDER BY TransactionType, PaymentMethod
+'''
+SALES_HOURLY_SQL = '''
+    SELECT SaleHour, Revenue, LineCount, Baskets, Units
+    FROM SalesHourly
+    WHERE SaleHour >= %s AND SaleHour < %s
+    ORDER BY SaleHour
+'''
+TOP_PRODUCTS_SQL = '''
+    SELECT t.ProductID, s.ProductName, p.Category, t.Revenue, t.Units
+    FROM (
+        SELECT ProductID, SUM(Revenue) AS Revenue, SUM(Units) AS Units
+        FROM SalesDailyProduct
+        WHERE SaleDate >= %s AND SaleDate < %s
+        GROUP BY ProductID
+        ORDER BY Revenue DESC
+        LIMIT %s
+    ) t
+    LEFT JOIN Supermarket s ON s.ProductID = t.ProductID
+    LEFT JOIN Supplier p ON p.ProductID = t.ProductID
+    ORDER BY t.Revenue DESC
+'''
+TOP_CATEGORIES_SQL = '''
+    SELECT COALESCE(p.Category, 'Uncategorized') AS Category, SUM(d.Revenue) AS Revenue, SUM(d.Units)
+    FROM SalesDailyProduct d
+    LEFT JOIN Supplier p ON p.ProductID = d.ProductID
+    WHERE d.SaleDate >= %s AND d.SaleDate < %s
+    GROUP BY Category
+    ORDER BY Revenue DESC
+    LIMIT %s
+'''
+TABLE_ROWS_ESTIMATE_SQL = (
+    'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+)
+
+NUMERIC_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'bigint', 'decimal', 'float', 'double'}
+DATE_TYPES = {'date', 'datetime', 'timestamp'}
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+# Function to get the path of a local file (outbox, replica, archive) kept for the
+# database in use; one per database, so checkouts are never booked against
+# another one. Read when the file is opened, after CLIs have picked their database.
+def local_file_path(kind, suffix='.sqlite3'):
+    # Stores on different servers may use the same database name
+    owner = f"store{STORE_ID}_{DB_CONFIG['database']}" if len(STORES) > 1 else DB_CONFIG['database']
+    return os.environ.get(f'SUP_{kind.upper()}_PATH') or f'{kind}_{owner}{suffix}'
+
+
+# Database connection
+@tracer.traced
+def connect_to_database(**overrides):
+    config = {**DB_CONFIG, 'cursorclass': TracedCursor, **overrides}
+    return pymysql.connect(autocommit=True, **config)
+
+
+class ConnectionPool:
+    """Thread-safe pool of pymysql connections shared by every data helper.
+
+    Connections are health-checked with a ping when they have been idle for a
+    while and are closed once they have been idle longer than idle_timeout.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_timeout=POOL_IDLE_TIMEOUT,
+                 ping_after=POOL_PING_AFTER, connect=connect_to_database):
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self._connect = connect
+        self._idle = deque()  # (connection, returned_at)
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'exhausted': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'evicted_idle': 0,
+        }
+
+    def _evict_idle(self, now):
+        # Oldest connections sit at the left end of the deque
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._open -= 1
+            self._stats['evicted_idle'] += 1
+            _close_quietly(conn)
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, returned_at = None, None
+                    break
+                if not waited:
+                    self._stats['exhausted'] += 1
+                    waited = True
+                remaining = self.timeout - (now - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolExhausted(f'No database connection available after {self.timeout}s')
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += wait
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait)
+
+        if conn is not None and time.monotonic() - returned_at > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                _close_quietly(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['connects'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard:
+                self._open -= 1
+                _close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+            # Lock waits and deadlocks leave the connection usable
+            self.release(conn, discard=not (e.args and e.args[0] in LOCK_ERRORS))
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._open -= 1
+                _close_quietly(conn)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Process-wide pool, created on first use
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_connection():
+    return get_pool().connection()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+# Pools for the other stores' databases, used by the reports across stores
+store_router = StoreRouter(
+    STORES, STORE_ID, get_pool, lambda connection: ConnectionPool(connect=partial(connect_to_database, **connection))
+)
+
+
+def store_stats():
+    return store_router.stats()
+
+
+# Table metadata, loaded once from information_schema
+schema_cache = SchemaCache(get_connection)
+
+
+def get_table_schema(table_name):
+    return schema_cache.table(table_name)
+
+
+def refresh_schema():
+    schema_cache.refresh()
+
+
+# Results of the read-only reference queries; write helpers invalidate what they touch
+query_cache = QueryCache()
+
+
+def cache_stats():
+    return query_cache.stats()
+
+
+# Low-stock and near-expiry alerts, kept in step with the writes that invalidate Supermarket
+alert_index = AlertIndex(get_connection)
+query_cache.subscribe(alert_index.on_invalidate)
+
+
+def alert_stats():
+    return alert_index.stats()
+
+
+# Customer name and phone typeahead, kept in step with writes to Customer
+customer_index = CustomerIndex(get_connection)
+query_cache.subscribe(customer_index.on_invalidate)
+
+
+def customer_index_stats():
+    return customer_index.stats()
+
+
+# Sales rollups for the Dashboard charts, refreshed after checkouts write Finance and Purchase
+sales_rollup = SalesRollup(get_connection, on_written=lambda: query_cache.invalidate('SalesHourly', 'SalesDailyProduct'))
+query_cache.subscribe(sales_rollup.on_invalidate)
+
+
+def sales_rollup_stats():
+    return sales_rollup.stats()
+
+
+# Local copy of Supplier, Supermarket and Customer, kept in step with the
+# writes that invalidate them; opened by the first read
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_replica():
+    global _replica
+    if REPLICA and _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                replica = CatalogueReplica(get_connection, get_table_schema, local_file_path('replica'))
+                query_cache.subscribe(replica.on_invalidate)
+                _replica = replica
+    return _replica
+
+
+def replica_stats():
+    if _replica is None:
+        return {'enabled': REPLICA, 'tables_copied': 0}
+    return {'enabled': REPLICA, **_replica.stats()}
+
+
+# Function to run a read on the replica; returns None when MySQL has to answer it
+def replica_read(tables, sql, params=()):
+    if not REPLICA or not set(tables).issubset(REPLICA_TABLES):
+        return None
+    return get_replica().query(tables, sql, params)
+
+
+# Write-behind queue for checkout bookkeeping; opened by the first deferred checkout
+_bookkeeper = None
+_bookkeeper_lock = threading.Lock()
+
+
+def get_bookkeeper():
+    global _bookkeeper
+    if _bookkeeper is None:
+        with _bookkeeper_lock:
+            if _bookkeeper is None:
+                _bookkeeper = Bookkeeper(
+                    Outbox(local_file_path('outbox'), pending_timeout=2 * CHECKOUT_SECONDS), get_connection,
+                    on_applied=lambda: query_cache.invalidate('Finance', 'StockFeedback')
+                ).start()
+    return _bookkeeper
+
+
+def bookkeeping_stats():
+    if _bookkeeper is None:
+        return {'write_behind': WRITE_BEHIND, 'running': False}
+    return {'write_behind': WRITE_BEHIND, **_bookkeeper.stats()}
+
+
+# Function to get table data
+@tracer.traced
+def get_table_data(table_name, columns=None):
+    select_list = ', '.join(columns) if columns else '*'
+    rows = replica_read((table_name,), f'SELECT {select_list} FROM {table_name}')
+    if rows is not None:
+        return rows
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f'SELECT {select_list} FROM {table_name}')
+            return cursor.fetchall()
+
+# Function to get a whole table (or some of its columns, or the rows a search
+# filter selects) as a typed DataFrame. Rows are streamed from an unbuffered
+# cursor and converted to typed columns a batch at a time, so the full table
+# never exists as Python tuples.
+@tracer.traced
+def get_table_frame(table_name, columns=None, batch_size=FRAME_BATCH_ROWS, search=None):
+    columns = list(columns or get_column_names(table_name))
+    dtypes = get_table_schema(table_name).dtypes()
+    sql, params = table_select(table_name, columns, search, decimals_as_double=True)
+    chunks = []
+    with get_connection() as conn:
+        with conn.cursor(TracedSSCursor) as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                chunks.append(_typed_columns(columns, dtypes, rows))
+    return _join_chunks(columns, dtypes, chunks)
+
+# Function to build the SELECT for a whole table or the rows a search filter selects.
+# With decimals_as_double MySQL sends DECIMALs as doubles, so no Decimal objects are made per row.
+def table_select(table_name, columns, search=None, decimals_as_double=False):
+    _check_table(table_name)
+    types = get_table_schema(table_name).types
+    select_list = ', '.join(
+        f'CAST({column} AS DOUBLE) AS {column}' if decimals_as_double and types.get(column) == 'decimal' else column
+        for column in columns
+    )
+    where = f' WHERE {search[0]}' if search is not None else ''
+    return f'SELECT {select_list} FROM {table_name}{where}', list(search[1]) if search is not None else []
+
+# Function to turn fetched rows into a DataFrame with the table's column types
+def rows_to_frame(table_name, columns, rows):
+    dtypes = get_table_schema(table_name).dtypes()
+    chunks = [_typed_columns(columns, dtypes, rows)] if rows else []
+    return _join_chunks(columns, dtypes, chunks)
+
+def _typed_column(values, dtype):
+    # values is one column of a 2-D object array
+    if dtype == 'category':
+        return pd.Categorical(values)
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(values).astype(dtype)
+    if dtype == 'object':
+        # Text; pandas picks its string dtype
+        return values
+    missing = pd.isna(values)
+    if dtype == 'float64':
+        # DECIMAL arrives as Decimal objects; NULL becomes NaN
+        return np.where(missing, np.nan, values).astype(np.float64) if missing.any() else values.astype(np.float64)
+    if dtype == 'int64':
+        return values.astype(np.int64)
+    if dtype == 'Int64':
+        return pd.arrays.IntegerArray(np.where(missing, 0, values).astype(np.int64), missing)
+    return pd.array(values, dtype=dtype)
+
+def _typed_columns(columns, dtypes, rows):
+    # Transpose once into an object array, then convert each column in bulk
+    values = np.array(rows, dtype=object)
+    return [_typed_column(values[:, i], dtypes.get(column, 'object')) for i, column in enumerate(columns)]
+
+def _join_chunks(columns, dtypes, chunks):
+    data = {}
+    for i, column in enumerate(columns):
+        dtype = dtypes.get(column, 'object')
+        parts = [chunk[i] for chunk in chunks]
+        if not parts:
+            data[column] = pd.Series([], dtype=dtype if dtype != 'object' else None)
+        elif len(parts) == 1:
+            data[column] = pd.Series(parts[0], copy=False)
+        elif dtype == 'category':
+            # Batches saw different values; merge their categories
+            data[column] = pd.Series(union_categoricals(parts), copy=False)
+        else:
+            data[column] = pd.concat([pd.Series(part, copy=False) for part in parts], ignore_index=True)
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+# Function to get column names
+def get_column_names(table_name):
+    return list(get_table_schema(table_name).columns)
+
+def _check_table(table_name):
+    if table_name not in TABLE_KEYS:
+        raise ValueError(f'Unknown table: {table_name}')
+    return TABLE_KEYS[table_name]
+
+def _page_query(table_name, columns, after_key, page_size, search=None):
+    key_columns = _check_table(table_name)
+    conditions = []
+    params = []
+    if search is not None:
+        conditions.append(search[0])
+        params.extend(search[1])
+    if after_key is not None:
+        if len(key_columns) == 1:
+            conditions.append(f'{key_columns[0]} > %s')
+        else:
+            conditions.append(f"({', '.join(key_columns)}) > ({', '.join(['%s'] * len(key_columns))})")
+        params.extend(after_key)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    params.append(page_size)
+    sql = f"SELECT {', '.join(columns)} FROM {table_name}{where} ORDER BY {', '.join(key_columns)} LIMIT %s"
+    return sql, params
+
+def _next_key(table_name, columns, rows, page_size):
+    if len(rows) < page_size:
+        return None
+    key_positions = [columns.index(k) for k in TABLE_KEYS[table_name]]
+    return tuple(rows[-1][i] for i in key_positions)
+
+@tracer.traced
+def _fetch_page(table_name, columns, after_key, page_size, search=None):
+    sql, params = _page_query(table_name, columns, after_key, page_size, search)
+    # Search filters are MySQL SQL, so only plain pages come from the replica
+    rows = replica_read((table_name,), sql, params) if search is None else None
+    if rows is None:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+    return rows, _next_key(table_name, columns, rows, page_size)
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='page-prefetch')
+_prefetched = OrderedDict()  # (table, columns, after_key, page_size, search) -> (future, submitted_at)
+_prefetch_lock = threading.Lock()
+
+def _take_prefetched(slot):
+    with _prefetch_lock:
+        entry = _prefetched.pop(slot, None)
+    if entry is None:
+        return None
+    future, submitted_at = entry
+    if time.monotonic() - submitted_at > PREFETCH_TTL:
+        return None
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+def _prefetch(slot):
+    with _prefetch_lock:
+        if slot in _prefetched:
+            return
+        _prefetched[slot] = (_prefetch_executor.submit(_fetch_page, *slot), time.monotonic())
+        while len(_prefetched) > PREFETCH_SLOTS:
+            _prefetched.popitem(last=False)
+
+# Function to get one page of a table, ordered by primary key.
+# Pass the returned next_key as after_key to get the following page; next_key
+# is None on the last page. search is a filter from build_search_filter(). With
+# prefetch=True the following page is loaded in the background so paging
+# forward does not wait on MySQL.
+@tracer.traced
+def get_table_page(table_name, columns=None, after_key=None, page_size=PAGE_SIZE, search=None, prefetch=False):
+    slot = _page_slot(table_name, columns, after_key, page_size, search)
+    page = _take_prefetched(slot)
+    if page is None:
+        page = _fetch_page(*slot)
+    rows, next_key = page
+
+    if prefetch and next_key is not None:
+        _prefetch(_following_slot(slot, next_key))
+    return rows, next_key
+
+# Page arguments in the canonical form used for prefetching; the key columns
+# are always selected so the next page can be found
+def _page_slot(table_name, columns, after_key, page_size, search):
+    key_columns = _check_table(table_name)
+    columns = list(columns or get_column_names(table_name))
+    for key in key_columns:
+        if key not in columns:
+            columns.insert(0, key)
+    after_key = tuple(after_key) if after_key is not None else None
+    return (table_name, tuple(columns), after_key, page_size, search)
+
+def _following_slot(slot, next_key):
+    table_name, columns, _, page_size, search = slot
+    return (table_name, columns, next_key, page_size, search)
+
+# Function to count table rows, returns (count, is_exact).
+# Filtered counts are always exact; they only touch the matching index entries.
+@tracer.traced
+def count_rows(table_name, search=None):
+    _check_table(table_name)
+    if search is None:
+        rows = replica_read((table_name,), f'SELECT COUNT(*) FROM {table_name}')
+        if rows is not None:
+            return rows[0][0], True
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            if search is not None:
+                cursor.execute(f'SELECT COUNT(*) FROM {table_name} WHERE {search[0]}', search[1])
+                return cursor.fetchone()[0], True
+            cursor.execute(TABLE_ROWS_ESTIMATE_SQL, (table_name,))
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+            if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+                return int(estimate), False
+            cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
+            return cursor.fetchone()[0], True
+
+# Function to get column data types, in table order
+def get_column_types(table_name):
+    return OrderedDict(get_table_schema(table_name).types)
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _date_range(term):
+    match = re.fullmatch(r'(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?', term)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    try:
+        if day:
+            start = date(int(year), int(month), int(day))
+            end = start + timedelta(days=1)
+        elif month:
+            start = date(int(year), int(month), 1)
+            end = date(int(year) + int(month) // 12, int(month) % 12 + 1, 1)
+        else:
+            start, end = date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+    except ValueError:
+        return None
+    return start, end
+
+# Function to translate a search box entry into a parameterized WHERE clause.
+# Returns (sql, params). Text columns match by prefix so the B-tree index on the
+# column can be used, FULLTEXT columns match whole words, numbers match exactly
+# and dates match a year, month or day. match_anywhere=True falls back to a
+# substring scan.
+def build_search_filter(table_name, column, term, column_type, match_anywhere=False):
+    term = term.strip()
+    column_type = column_type.lower()
+
+    if column_type in NUMERIC_TYPES:
+        try:
+            return f'{column} = %s', (Decimal(term),)
+        except InvalidOperation:
+            pass
+    elif column_type in DATE_TYPES:
+        date_range = _date_range(term)
+        if date_range:
+            return f'{column} >= %s AND {column} < %s', date_range
+    elif column in get_table_schema(table_name).fulltext_columns() and not match_anywhere:
+        words = [w for w in re.split(r'[^\w]+', term) if w]
+        if words and all(len(w) >= FULLTEXT_MIN_WORD for w in words):
+            return f'MATCH({column}) AGAINST (%s IN BOOLEAN MODE)', (' '.join(f'+{w}*' for w in words),)
+        # Words shorter than the FULLTEXT token size are not indexed
+        match_anywhere = True
+    elif not match_anywhere:
+        return f'{column} LIKE %s', (_escape_like(term) + '%',)
+
+    if match_anywhere:
+        return f'CAST({column} AS CHAR) LIKE %s', ('%' + _escape_like(term) + '%',)
+    return '1 = 0', ()
+
+# Function to get available products
+@tracer.traced
+@query_cache.cached('Supermarket.ProductID', 'Supermarket.ProductName', 'Supermarket.Quantity')
+def get_available_products():
+    rows = replica_read(('Supermarket',), AVAILABLE_PRODUCTS_SQL)
+    if rows is not None:
+        return rows
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(AVAILABLE_PRODUCTS_SQL)
+            return cursor.fetchall()
+
+# Function to get available customers
+@tracer.traced
+@query_cache.cached('Customer.CustomerID', 'Customer.Name', 'Customer.PhoneNumber')
+def get_available_customers():
+    rows = replica_read(('Customer',), CUSTOMERS_SQL)
+    if rows is not None:
+        return rows
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CUSTOMERS_SQL)
+            return cursor.fetchall()
+
+# Function to get suppliers for the warehouse dropdown
+@tracer.traced
+@query_cache.cached('Supplier.ProductID', 'Supplier.SupplierName')
+def get_suppliers():
+    rows = replica_read(('Supplier',), SUPPLIERS_SQL)
+    if rows is not None:
+        return rows
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(SUPPLIERS_SQL)
+            return cursor.fetchall()
+
+# Function to check if customer name exists
+@tracer.traced
+def check_customer_exists(name):
+    rows = replica_read(('Customer',), CUSTOMER_BY_NAME_SQL, (name,))
+    if rows is not None:
+        return rows[0] if rows else None
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CUSTOMER_BY_NAME_SQL, (name,))
+            return cursor.fetchone()
+
+# Function to find customers whose name or phone number starts with term
+@tracer.traced
+def search_customers(term, limit=SEARCH_LIMIT):
+    return customer_index.search(term, limit)
+
+# Function to create a new customer
+@tracer.traced
+def create_customer(name, phone_number):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # Insert new customer with default cost of 0
+            cursor.execute(
+                'INSERT INTO Customer (Name, PhoneNumber, Cost) VALUES (%s, %s, 0.00)',
+                (name, phone_number)
+            )
+            conn.commit()
+            query_cache.invalidate('Customer')
+            # Get the new customer ID
+            customer_id = cursor.lastrowid
+            return customer_id
+        except Exception as e:
+            conn.rollback()
+            print(f"Error creating customer: {e}")
+            return None
+        finally:
+            cursor.close()
+
+# Function to create a new purchase
+@tracer.traced
+def create_purchase(customer_id, product_id, quantity, payment_method, idempotency_key=None):
+    return create_basket_purchase(customer_id, [(product_id, quantity)], payment_method, idempotency_key)
+
+# Function to check out a basket of (product_id, quantity) lines in one transaction.
+# The sp_checkout_basket procedure locks and checks the stock, decrements it and
+# writes the Purchase and Finance rows set-based, so a basket of any size costs
+# one round-trip. Simultaneous checkouts of the same product cannot oversell;
+# deadlocks and lock wait timeouts are retried with backoff. Pass the same
+# idempotency_key when resubmitting a basket and it is only checked out once.
+# With WRITE_BEHIND the Finance and StockFeedback rows are written shortly
+# after by the outbox.py queue, so the checkout only waits for the stock.
+@tracer.traced
+def create_basket_purchase(customer_id, lines, payment_method, idempotency_key=None):
+    # The procedure writes one Purchase row per product, so repeated products become one line
+    quantities = OrderedDict()
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        return False
+    basket = [[int(product_id), int(quantity)] for product_id, quantity in quantities.items()]
+
+    event_id = None
+    if WRITE_BEHIND:
+        # The queue finds the checkout by its key, so a deferred checkout always has one
+        idempotency_key = idempotency_key or uuid.uuid4().hex
+        try:
+            bookkeeper = get_bookkeeper()
+            payload = {'key': idempotency_key, 'payment_method': payment_method, 'lines': basket}
+            event_id = bookkeeper.outbox.reserve('checkout', payload)
+        except Exception as e:
+            # Without the queue the procedure books the checkout itself
+            print(f"Error queuing checkout bookkeeping, booking it now: {str(e)}")
+    deferred = event_id is not None
+
+    for attempt in range(PURCHASE_RETRIES + 1):
+        try:
+            with get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        'CALL sp_checkout_basket(%s, %s, %s, %s, %s)',
+                        (customer_id, json.dumps(basket), payment_method, idempotency_key, deferred)
+                    )
+                    # The outcome row is 'ok' or 'replayed'; drain it and the CALL status
+                    outcome = cursor.fetchone()
+                    while cursor.nextset():
+                        pass
+        except Exception as e:
+            retryable = isinstance(e, pymysql.err.OperationalError) and e.args and e.args[0] in LOCK_ERRORS
+            if retryable and attempt < PURCHASE_RETRIES:
+                time.sleep(PURCHASE_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+                continue
+            print(f"Error in create_basket_purchase: {str(e)}")
+            # The event stays pending: if the checkout did commit before the
+            # error, the queue still books it, and if not, booking finds nothing
+            return False
+        if not deferred:
+            # The procedure reduces stock, which may flag the product for reorder
+            query_cache.invalidate(
+                'Purchase', 'Finance', 'Supermarket.Quantity', 'Supermarket.IsNeeded',
+                'Warehouse.AvailableStock', 'StockFeedback'
+            )
+            return True
+        # A replayed basket was booked by the checkout that recorded it
+        if outcome and outcome[0] == 'ok':
+            if not bookkeeper.outbox.release(event_id):
+                # The queue gave up waiting and may have found nothing to book yet
+                bookkeeper.outbox.release(bookkeeper.outbox.reserve('checkout', payload))
+            bookkeeper.notify()
+        else:
+            bookkeeper.outbox.discard(event_id)
+        query_cache.invalidate('Purchase', 'Supermarket.Quantity', 'Supermarket.IsNeeded', 'Warehouse.AvailableStock')
+        return True
+
+# Function to get the first and last Finance transaction dates
+@tracer.traced
+@query_cache.cached('Finance')
+def get_finance_date_bounds():
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(FINANCE_BOUNDS_SQL)
+            return cursor.fetchone()
+
+# Function to build a search filter for rows whose date column is within a range (end date inclusive)
+def date_range_filter(column, start_date, end_date):
+    return f'{column} >= %s AND {column} < %s', (start_date, day_after(end_date))
+
+# Function to get the exclusive upper bound of a range ending on end_date
+def day_after(end_date):
+    return pd.to_datetime(end_date).date() + timedelta(days=1)
+
+# Function to build a search filter for Finance rows within a date range (end date inclusive)
+def finance_range_filter(start_date, end_date):
+    return date_range_filter('TransactionDate', start_date, end_date)
+
+# Function to calculate net profit for a date range from the FinanceDaily rollup.
+# Returns (net_profit, [(TransactionType, PaymentMethod, Amount, Transactions), ...])
+@tracer.traced
+@query_cache.cached('Finance')
+def get_net_profit(start_date, end_date):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(NET_PROFIT_SQL, (start_date, end_date))
+            breakdown = cursor.fetchall()
+    return _net_profit(breakdown), breakdown
+
+# Function to calculate net profit for a date range in every store, all at once.
+# Returns ({StoreID: (net_profit, breakdown)}, {StoreID: error}) for the stores
+# that answered and those that did not
+@tracer.traced
+def get_net_profit_by_store(start_date, end_date, store_ids=None):
+    return store_router.scatter(_store_net_profit, start_date, end_date, store_ids=store_ids)
+
+def _store_net_profit(store_id, connect, start_date, end_date):
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(NET_PROFIT_SQL, (start_date, end_date))
+            breakdown = cursor.fetchall()
+    return _net_profit(breakdown), breakdown
+
+def _net_profit(breakdown):
+    # Supply is an expense, Purchase is income
+    return sum(
+        amount if transaction_type == 'Purchase' else -amount
+        for transaction_type, _, amount, _ in breakdown
+        if transaction_type in ('Purchase', 'Supply')
+    )
+
+# Function to rebuild FinanceDaily from Finance, for all history or a date range.
+# Days before the oldest Finance row keep their totals, since archiver.py may
+# have moved their rows to Parquet files.
+@tracer.traced
+def backfill_finance_rollup(start_date=None, end_date=None):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT MIN(TransactionDate) FROM Finance')
+            first = cursor.fetchone()[0]
+            if first is None:
+                return 0
+            start = first.date() if start_date is None else max(pd.to_datetime(start_date).date(), first.date())
+            conditions = ['TransactionDate >= %s']
+            params = [start]
+            if end_date is not None:
+                conditions.append('TransactionDate < %s')
+                params.append(pd.to_datetime(end_date).date() + timedelta(days=1))
+            where = f" WHERE {' AND '.join(conditions)}"
+            summary_where = where.replace('TransactionDate', 'SummaryDate')
+
+            cursor.execute("START TRANSACTION")
+            cursor.execute(f'DELETE FROM FinanceDaily{summary_where}', params)
+            cursor.execute(f'''
+                INSERT INTO FinanceDaily (SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+                SELECT DATE(TransactionDate), TransactionType, PaymentMethod, SUM(Amount), COUNT(*)
+                FROM Finance{where}
+                GROUP BY DATE(TransactionDate), TransactionType, PaymentMethod
+            ''', params)
+            rows = cursor.rowcount
+            cursor.execute("COMMIT")
+            query_cache.invalidate('Finance')
+            return rows
+        except Exception as e:
+            cursor.execute("ROLLBACK")
+            print(f"Error backfilling FinanceDaily: {e}")
+            return None
+        finally:
+            cursor.close()
+
+# Function to get the Dashboard's sales figures for a date range (end date inclusive) from the sales rollups.
+# Returns (hourly, products, categories): [(SaleHour, Revenue, LineCount, Baskets, Units), ...],
+# the top products [(ProductID, ProductName, Category, Revenue, Units), ...] and categories [(Category, Revenue, Units), ...]
+@tracer.traced
+def get_sales_summary(start_date, end_date, top=TOP_N):
+    sales_rollup.warm()
+    return _sales_summary(start_date, end_date, top)
+
+@query_cache.cached('SalesHourly', 'SalesDailyProduct', 'Supplier.Category', 'Supermarket.ProductName')
+def _sales_summary(start_date, end_date, top):
+    end = day_after(end_date)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(SALES_HOURLY_SQL, (start_date, end))
+            hourly = cursor.fetchall()
+            cursor.execute(TOP_PRODUCTS_SQL, (start_date, end, top))
+            products = cursor.fetchall()
+            cursor.execute(TOP_CATEGORIES_SQL, (start_date, end, top))
+            categories = cursor.fetchall()
+    return hourly, products, categories
+
+# Function to recompute the sales rollups for a date range (end date inclusive), or all history
+@tracer.traced
+def rebuild_sales_rollups(start_date=None, end_date=None):
+    try:
+        return sales_rollup.rebuild(start_date, end_date)
+    except Exception as e:
+        print(f"Error rebuilding sales rollups: {e}")
+        return None
+
+# Function to calculate net profit
+def calculate_net_profit(df, start_date, end_date):
+    # Convert date objects to datetime
+    start_datetime = pd.to_datetime(start_date)
+    end_datetime = pd.to_datetime(end_date) + pd.Timedelta(days=1)  # Include the entire end date
+
+    # Filter data by date range
+    mask = (df['TransactionDate'] >= start_datetime) & (df['TransactionDate'] < end_datetime)
+    filtered_df = df.loc[mask]
+
+    # Calculate total supply amount (negative as it's an expense)
+    supply_amount = -filtered_df[filtered_df['TransactionType'] == 'Supply']['Amount'].sum()
+
+    # Calculate total purchase amount (positive as it's income)
+    purchase_amount = filtered_df[filtered_df['TransactionType'] == 'Purchase']['Amount'].sum()
+
+    # Calculate net profit
+    net_profit = supply_amount + purchase_amount
+
+    return net_profit, filtered_df
+
+# Function to add new supplier
+@tracer.traced
+def add_supplier(supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'INSERT INTO Supplier (SupplierID, ProductID, SupplierName, Email, Address, ContactNumber, Category, UnitCost, Quantity) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                (supplier_id, product_id, name, email, address, contact, category, unit_cost, quantity)
+            )
+            conn.commit()
+            query_cache.invalidate('Supplier')
+            return True
+        except Exception as e:
+            print(f"Error adding supplier: {str(e)}")
+            return False
+        finally:
+            cursor.close()
+
+# Function to generate GST number
+@tracer.traced
+def generate_gst():
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT generate_gst_number()')
+            gst_no = cursor.fetchone()[0]
+            return gst_no
+        except Exception as e:
+            print(f"Error generating GST: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+# Function to add new warehouse entry
+@tracer.traced
+def add_warehouse_entry(product_id, product_name, arrival_date, expiry_date, available_stock, gst_no):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'INSERT INTO Warehouse (ProductID, ProductName, ArrivalDate, ExpiryDate, AvailableStock, GSTNo) VALUES (%s, %s, %s, %s, %s, %s)',
+                (product_id, product_name, arrival_date, expiry_date, available_stock, gst_no)
+            )
+            conn.commit()
+            # Warehouse triggers record the supply in Finance and Transactions
+            query_cache.invalidate('Warehouse', 'Finance', 'Transactions')
+            return True
+        except Exception as e:
+            print(f"Error adding warehouse entry: {str(e)}")
+            return False
+        finally:
+            cursor.close()
+
+# Function to get products expiring within their category's alert window
+@tracer.traced
+def get_near_expiry_products():
+    return alert_index.near_expiry()
+
+# Function to get products below their category's low-stock threshold
+@tracer.traced
+def get_low_stock_products():
+    return alert_index.low_stock()
+
+# Function to get low-stock products in every store, all at once.
+# Returns ({StoreID: rows as get_low_stock_products()}, {StoreID: error})
+@tracer.traced
+def get_low_stock_by_store(store_ids=None):
+    return store_router.scatter(_store_low_stock, store_ids=store_ids)
+
+def _store_low_stock(store_id, connect):
+    # This store's alerts are already in memory
+    if store_id == STORE_ID:
+        return alert_index.low_stock()
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(LOW_STOCK_SQL, (DEFAULT_LOW_STOCK_BELOW, DEFAULT_LOW_STOCK_BELOW))
+            return cursor.fetchall()
+
+# Function to set the alert thresholds for a product category
+@tracer.traced
+def set_alert_threshold(category, low_stock_below, expiry_within_days):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'INSERT INTO AlertThreshold (Category, LowStockBelow, ExpiryWithinDays) VALUES (%s, %s, %s) '
+                'ON DUPLICATE KEY UPDATE LowStockBelow = VALUES(LowStockBelow), ExpiryWithinDays = VALUES(ExpiryWithinDays)',
+                (category, low_stock_below, expiry_within_days)
+            )
+            conn.commit()
+            query_cache.invalidate('AlertThreshold')
+            return True
+        except Exception as e:
+            print(f"Error setting alert threshold: {str(e)}")
+            return False
+        finally:
+            cursor.close()
+
+# Function to update IsNeeded and StockFeedback
+@tracer.traced
+def update_stock_status(product_id, current_quantity):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # Start transaction
+            cursor.execute("START TRANSACTION")
+
+            # Update IsNeeded if quantity is below the category's threshold
+            is_needed = 1 if current_quantity < alert_index.low_stock_below(product_id) else 0
+            cursor.execute(
+                'UPDATE Supermarket SET IsNeeded = %s WHERE ProductID = %s',
+                (is_needed, product_id)
+            )
+
+            # If IsNeeded is 1, update or insert into StockFeedback
+            if is_needed:
+                cursor.execute('''
+                    INSERT INTO StockFeedback (ProductID, QuantityNeeded, BadReview)
+                    VALUES (%s, 50, 'Low stock - needs reorder')
+                    ON DUPLICATE KEY UPDATE
+                    QuantityNeeded = 50,
+                    BadReview = 'Low stock - needs reorder'
+                ''', (product_id,))
+
+            cursor.execute("COMMIT")
+            query_cache.invalidate('Supermarket.IsNeeded', 'StockFeedback')
+        except Exception as e:
+            cursor.execute("ROLLBACK")
+            print(f"Error updating stock status: {e}")
+        finally:
+            cursor.close()
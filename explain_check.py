@@ -0,0 +1,92 @@
+"""EXPLAIN every hot query and fail if any of them scans a whole table.
+
+    python explain_check.py
+
+The optimizer prefers a full scan on tiny tables, so tables with fewer than
+--min-rows rows are reported but not judged. Load a realistic dataset first
+(for example with benchmark.py) to get a meaningful answer.
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+from alerts import ALERT_CHANGES_SQL
+from database import CUSTOMER_BY_NAME_SQL, TOP_PRODUCTS_SQL, TOP_N, finance_range_filter, get_connection
+from sales_analytics import FAR_FUTURE, PURCHASE_UNITS_SQL, SALES_LINES_SQL
+
+MIN_ROWS = 1000
+FULL_SCAN_TYPES = {'ALL', 'index'}
+
+
+def hot_queries():
+    today = date.today()
+    range_sql, range_params = finance_range_filter(today - timedelta(days=30), today)
+    return [
+        ('AlertIndex sync', ALERT_CHANGES_SQL, (datetime.now() - timedelta(minutes=1),)),
+        ('check_customer_exists', CUSTOMER_BY_NAME_SQL, ('Amit',)),
+        ('Finance range (net profit)',
+         f'SELECT TransactionType, SUM(Amount) FROM Finance WHERE {range_sql} GROUP BY TransactionType',
+         range_params),
+        ('Finance range (count)', f'SELECT COUNT(*) FROM Finance WHERE {range_sql}', range_params),
+        ('get_net_profit',
+         'SELECT TransactionType, SUM(TotalAmount) FROM FinanceDaily WHERE SummaryDate BETWEEN %s AND %s '
+         'GROUP BY TransactionType',
+         (today - timedelta(days=30), today)),
+        ('Warehouse stock by product', 'SELECT AvailableStock FROM Warehouse WHERE ProductID = %s', (101,)),
+        ('SalesRollup refresh (Finance)', SALES_LINES_SQL, (today, FAR_FUTURE)),
+        ('SalesRollup refresh (Purchase)', PURCHASE_UNITS_SQL, (today, FAR_FUTURE)),
+        ('get_sales_summary top products', TOP_PRODUCTS_SQL, (today - timedelta(days=30), today, TOP_N)),
+    ]
+
+
+def explain(cursor, sql, params):
+    cursor.execute(f'EXPLAIN {sql}', params or None)
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def table_rows(cursor):
+    cursor.execute(
+        'SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()'
+    )
+    return {name.lower(): rows or 0 for name, rows in cursor.fetchall()}
+
+
+def run(min_rows=MIN_ROWS):
+    """Returns a list of (query, table, access type, key, verdict)."""
+    results = []
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            sizes = table_rows(cursor)
+            for name, sql, params in hot_queries():
+                for row in explain(cursor, sql, params):
+                    table = row.get('table') or ''
+                    access = row.get('type')
+                    if sizes.get(table.lower(), 0) < min_rows:
+                        verdict = 'too small to judge'
+                    elif access in FULL_SCAN_TYPES:
+                        verdict = 'FULL SCAN'
+                    else:
+                        verdict = 'ok'
+                    results.append((name, table, access, row.get('key'), verdict))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that hot queries use indexes.')
+    parser.add_argument('--min-rows', type=int, default=MIN_ROWS,
+                        help='skip the verdict for tables smaller than this')
+    args = parser.parse_args(argv)
+
+    results = run(args.min_rows)
+    for name, table, access, key, verdict in results:
+        print(f'{name:<30} {table:<14} {str(access):<8} {str(key):<28} {verdict}')
+    failures = [r for r in results if r[4] == 'FULL SCAN']
+    if failures:
+        print(f'\n{len(failures)} hot queries scan a whole table', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
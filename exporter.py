@@ -0,0 +1,196 @@
+"""Streaming export of a table, or the rows a search or date range selects, to CSV or Parquet.
+
+Rows are read from an unbuffered (server-side) cursor CHUNK_SIZE at a time
+and each chunk is written before the next one is read, so memory use stays
+the same however large the table is. CSV keeps the values exactly as MySQL
+sends them; Parquet (needs pyarrow) gets typed columns, one row group per
+chunk.
+
+    python exporter.py Finance finance.parquet --from 2025-01-01 --to 2025-03-31
+    python exporter.py Customer priya.csv --search Name Priya
+"""
+import argparse
+import csv
+import sys
+import time
+
+from database import (
+    TABLE_KEYS, _join_chunks, _typed_columns, build_search_filter, connect_to_database, date_range_filter,
+    get_column_names, get_column_types, get_table_schema, table_select,
+)
+from tracing import TracedSSCursor, tracer
+
+EXPORT_FORMATS = ('csv', 'parquet')
+CHUNK_SIZE = 20000
+NET_WRITE_TIMEOUT = 3600  # seconds the server waits for a slow reader before giving up
+
+# Date column used by --from/--to and the browser's date range, per table
+DATE_COLUMNS = {
+    'Finance': 'TransactionDate',
+    'Purchase': 'PurchaseDateTime',
+    'Transactions': 'TransactionDate',
+    'Warehouse': 'ArrivalDate',
+    'Customer': 'PurchaseDateTime',
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+def _guess_format(name):
+    return 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def combine_filters(*filters):
+    """ANDs search filters together; None entries are skipped."""
+    filters = [f for f in filters if f is not None]
+    if not filters:
+        return None
+    return ' AND '.join(f'({sql})' for sql, _ in filters), [p for _, params in filters for p in params]
+
+
+def _arrow_schema(columns, dtypes):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ExportError('Writing Parquet files needs pyarrow (pip install pyarrow)')
+    types = {
+        'int64': pa.int64(), 'Int64': pa.int64(), 'float64': pa.float64(), 'boolean': pa.bool_(),
+        'datetime64[ns]': pa.timestamp('ns'),
+    }
+    return pa.schema([(column, types.get(dtypes[column], pa.string())) for column in columns])
+
+
+class _CsvWriter:
+    def __init__(self, destination, columns):
+        self._file = open(destination, 'w', newline='', encoding='utf-8') if isinstance(destination, str) else None
+        self._writer = csv.writer(self._file or destination)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, destination, columns, dtypes, compression='snappy'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._columns = columns
+        # Categoricals are written as strings; Parquet dictionary-encodes them anyway
+        self._dtypes = {c: 'object' if dtypes[c] == 'category' else dtypes[c] for c in columns}
+        self._schema = _arrow_schema(columns, self._dtypes)
+        self._writer = pq.ParquetWriter(destination, self._schema, compression=compression)
+
+    def write(self, rows):
+        frame = _join_chunks(self._columns, self._dtypes, [_typed_columns(self._columns, self._dtypes, rows)])
+        self._writer.write_table(self._pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        self._writer.close()
+
+
+def export_table(table_name, destination, file_format=None, columns=None, search=None,
+                 chunk_size=CHUNK_SIZE, progress=None, compression='snappy'):
+    """Writes the table, or the rows search selects, to destination (a path or file object).
+
+    compression is the Parquet codec, e.g. 'zstd' for smaller files.
+    Returns {'table', 'format', 'rows', 'seconds', 'rows_per_second'}; progress,
+    if given, is called with the same dict after every chunk.
+    """
+    if table_name not in TABLE_KEYS:
+        raise ExportError(f'Unknown table: {table_name}')
+    file_format = file_format or _guess_format(getattr(destination, 'name', destination))
+    if file_format not in EXPORT_FORMATS:
+        raise ExportError(f'Unsupported file format: {file_format}')
+    columns = list(columns or get_column_names(table_name))
+    if file_format == 'parquet':
+        dtypes = get_table_schema(table_name).dtypes()
+        _arrow_schema(columns, dtypes)  # fails early without pyarrow
+    sql, params = table_select(table_name, columns, search, decimals_as_double=file_format == 'parquet')
+
+    result = {'table': table_name, 'format': file_format, 'rows': 0}
+    started = time.perf_counter()
+    # A connection of its own: the export may hold it for minutes
+    conn = connect_to_database()
+    try:
+        with tracer.span('helper', f'export {table_name}') as span:
+            with conn.cursor() as cursor:
+                cursor.execute('SET SESSION net_write_timeout = %s', (NET_WRITE_TIMEOUT,))
+            cursor = conn.cursor(TracedSSCursor)
+            cursor.execute(sql, params)
+            writer = _ParquetWriter(destination, columns, dtypes, compression) if file_format == 'parquet' \
+                else _CsvWriter(destination, columns)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write(rows)
+                    result['rows'] += len(rows)
+                    if progress:
+                        elapsed = time.perf_counter() - started
+                        progress({**result, 'seconds': elapsed,
+                                  'rows_per_second': result['rows'] / elapsed if elapsed else 0.0})
+            finally:
+                writer.close()
+            cursor.close()
+            span.rows = result['rows']
+    finally:
+        # Closing the connection also abandons an unfinished result without reading it
+        conn.close()
+
+    result['seconds'] = time.perf_counter() - started
+    result['rows_per_second'] = result['rows'] / result['seconds'] if result['seconds'] else 0.0
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a table of the supermarket database to CSV or Parquet.')
+    parser.add_argument('table', choices=sorted(TABLE_KEYS))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help='defaults to the file extension')
+    parser.add_argument('--columns', help='comma-separated columns; defaults to all')
+    parser.add_argument('--search', nargs=2, metavar=('COLUMN', 'TERM'), help='same search as the table browser')
+    parser.add_argument('--from', dest='start', help='first date (YYYY-MM-DD) of the table\'s date column')
+    parser.add_argument('--to', dest='end', help='last date (YYYY-MM-DD), inclusive')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    search = None
+    if args.search:
+        column, term = args.search
+        column_types = get_column_types(args.table)
+        if column not in column_types:
+            parser.error(f'{args.table} has no column {column}')
+        search = build_search_filter(args.table, column, term, column_types[column])
+    date_range = None
+    if args.start or args.end:
+        if args.table not in DATE_COLUMNS:
+            parser.error(f'{args.table} has no date column to filter on')
+        date_range = date_range_filter(DATE_COLUMNS[args.table], args.start or '1000-01-01', args.end or '9999-12-30')
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+
+    def progress(result):
+        print(f"\r{result['rows']:,} rows ({result['rows_per_second']:,.0f} rows/s)", end='', file=sys.stderr)
+
+    try:
+        result = export_table(args.table, args.path, args.format, columns, combine_filters(search, date_range),
+                              args.chunk_size, progress)
+    except ExportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(f"Exported {result['rows']:,} rows of {result['table']} to {args.path} "
+          f"in {result['seconds']:.1f}s ({result['rows_per_second']:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
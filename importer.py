@@ -0,0 +1,334 @@
+"""Bulk import of Supplier, Warehouse and Supermarket rows from CSV or Parquet.
+
+Files are read in chunks, validated against the cached table schema and
+loaded through a temporary staging table, one transaction per chunk. The
+Warehouse triggers that record each delivery in Finance and Transactions are
+switched off for the load (@bulk_import) and their rows are written with one
+INSERT ... SELECT per chunk instead.
+
+    python importer.py Warehouse deliveries.csv --rejects rejected.csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pymysql
+
+from database import connect_to_database, get_table_schema, query_cache
+from schema_cache import PANDAS_DTYPES
+
+IMPORTABLE_TABLES = ('Supplier', 'Warehouse', 'Supermarket')
+CHUNK_SIZE = 5000
+
+# CHECK (... >= 0) constraints from supermarket.sql
+NON_NEGATIVE = {
+    'Supplier': ('UnitCost', 'Quantity'),
+    'Warehouse': ('AvailableStock',),
+    'Supermarket': ('Quantity',),
+}
+
+# Set-based versions of trg_finance_after_warehouse_insert and
+# trg_transaction_after_warehouse_insert, run against the staged chunk
+_WAREHOUSE_SIDE_EFFECTS = (
+    '''
+    INSERT INTO Finance (TransactionType, PaymentMethod, Amount, SupplierID)
+    SELECT 'Supply', 'Bank Transfer', s.UnitCost * s.Quantity, s.SupplierID
+    FROM {staging} w JOIN Supplier s ON s.ProductID = w.ProductID
+    ''',
+    '''
+    INSERT INTO Transactions (SupplierID, SupplierName, TransactionDate)
+    SELECT s.SupplierID, s.SupplierName, CURDATE()
+    FROM {staging} w JOIN Supplier s ON s.ProductID = w.ProductID
+    ''',
+)
+
+_TRUE = {'1', 'true', 't', 'yes', 'y'}
+_FALSE = {'0', 'false', 'f', 'no', 'n'}
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def _read_chunks(source, file_format, chunk_size):
+    if file_format == 'csv':
+        yield from pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[''])
+    elif file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise BulkImportError('Reading Parquet files needs pyarrow (pip install pyarrow)')
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise BulkImportError(f'Unsupported file format: {file_format}')
+
+
+def _guess_format(name):
+    return 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def _validate(chunk, schema, columns, table_name):
+    """Coerce a chunk to the column types and split it into (valid, rejected).
+
+    rejected is a DataFrame of the original values plus a Reason column.
+    """
+    reasons = pd.Series('', index=chunk.index)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+
+    clean = pd.DataFrame(index=chunk.index)
+    for column in columns:
+        raw = chunk[column]
+        # Text columns are object or, from pandas 3 on, str
+        if pd.api.types.is_object_dtype(raw) or pd.api.types.is_string_dtype(raw):
+            raw = raw.where(raw.isna(), raw.astype(str).str.strip())
+            raw = raw.mask(raw == '')
+        present = raw.notna()
+        data_type = schema.types[column]
+        dtype = PANDAS_DTYPES.get(data_type, 'object')
+
+        if schema.column_types[column] == 'tinyint(1)':
+            text = raw.astype(str).str.lower()
+            values = pd.Series(pd.NA, index=raw.index, dtype=object)
+            values[text.isin(_TRUE)] = 1
+            values[text.isin(_FALSE)] = 0
+            reject(present & values.isna(), f'{column}: not a boolean')
+        elif dtype in ('Int64', 'float64'):
+            values = pd.to_numeric(raw, errors='coerce')
+            reject(present & values.isna(), f'{column}: not a number')
+            if column in NON_NEGATIVE.get(table_name, ()):
+                reject(values < 0, f'{column}: must not be negative')
+            if dtype == 'Int64':
+                reject(present & values.notna() & (values % 1 != 0), f'{column}: not a whole number')
+                values = values.where(values % 1 == 0).astype('Int64')
+        elif dtype == 'datetime64[ns]':
+            values = pd.to_datetime(raw, errors='coerce')
+            reject(present & values.isna(), f'{column}: not a date')
+            if data_type == 'date':
+                values = values.dt.date
+            else:
+                values = pd.Series(values.dt.to_pydatetime(), index=values.index, dtype=object)
+        else:
+            values = raw
+            max_length = schema.max_length.get(column)
+            if max_length:
+                reject(present & (raw.astype(str).str.len() > max_length), f'{column}: longer than {max_length}')
+
+        if not schema.nullable[column] and not schema.has_default[column]:
+            reject(~present, f'{column}: required')
+        clean[column] = values
+
+    ok = reasons == ''
+    rejected = chunk.loc[~ok].copy()
+    rejected['Reason'] = reasons[~ok]
+    valid = clean.loc[ok].astype(object).where(clean.loc[ok].notna(), None)
+    return valid, rejected
+
+
+def _reject_unknown_products(cursor, valid, rejected, chunk):
+    # Warehouse.ProductID references Supplier.ProductID
+    product_ids = [int(p) for p in valid['ProductID'].dropna().unique()]
+    known = set()
+    if product_ids:
+        cursor.execute(
+            f"SELECT ProductID FROM Supplier WHERE ProductID IN ({', '.join(['%s'] * len(product_ids))})",
+            product_ids
+        )
+        known = {row[0] for row in cursor.fetchall()}
+    unknown = ~valid['ProductID'].isin(known)
+    if unknown.any():
+        extra = chunk.loc[valid.index[unknown.values]].copy()
+        extra['Reason'] = 'ProductID: no supplier for this product'
+        rejected = pd.concat([rejected, extra])
+        valid = valid.loc[~unknown]
+    return valid, rejected
+
+
+class BulkImporter:
+    def __init__(self, table_name, method='insert', chunk_size=CHUNK_SIZE, connection=None):
+        if table_name not in IMPORTABLE_TABLES:
+            raise BulkImportError(f'Bulk import supports {", ".join(IMPORTABLE_TABLES)}, not {table_name}')
+        if method not in ('insert', 'load-data'):
+            raise BulkImportError(f'Unknown load method: {method}')
+        self.table_name = table_name
+        self.method = method
+        self.chunk_size = chunk_size
+        self.schema = get_table_schema(table_name)
+        self.staging = f'import_{table_name.lower()}'
+        # Bulk loads hold a connection for a long time, so they get their own
+        self._conn = connection or connect_to_database(local_infile=method == 'load-data')
+        self._owns_connection = connection is None
+
+    def close(self):
+        if self._owns_connection:
+            self._conn.close()
+
+    def _columns_for(self, header):
+        known = [c for c in self.schema.columns if c in header]
+        missing = [c for c in self.schema.required_columns() if c not in header]
+        if missing:
+            raise BulkImportError(f'Missing required columns for {self.table_name}: {", ".join(missing)}')
+        return known
+
+    def _create_staging(self, cursor, columns):
+        cursor.execute(f'DROP TEMPORARY TABLE IF EXISTS {self.staging}')
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {self.staging} "
+            f"SELECT {', '.join(columns)} FROM {self.table_name} LIMIT 0"
+        )
+
+    def _stage(self, cursor, columns, valid):
+        cursor.execute(f'DELETE FROM {self.staging}')
+        if self.method == 'load-data':
+            self._stage_load_data(cursor, columns, valid)
+        else:
+            cursor.executemany(
+                f"INSERT INTO {self.staging} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+                list(valid.itertuples(index=False, name=None))
+            )
+
+    def _stage_load_data(self, cursor, columns, valid):
+        out = valid.copy()
+        for column in columns:
+            if out[column].dtype == object:
+                out[column] = out[column].map(lambda v: v.replace('\\', '\\\\') if isinstance(v, str) else v)
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(handle, 'w', newline='') as f:
+                out.to_csv(f, header=False, index=False, na_rep='\\N', lineterminator='\n')
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.staging} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})",
+                (path,)
+            )
+        finally:
+            os.remove(path)
+
+    def _publish(self, cursor, columns):
+        cursor.execute("START TRANSACTION")
+        try:
+            cursor.execute("SET @bulk_import = 1")
+            cursor.execute(
+                f"INSERT INTO {self.table_name} ({', '.join(columns)}) "
+                f"SELECT {', '.join(columns)} FROM {self.staging}"
+            )
+            loaded = cursor.rowcount
+            if self.table_name == 'Warehouse':
+                for sql in _WAREHOUSE_SIDE_EFFECTS:
+                    cursor.execute(sql.format(staging=self.staging))
+            cursor.execute("COMMIT")
+            return loaded
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.execute("SET @bulk_import = NULL")
+
+    def _publish_rows(self, cursor, columns, valid, chunk):
+        # A row in the chunk broke a key constraint; load one at a time to find it
+        loaded = 0
+        failed = []
+        for index, row in zip(valid.index, valid.itertuples(index=False, name=None)):
+            try:
+                self._stage(cursor, columns, pd.DataFrame([row], columns=columns))
+                loaded += self._publish(cursor, columns)
+            except (pymysql.err.IntegrityError, pymysql.err.DataError) as e:
+                failed.append((index, str(e.args[-1]) if e.args else str(e)))
+        rejected = chunk.loc[[index for index, _ in failed]].copy()
+        rejected['Reason'] = [reason for _, reason in failed]
+        return loaded, rejected
+
+    def run(self, source, file_format=None, rejects_path=None, progress=None):
+        file_format = file_format or _guess_format(getattr(source, 'name', source))
+        result = {'table': self.table_name, 'rows_read': 0, 'rows_loaded': 0, 'rows_rejected': 0}
+        started = time.perf_counter()
+        rejects_written = False
+        columns = None
+
+        with self._conn.cursor() as cursor:
+            for chunk in _read_chunks(source, file_format, self.chunk_size):
+                chunk.index = range(result['rows_read'] + 1, result['rows_read'] + len(chunk) + 1)
+                result['rows_read'] += len(chunk)
+                if columns is None:
+                    columns = self._columns_for(chunk.columns)
+                    self._create_staging(cursor, columns)
+
+                valid, rejected = _validate(chunk, self.schema, columns, self.table_name)
+                if self.table_name == 'Warehouse' and not valid.empty:
+                    valid, rejected = _reject_unknown_products(cursor, valid, rejected, chunk)
+
+                if not valid.empty:
+                    try:
+                        self._stage(cursor, columns, valid)
+                        result['rows_loaded'] += self._publish(cursor, columns)
+                    except (pymysql.err.IntegrityError, pymysql.err.DataError):
+                        loaded, failed = self._publish_rows(cursor, columns, valid, chunk)
+                        result['rows_loaded'] += loaded
+                        rejected = pd.concat([rejected, failed])
+
+                result['rows_rejected'] += len(rejected)
+                if rejects_path and not rejected.empty:
+                    rejected.to_csv(rejects_path, mode='a' if rejects_written else 'w',
+                                    header=not rejects_written, index_label='Row')
+                    rejects_written = True
+                if progress:
+                    progress(dict(result))
+
+            if columns is not None:
+                cursor.execute(f'DROP TEMPORARY TABLE IF EXISTS {self.staging}')
+
+        if self.table_name == 'Warehouse':
+            query_cache.invalidate('Warehouse', 'Finance', 'Transactions')
+        else:
+            query_cache.invalidate(self.table_name)
+
+        result['seconds'] = time.perf_counter() - started
+        result['rows_per_second'] = result['rows_loaded'] / result['seconds'] if result['seconds'] else 0.0
+        return result
+
+
+def import_file(table_name, source, file_format=None, method='insert', chunk_size=CHUNK_SIZE,
+                rejects_path=None, progress=None):
+    importer = BulkImporter(table_name, method, chunk_size)
+    try:
+        return importer.run(source, file_format, rejects_path, progress)
+    finally:
+        importer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import a CSV or Parquet file into the supermarket database.')
+    parser.add_argument('table', choices=IMPORTABLE_TABLES)
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'parquet'), help='defaults to the file extension')
+    parser.add_argument('--method', choices=('insert', 'load-data'), default='insert',
+                        help='stage chunks with multi-row INSERTs or LOAD DATA LOCAL INFILE')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--rejects', help='write rejected rows and reasons to this CSV file')
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        print(f"\r{result['rows_read']:,} read, {result['rows_loaded']:,} loaded, "
+              f"{result['rows_rejected']:,} rejected", end='', file=sys.stderr)
+
+    try:
+        result = import_file(args.table, args.path, args.format, args.method, args.chunk_size,
+                             args.rejects, progress)
+    except BulkImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    print(f"Loaded {result['rows_loaded']:,} of {result['rows_read']:,} rows into {result['table']} "
+          f"in {result['seconds']:.1f}s ({result['rows_per_second']:,.0f} rows/s), "
+          f"{result['rows_rejected']:,} rejected")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+-- Indexes backing the table browser search (build_search_filter in database.py).
+-- Text columns are searched by prefix (LIKE 'term%'), which a B-tree index can
+-- serve; long free-text columns get a FULLTEXT index for word search.
+
+CREATE INDEX idx_supplier_name ON Supplier (SupplierName);
+CREATE INDEX idx_supplier_category ON Supplier (Category);
+CREATE FULLTEXT INDEX ft_supplier_address ON Supplier (Address);
+CREATE INDEX idx_warehouse_product_name ON Warehouse (ProductName);
+CREATE INDEX idx_supermarket_product_name ON Supermarket (ProductName);
+CREATE INDEX idx_customer_name ON Customer (Name);
+CREATE FULLTEXT INDEX ft_stockfeedback_review ON StockFeedback (BadReview);
+CREATE INDEX idx_transactions_supplier_name ON Transactions (SupplierName);
@@ -0,0 +1,44 @@
+-- Let importer.py switch off the per-row Warehouse triggers for a bulk load.
+-- The importer sets @bulk_import for its session and writes the Finance and
+-- Transactions rows itself with one INSERT ... SELECT per chunk.
+
+DROP TRIGGER IF EXISTS trg_finance_after_warehouse_insert;
+DROP TRIGGER IF EXISTS trg_transaction_after_warehouse_insert;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_finance_after_warehouse_insert
+AFTER INSERT ON Warehouse
+FOR EACH ROW
+BEGIN
+    DECLARE supID INT;
+    DECLARE amount DECIMAL(15,2);
+
+    IF @bulk_import IS NULL THEN
+        SELECT SupplierID, UnitCost * Quantity INTO supID, amount
+        FROM Supplier
+        WHERE ProductID = NEW.ProductID;
+
+        INSERT INTO Finance(TransactionType, PaymentMethod, Amount, SupplierID)
+        VALUES ('Supply', 'Bank Transfer', amount, supID);
+    END IF;
+END $$
+
+CREATE TRIGGER trg_transaction_after_warehouse_insert
+AFTER INSERT ON Warehouse
+FOR EACH ROW
+BEGIN
+    DECLARE supID INT;
+    DECLARE supName VARCHAR(100);
+
+    IF @bulk_import IS NULL THEN
+        SELECT SupplierID, SupplierName INTO supID, supName
+        FROM Supplier
+        WHERE ProductID = NEW.ProductID;
+
+        INSERT INTO Transactions(SupplierID, SupplierName, TransactionDate)
+        VALUES (supID, supName, CURDATE());
+    END IF;
+END $$
+
+DELIMITER ;
@@ -0,0 +1,66 @@
+-- Daily Finance rollup used for net profit (get_net_profit in database.py).
+-- Creates the summary table, the triggers that maintain it and backfills it
+-- from existing history. backfill_finance_rollup() can rebuild any range later.
+
+-- Daily Finance totals, kept up to date by the Finance triggers below
+CREATE TABLE FinanceDaily (
+    SummaryDate DATE NOT NULL,
+    TransactionType VARCHAR(50) NOT NULL,
+    PaymentMethod VARCHAR(50) NOT NULL,
+    TotalAmount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SummaryDate, TransactionType, PaymentMethod)
+);
+
+-- Keep FinanceDaily in step with Finance
+DELIMITER $$
+
+CREATE TRIGGER trg_finance_daily_after_insert
+AFTER INSERT ON Finance
+FOR EACH ROW
+BEGIN
+    INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+    VALUES (DATE(NEW.TransactionDate), NEW.TransactionType, NEW.PaymentMethod, NEW.Amount, 1)
+    ON DUPLICATE KEY UPDATE
+        TotalAmount = TotalAmount + NEW.Amount,
+        TransactionCount = TransactionCount + 1;
+END $$
+
+CREATE TRIGGER trg_finance_daily_after_update
+AFTER UPDATE ON Finance
+FOR EACH ROW
+BEGIN
+    UPDATE FinanceDaily
+    SET TotalAmount = TotalAmount - OLD.Amount,
+        TransactionCount = TransactionCount - 1
+    WHERE SummaryDate = DATE(OLD.TransactionDate)
+      AND TransactionType = OLD.TransactionType
+      AND PaymentMethod = OLD.PaymentMethod;
+
+    INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+    VALUES (DATE(NEW.TransactionDate), NEW.TransactionType, NEW.PaymentMethod, NEW.Amount, 1)
+    ON DUPLICATE KEY UPDATE
+        TotalAmount = TotalAmount + NEW.Amount,
+        TransactionCount = TransactionCount + 1;
+END $$
+
+CREATE TRIGGER trg_finance_daily_after_delete
+AFTER DELETE ON Finance
+FOR EACH ROW
+BEGIN
+    UPDATE FinanceDaily
+    SET TotalAmount = TotalAmount - OLD.Amount,
+        TransactionCount = TransactionCount - 1
+    WHERE SummaryDate = DATE(OLD.TransactionDate)
+      AND TransactionType = OLD.TransactionType
+      AND PaymentMethod = OLD.PaymentMethod;
+END $$
+
+DELIMITER ;
+
+-- Backfill FinanceDaily from existing Finance rows
+DELETE FROM FinanceDaily;
+INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+SELECT DATE(TransactionDate), TransactionType, PaymentMethod, SUM(Amount), COUNT(*)
+FROM Finance
+GROUP BY DATE(TransactionDate), TransactionType, PaymentMethod;
@@ -0,0 +1,18 @@
+-- Indexes for the hot queries in database.py. Run explain_check.py afterwards
+-- to confirm each query does an index lookup rather than a full scan.
+--
+--   Finance range filters and rollup backfills   -> idx_finance_date (covering)
+--   get_low_stock_products (Quantity < 10)       -> idx_supermarket_quantity (covering)
+--   get_near_expiry_products (ExpiryDate range)  -> idx_supermarket_expiry (covering)
+--     (both dropped again by migrations/008_alert_thresholds.sql, since
+--     the alerts are now read from alerts.py's AlertIndex)
+--   check_customer_exists (Name = ?)             -> idx_customer_name, widened to cover PhoneNumber
+--
+-- Warehouse.ProductID is already indexed by its foreign key.
+
+CREATE INDEX idx_finance_date ON Finance (TransactionDate, TransactionType, PaymentMethod, Amount);
+CREATE INDEX idx_supermarket_quantity ON Supermarket (Quantity, ProductName);
+CREATE INDEX idx_supermarket_expiry ON Supermarket (ExpiryDate, Quantity, ProductName);
+
+DROP INDEX idx_customer_name ON Customer;
+CREATE INDEX idx_customer_name ON Customer (Name, PhoneNumber);
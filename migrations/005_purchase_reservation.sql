@@ -0,0 +1,30 @@
+-- Concurrent checkouts (create_basket_purchase in database.py).
+-- PurchaseRequest records idempotency keys, so a checkout that is submitted
+-- twice with the same key is only recorded once. Old keys can be deleted once
+-- a resubmission is no longer possible, e.g.
+--   DELETE FROM PurchaseRequest WHERE CreatedAt < NOW() - INTERVAL 7 DAY;
+-- trg_update_isneeded_on_low_stock updated Supermarket from a Supermarket
+-- trigger, which MySQL rejects, so every purchase that took a product below
+-- 30 units failed. It now sets the flag on the row being updated.
+
+CREATE TABLE PurchaseRequest (
+    IdempotencyKey VARCHAR(64) PRIMARY KEY,
+    CustomerID INT NOT NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_purchase_request_created (CreatedAt)
+);
+
+DROP TRIGGER IF EXISTS trg_update_isneeded_on_low_stock;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_update_isneeded_on_low_stock
+BEFORE UPDATE ON Supermarket
+FOR EACH ROW
+BEGIN
+    IF NEW.Quantity < 30 THEN
+        SET NEW.IsNeeded = TRUE;
+    END IF;
+END $$
+
+DELIMITER ;
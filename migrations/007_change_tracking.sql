@@ -0,0 +1,15 @@
+-- Change detection for refresher.py. Every write to the reference tables
+-- stamps UpdatedAt, so a COUNT(*) and an indexed MAX(UpdatedAt) per table
+-- show whether the cached product, customer and supplier lists are stale.
+
+ALTER TABLE Supplier
+    ADD COLUMN UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_supplier_updated (UpdatedAt);
+
+ALTER TABLE Supermarket
+    ADD COLUMN UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_supermarket_updated (UpdatedAt);
+
+ALTER TABLE Customer
+    ADD COLUMN UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_customer_updated (UpdatedAt);
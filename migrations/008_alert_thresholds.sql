@@ -0,0 +1,33 @@
+-- Per-category thresholds for the low-stock and near-expiry alerts kept by
+-- alerts.py. Categories not listed here use the defaults in alerts.py
+-- (10 units, 7 days), which were the thresholds before this migration.
+-- Needs migrations/007_change_tracking.sql (Supermarket.UpdatedAt).
+--
+-- The alerts are then read from alerts.py's AlertIndex, so no query uses the
+-- Quantity and ExpiryDate indexes of migrations/004_hot_query_indexes.sql any
+-- more while every stock update still maintains them; they are dropped here.
+-- The cross-store low-stock report (alerts.LOW_STOCK_SQL) compares Quantity
+-- with a per-category threshold, which neither index could serve.
+
+CREATE TABLE AlertThreshold (
+    Category VARCHAR(50) PRIMARY KEY,
+    LowStockBelow INT NOT NULL CHECK (LowStockBelow >= 0),
+    ExpiryWithinDays INT NOT NULL CHECK (ExpiryWithinDays >= 0)
+);
+
+INSERT INTO AlertThreshold(Category, LowStockBelow, ExpiryWithinDays) VALUES
+('Vegetables', 20, 3),
+('Leafy Greens', 20, 2),
+('Organic Veggies', 15, 3),
+('Fruits', 20, 3),
+('Dairy', 25, 2),
+('Seafood', 10, 2),
+('Poultry', 30, 5),
+('Baked Goods', 10, 2),
+('Grains', 25, 30),
+('Spices', 10, 30),
+('Confectionery', 10, 30),
+('Sweets', 10, 7);
+
+DROP INDEX idx_supermarket_quantity ON Supermarket;
+DROP INDEX idx_supermarket_expiry ON Supermarket;
@@ -0,0 +1,23 @@
+-- Summary tables behind the Dashboard sales charts, written by
+-- sales_analytics.py. They start empty; the app fills them on its first
+-- refresh, or run `python sales_analytics.py --rebuild` beforehand on a
+-- large database. The index lets a refresh read only the latest Purchase rows.
+
+CREATE TABLE SalesHourly (
+    SaleHour DATETIME PRIMARY KEY,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    LineCount INT NOT NULL DEFAULT 0,
+    Baskets INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE SalesDailyProduct (
+    SaleDate DATE NOT NULL,
+    ProductID INT NOT NULL,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    LineCount INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, ProductID)
+);
+
+CREATE INDEX idx_purchase_datetime ON Purchase (PurchaseDateTime, ProductID, Quantity);
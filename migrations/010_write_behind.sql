@@ -0,0 +1,142 @@
+-- Write-behind bookkeeping for checkouts (outbox.py). With
+-- p_defer_bookkeeping, sp_checkout_basket skips the Finance rows and the
+-- low-stock StockFeedback trigger; the queue books them afterwards, in
+-- batches, and sets PurchaseRequest.FinanceBooked. Existing rows were booked
+-- by the procedure, hence the default. The procedure takes a fifth argument,
+-- p_defer_bookkeeping; pass FALSE to book a checkout in it as before.
+-- Needs migrations/006_checkout_procedure.sql.
+
+ALTER TABLE PurchaseRequest ADD COLUMN FinanceBooked BOOLEAN NOT NULL DEFAULT TRUE;
+
+DROP TRIGGER IF EXISTS trg_auto_feedback_on_low_stock;
+DROP PROCEDURE IF EXISTS sp_checkout_basket;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_auto_feedback_on_low_stock
+AFTER UPDATE ON Warehouse
+FOR EACH ROW
+BEGIN
+    IF NEW.AvailableStock < 20 AND @defer_bookkeeping IS NULL THEN
+        INSERT INTO StockFeedback(ProductID, QuantityNeeded, BadReview)
+        VALUES (NEW.ProductID, 100, 'Stock too low — needs urgent restock')
+        ON DUPLICATE KEY UPDATE QuantityNeeded = 100, BadReview = 'Stock too low — needs urgent restock';
+    END IF;
+END $$
+
+DELIMITER ;
+
+DELIMITER $$
+
+CREATE PROCEDURE sp_checkout_basket(
+    IN p_customer_id INT,
+    IN p_lines JSON,
+    IN p_payment_method VARCHAR(50),
+    IN p_idempotency_key VARCHAR(64),
+    IN p_defer_bookkeeping BOOLEAN
+)
+checkout: BEGIN
+    DECLARE v_lines INT;
+    DECLARE v_product INT DEFAULT NULL;
+    DECLARE v_available INT;
+    DECLARE v_message VARCHAR(128);
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @defer_bookkeeping = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_defer_bookkeeping AND p_idempotency_key IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Deferred bookkeeping needs an idempotency key';
+    END IF;
+
+    DROP TEMPORARY TABLE IF EXISTS checkout_lines;
+    CREATE TEMPORARY TABLE checkout_lines (
+        ProductID INT PRIMARY KEY,
+        Quantity INT NOT NULL,
+        SupplierID INT
+    );
+    INSERT INTO checkout_lines (ProductID, Quantity)
+    SELECT ProductID, SUM(Quantity)
+    FROM JSON_TABLE(p_lines, '$[*]' COLUMNS (ProductID INT PATH '$[0]', Quantity INT PATH '$[1]')) AS line
+    GROUP BY ProductID;
+    SET v_lines = ROW_COUNT();
+
+    IF v_lines = 0 OR EXISTS (SELECT 1 FROM checkout_lines WHERE Quantity <= 0 OR ProductID IS NULL) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Basket is empty or has a line without a positive quantity';
+    END IF;
+
+    START TRANSACTION;
+
+    -- A key that is already recorded means this basket was checked out
+    IF p_idempotency_key IS NOT NULL THEN
+        INSERT IGNORE INTO PurchaseRequest (IdempotencyKey, CustomerID, FinanceBooked)
+        VALUES (p_idempotency_key, p_customer_id, NOT COALESCE(p_defer_bookkeeping, FALSE));
+        IF ROW_COUNT() = 0 THEN
+            ROLLBACK;
+            SELECT 'replayed' AS Outcome;
+            LEAVE checkout;
+        END IF;
+    END IF;
+
+    -- Locking reads see the current stock, not the transaction snapshot
+    SELECT l.ProductID, COALESCE(s.Quantity, 0) INTO v_product, v_available
+    FROM checkout_lines l
+    LEFT JOIN Supermarket s ON s.ProductID = l.ProductID
+    WHERE s.ProductID IS NULL OR s.Quantity < l.Quantity
+    ORDER BY l.ProductID
+    LIMIT 1
+    FOR UPDATE;
+
+    IF v_product IS NULL THEN
+        SELECT l.ProductID, COALESCE(w.AvailableStock, 0) INTO v_product, v_available
+        FROM checkout_lines l
+        LEFT JOIN Warehouse w ON w.ProductID = l.ProductID
+        WHERE w.ProductID IS NULL OR w.AvailableStock < l.Quantity
+        ORDER BY l.ProductID
+        LIMIT 1
+        FOR UPDATE;
+    END IF;
+
+    IF v_product IS NOT NULL THEN
+        SET v_message = CONCAT('Not enough stock (product ', v_product, ': ', v_available, ' available)');
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+
+    UPDATE checkout_lines l
+    JOIN Supplier p ON p.ProductID = l.ProductID
+    SET l.SupplierID = p.SupplierID;
+
+    SELECT ProductID INTO v_product FROM checkout_lines WHERE SupplierID IS NULL LIMIT 1;
+    IF v_product IS NOT NULL THEN
+        SET v_message = CONCAT('No supplier for product ', v_product);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+
+    UPDATE Supermarket s
+    JOIN checkout_lines l ON l.ProductID = s.ProductID
+    SET s.Quantity = s.Quantity - l.Quantity;
+
+    -- trg_auto_feedback_on_low_stock leaves deferred checkouts to outbox.py
+    SET @defer_bookkeeping = IF(p_defer_bookkeeping, TRUE, NULL);
+    UPDATE Warehouse w
+    JOIN checkout_lines l ON l.ProductID = w.ProductID
+    SET w.AvailableStock = w.AvailableStock - l.Quantity;
+    SET @defer_bookkeeping = NULL;
+
+    INSERT INTO Purchase (CustomerID, ProductID, Quantity)
+    SELECT p_customer_id, ProductID, Quantity FROM checkout_lines;
+
+    IF NOT COALESCE(p_defer_bookkeeping, FALSE) THEN
+        INSERT INTO Finance (TransactionType, PaymentMethod, Amount, SupplierID, CustomerID)
+        SELECT 'Purchase', p_payment_method, Quantity * 50.00, SupplierID, p_customer_id  -- Assume ₹50/unit
+        FROM checkout_lines;
+    END IF;
+
+    COMMIT;
+    DROP TEMPORARY TABLE checkout_lines;
+    SELECT 'ok' AS Outcome;
+END $$
+
+DELIMITER ;
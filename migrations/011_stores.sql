@@ -0,0 +1,12 @@
+-- Names the store a database holds, for the store routing in stores.py.
+-- Each store keeps its own database; in a database that is not store 1,
+-- change the row to its StoreID and name in the stores file, e.g.
+--   UPDATE Store SET StoreID = 2, StoreName = 'Jayanagar';
+-- `python stores.py check` confirms every database names the right store.
+
+CREATE TABLE Store (
+    StoreID INT PRIMARY KEY,
+    StoreName VARCHAR(100) NOT NULL
+);
+
+INSERT INTO Store(StoreID, StoreName) VALUES (1, 'Main store');
@@ -0,0 +1,287 @@
+"""Write-behind queue for the bookkeeping of a checkout.
+
+With write-behind on, sp_checkout_basket only checks and decrements the stock
+and records the Purchase rows and the idempotency key; the Finance rows (and
+with them the FinanceDaily totals every checkout used to contend on) and the
+low-stock StockFeedback rows are written afterwards by a Bookkeeper thread.
+
+Each checkout is recorded in a local SQLite outbox before it is sent to
+MySQL, so a booking survives a crash of the app; it becomes ready once the
+checkout has committed. The bookkeeper drains ready events in batches, in the
+order they were queued, with three set-based statements and one commit per
+batch. Applying a batch twice does no harm: a checkout's Finance rows are
+written only while its PurchaseRequest row says FinanceBooked = FALSE, and
+the StockFeedback upsert is recomputed from the current stock. Events whose
+checkout never reported back (the process died mid-checkout) become ready
+after the pending timeout, which must be longer than any checkout can take,
+and are booked only if the checkout committed. A checkout that still reports
+back after that finds its event taken over, and queues it again.
+
+Several processes may share one outbox file; a lease makes sure only one of
+them drains it at a time.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+BATCH_SIZE = 500
+DRAIN_INTERVAL = 0.2      # seconds between drains while the queue is empty
+PENDING_TIMEOUT = 600     # seconds after which an unconfirmed checkout is resolved from MySQL
+LEASE_SECONDS = 30        # a draining process must renew its lease this often
+MAX_ATTEMPTS = 10         # an event failing this often on its own is parked
+RETRY_BACKOFF = 0.5       # seconds before the first retry, doubled up to MAX_BACKOFF
+MAX_BACKOFF = 30
+
+# Event states
+PENDING, READY, PARKED = 0, 1, 2
+
+OUTBOX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        state INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_state ON events (state, id);
+    CREATE TABLE IF NOT EXISTS lease (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+'''
+
+# A batch is passed as one JSON array of [IdempotencyKey, PaymentMethod, ProductID, Quantity]
+_BATCH_LINES = '''JSON_TABLE(%s, '$[*]' COLUMNS (
+        IdempotencyKey VARCHAR(64) PATH '$[0]', PaymentMethod VARCHAR(50) PATH '$[1]',
+        ProductID INT PATH '$[2]', Quantity INT PATH '$[3]'
+    )) AS b'''
+# Amounts as sp_checkout_basket books them (₹50/unit); the date is when the checkout committed
+BOOK_FINANCE_SQL = f'''
+    INSERT INTO Finance (TransactionType, PaymentMethod, Amount, SupplierID, CustomerID, TransactionDate)
+    SELECT 'Purchase', b.PaymentMethod, b.Quantity * 50.00, p.SupplierID, r.CustomerID, r.CreatedAt
+    FROM {_BATCH_LINES}
+    JOIN PurchaseRequest r ON r.IdempotencyKey = b.IdempotencyKey AND r.FinanceBooked = FALSE
+    JOIN Supplier p ON p.ProductID = b.ProductID
+'''
+MARK_BOOKED_SQL = f'''
+    UPDATE PurchaseRequest r
+    JOIN (SELECT DISTINCT IdempotencyKey FROM {_BATCH_LINES}) k ON k.IdempotencyKey = r.IdempotencyKey
+    SET r.FinanceBooked = TRUE
+'''
+# What trg_auto_feedback_on_low_stock does for checkouts made without write-behind
+STOCK_FEEDBACK_SQL = f'''
+    INSERT INTO StockFeedback (ProductID, QuantityNeeded, BadReview)
+    SELECT DISTINCT w.ProductID, 100, 'Stock too low — needs urgent restock'
+    FROM Warehouse w
+    JOIN (SELECT DISTINCT ProductID FROM {_BATCH_LINES}) k ON k.ProductID = w.ProductID
+    WHERE w.AvailableStock < 20
+    ON DUPLICATE KEY UPDATE QuantityNeeded = 100, BadReview = 'Stock too low — needs urgent restock'
+'''
+
+
+class Outbox:
+    """Durable queue of checkouts whose bookkeeping is still to be written."""
+
+    def __init__(self, path, pending_timeout=PENDING_TIMEOUT):
+        self.path = path
+        self.pending_timeout = pending_timeout
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode = WAL')
+        # Every commit is on disk before the checkout goes ahead
+        self._db.execute('PRAGMA synchronous = FULL')
+        self._db.executescript(OUTBOX_SCHEMA)
+        self._lock = threading.Lock()
+        self._owner = f'{socket.gethostname()}:{os.getpid()}'
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def reserve(self, kind, payload):
+        """Queues an event that is not ready yet; returns its id."""
+        return self._execute(
+            'INSERT INTO events (kind, payload, state, created_at) VALUES (?, ?, ?, ?)',
+            (kind, json.dumps(payload), PENDING, time.time())
+        ).lastrowid
+
+    def release(self, event_id):
+        """Marks an event ready to drain, once what it follows up on has committed.
+
+        Returns False if the event was no longer pending: it outlived the
+        pending timeout and may have been drained before the commit, so the
+        caller must queue it again.
+        """
+        cursor = self._execute('UPDATE events SET state = ? WHERE id = ? AND state = ?', (READY, event_id, PENDING))
+        return cursor.rowcount == 1
+
+    def discard(self, event_id):
+        self._execute('DELETE FROM events WHERE id = ?', (event_id,))
+
+    def take(self, limit=BATCH_SIZE):
+        """Returns up to limit [(id, kind, payload, attempts)] in queue order."""
+        # Pending events past the timeout are taken over, so a late release() sees it
+        self._execute(
+            'UPDATE events SET state = ? WHERE state = ? AND created_at < ?',
+            (READY, PENDING, time.time() - self.pending_timeout)
+        )
+        rows = self._execute(
+            'SELECT id, kind, payload, attempts FROM events WHERE state = ? ORDER BY id LIMIT ?', (READY, limit)
+        ).fetchall()
+        return [(event_id, kind, json.loads(payload), attempts) for event_id, kind, payload, attempts in rows]
+
+    def done(self, event_ids):
+        with self._lock:
+            self._db.execute('BEGIN')
+            self._db.executemany('DELETE FROM events WHERE id = ?', [(event_id,) for event_id in event_ids])
+            self._db.execute('COMMIT')
+
+    def failed(self, event_id, error, park=False):
+        self._execute(
+            'UPDATE events SET attempts = attempts + 1, last_error = ?, state = CASE WHEN ? THEN ? ELSE state END '
+            'WHERE id = ?',
+            (str(error)[:500], park, PARKED, event_id)
+        )
+
+    def acquire_lease(self, name='bookkeeper'):
+        """True if this process may drain the outbox for the next LEASE_SECONDS."""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            row = self._db.execute('SELECT owner, expires_at FROM lease WHERE name = ?', (name,)).fetchone()
+            mine = row is None or row[0] == self._owner or row[1] < now
+            if mine:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO lease (name, owner, expires_at) VALUES (?, ?, ?)',
+                    (name, self._owner, now + LEASE_SECONDS)
+                )
+            self._db.execute('COMMIT')
+        return mine
+
+    def counts(self):
+        rows = self._execute('SELECT state, COUNT(*) FROM events GROUP BY state').fetchall()
+        counts = dict(rows)
+        return {'pending': counts.get(PENDING, 0), 'ready': counts.get(READY, 0), 'parked': counts.get(PARKED, 0)}
+
+
+class Bookkeeper:
+    """Drains the outbox into MySQL from a background thread."""
+
+    def __init__(self, outbox, connect, on_applied=None, interval=DRAIN_INTERVAL):
+        self.outbox = outbox
+        self._connect = connect
+        self._on_applied = on_applied  # called after a batch commits, e.g. to invalidate caches
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._backoff = 0
+        self._stats = {'batches': 0, 'events': 0, 'retries': 0, 'parked': 0, 'errors': 0, 'apply_seconds': 0.0}
+        self._drained_at = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='bookkeeper', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        """Drain soon; called after a checkout queues an event."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                drained = self.drain() if self.outbox.acquire_lease() else 0
+            except Exception as e:
+                self._stats['errors'] += 1
+                print(f"Error draining the outbox: {e}")
+                drained = 0
+            if drained:
+                continue
+            self._wake.wait(self._backoff or self.interval)
+            self._wake.clear()
+
+    def drain(self, limit=BATCH_SIZE):
+        """Applies one batch; returns the number of events applied."""
+        events = self.outbox.take(limit)
+        if not events:
+            return 0
+        try:
+            self._apply([payload for _, _, payload, _ in events])
+        except Exception as e:
+            if len(events) == 1:
+                self._failed(events[0], e)
+                return 0
+            # Find the event that fails; the ones queued before it go through
+            self._stats['retries'] += 1
+            applied = 0
+            for event in events:
+                try:
+                    self._apply([event[2]])
+                except Exception as e:
+                    # A parked event no longer holds up the ones after it
+                    if not self._failed(event, e):
+                        break
+                    continue
+                self.outbox.done([event[0]])
+                applied += 1
+            else:
+                self._backoff = 0
+            return applied
+        self.outbox.done([event_id for event_id, _, _, _ in events])
+        self._backoff = 0
+        return len(events)
+
+    def _failed(self, event, error):
+        event_id, _, _, attempts = event
+        park = attempts + 1 >= MAX_ATTEMPTS
+        self.outbox.failed(event_id, error, park)
+        self._stats['errors'] += 1
+        self._stats['parked'] += park
+        self._backoff = min(MAX_BACKOFF, (self._backoff or RETRY_BACKOFF / 2) * 2)
+        print(f"Error booking outbox event {event_id}{' (parked)' if park else ''}: {error}")
+        return park
+
+    def _apply(self, payloads):
+        lines = json.dumps([
+            [payload['key'], payload['payment_method'], product_id, quantity]
+            for payload in payloads for product_id, quantity in payload['lines']
+        ])
+        started = time.perf_counter()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("START TRANSACTION")
+                cursor.execute(BOOK_FINANCE_SQL, (lines,))
+                cursor.execute(MARK_BOOKED_SQL, (lines,))
+                cursor.execute(STOCK_FEEDBACK_SQL, (lines,))
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+        self._stats['batches'] += 1
+        self._stats['events'] += len(payloads)
+        self._stats['apply_seconds'] += time.perf_counter() - started
+        self._drained_at = time.monotonic()
+        if self._on_applied:
+            self._on_applied()
+
+    def stats(self):
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'seconds_since_drain': round(time.monotonic() - self._drained_at, 1) if self._drained_at else None,
+            **self.outbox.counts(),
+            **self._stats,
+        }
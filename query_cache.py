@@ -0,0 +1,194 @@
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 30                     # seconds
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _estimate_size(value):
+    # Query results are sequences of row tuples; count the rows and their cells
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(cell) for cell in row)
+    return size
+
+
+def _cache_key(func, args, kwargs):
+    return (func.__name__, args, tuple(sorted(kwargs.items())))
+
+
+class QueryCache:
+    """LRU cache of query results with a TTL and tag-based invalidation.
+
+    Every entry is tagged with the tables or table.columns it reads. A write
+    invalidates the tags it touches: invalidate('Supermarket.IsNeeded') drops
+    entries tagged with that column or the whole 'Supermarket' table, while
+    invalidate('Supermarket') drops every entry that reads Supermarket.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags, size)
+        self._tags = {}                # tag -> set of keys
+        self._bytes = 0
+        self._generation = 0           # bumped by every invalidation
+        self._tag_generations = {}     # tag -> generation of its last invalidation
+        self._table_generations = {}   # table -> generation of the last invalidation touching it
+        self._cleared_generation = 0
+        self._lock = threading.Lock()
+        self._listeners = []           # called with the tags of every invalidation
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[0]
+
+    def generation(self):
+        """Returns a snapshot to pass to set() for a value read after it."""
+        return self._generation
+
+    def _changed_since(self, tags, generation):
+        if self._cleared_generation > generation:
+            return True
+        for tag in tags:
+            table = tag.split('.', 1)[0]
+            if '.' in tag:
+                changed = max(self._tag_generations.get(tag, 0), self._tag_generations.get(table, 0))
+            else:
+                changed = self._table_generations.get(table, 0)
+            if changed > generation:
+                return True
+        return False
+
+    def set(self, key, value, tags, ttl=None, generation=None):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # A write to what the value reads landed while it was being read; it may be stale
+            if generation is not None and self._changed_since(tags, generation):
+                return
+            if key in self._entries:
+                self._remove(key)
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (value, expires_at, frozenset(tags), size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, _, tags, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for tag in tags:
+                table = tag.split('.', 1)[0]
+                self._tag_generations[tag] = self._generation
+                self._table_generations[table] = self._generation
+                if '.' in tag:
+                    keys |= self._tags.get(tag, set())
+                    keys |= self._tags.get(table, set())
+                else:
+                    for cached_tag, cached_keys in self._tags.items():
+                        if cached_tag == table or cached_tag.startswith(table + '.'):
+                            keys |= cached_keys
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self._stats['invalidations'] += 1
+        self._notify(tags)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared_generation = self._generation
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+        self._notify(())
+
+    def subscribe(self, listener):
+        """Calls listener(tags) after every invalidation; clear() passes no tags."""
+        self._listeners.append(listener)
+
+    def _notify(self, tags):
+        for listener in self._listeners:
+            listener(tags)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def cached(self, *tags, ttl=None):
+        """Decorator caching a read helper's result under its name and arguments.
+
+        Coroutine functions are cached too; a coroutine and a plain helper with
+        the same name share entries, so async_database.py and database.py do.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    key = _cache_key(func, args, kwargs)
+                    hit, value = self.get(key)
+                    if hit:
+                        return value
+                    generation = self._generation
+                    value = await func(*args, **kwargs)
+                    self.set(key, value, tags, ttl, generation)
+                    return value
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    key = _cache_key(func, args, kwargs)
+                    hit, value = self.get(key)
+                    if hit:
+                        return value
+                    generation = self._generation
+                    value = func(*args, **kwargs)
+                    self.set(key, value, tags, ttl, generation)
+                    return value
+            wrapper.uncached = func
+            wrapper.cache_tags = tags
+            wrapper.cache_key = lambda *args, **kwargs: _cache_key(func, args, kwargs)
+            return wrapper
+        return decorator
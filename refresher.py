@@ -0,0 +1,171 @@
+"""Keeps the hot reference lists loaded so page reruns never wait for them.
+
+A background thread publishes fresh results of the helpers in DATASETS into
+database.query_cache, under the same keys the helpers read, so callers of
+database.py and async_database.py alike get them without touching MySQL.
+A dataset is reloaded when
+
+  * a write in this process invalidates one of its tables (immediately),
+  * the change-detection query shows another process changed one of its
+    tables: it compares row counts and MAX(UpdatedAt) per table, which is
+    one cheap round-trip every SUP_REFRESH_INTERVAL seconds,
+  * its snapshot is older than REFRESH_MAX_AGE, as a safety net for changes
+    the counts and timestamps miss.
+
+The same thread keeps database.alert_index and database.customer_index
+synced, so page reruns rarely wait for those either. They follow their tables
+row by row, so the full customer list is no longer kept at all. It also
+refreshes database.sales_rollup, the summary tables behind the Dashboard
+charts, after checkouts, and syncs database.get_replica(), the local copy of the
+catalogue tables that the datasets are loaded from.
+"""
+import os
+import threading
+import time
+
+import database
+from database import get_connection, query_cache
+
+REFRESH_INTERVAL = float(os.environ.get('SUP_REFRESH_INTERVAL', 5))  # seconds between change checks
+REFRESH_MAX_AGE = 300                 # reload a snapshot at least this often
+SNAPSHOT_TTL = REFRESH_MAX_AGE * 2    # outlives the refresh, so readers never see it expire
+
+# Helper name -> tables whose changes make its result stale
+DATASETS = {
+    'get_available_products': ('Supermarket',),
+    'get_suppliers': ('Supplier',),
+}
+TRACKED_TABLES = ('Supermarket', 'Supplier')
+
+CHANGE_SQL = ' UNION ALL '.join(
+    f"SELECT '{table}', COUNT(*), MAX(UpdatedAt) FROM {table}" for table in TRACKED_TABLES
+)
+
+
+class Refresher:
+    def __init__(self, datasets=DATASETS, indexes=None, interval=REFRESH_INTERVAL, max_age=REFRESH_MAX_AGE):
+        self.datasets = datasets
+        self.indexes = indexes if indexes is not None else tuple(
+            index for index in (
+                database.get_replica(), database.alert_index, database.customer_index, database.sales_rollup,
+            ) if index is not None
+        )
+        self.interval = interval
+        self.max_age = max_age
+        self._tokens = {}      # table -> (row count, last change) seen at the last check
+        self._loaded = {}      # dataset -> (loaded_at, rows)
+        self._dirty = set()    # tables invalidated by writes in this process
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'checks': 0, 'refreshes': 0, 'errors': 0, 'refresh_seconds': 0.0}
+        self._checked_at = None
+
+    def start(self):
+        if self._thread is None:
+            query_cache.subscribe(self._on_invalidate)
+            self._thread = threading.Thread(target=self._run, name='refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _on_invalidate(self, tags):
+        with self._lock:
+            if tags:
+                self._dirty.update(tag.split('.', 1)[0] for tag in tags)
+            else:
+                self._dirty.update(TRACKED_TABLES)
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self._stats['errors'] += 1
+                print(f"Error refreshing reference data: {e}")
+            for index in self.indexes:
+                try:
+                    index.warm()
+                except Exception:
+                    # Already counted and printed by the index
+                    pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _change_tokens(self):
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CHANGE_SQL)
+                return {table: (count, changed) for table, count, changed in cursor.fetchall()}
+
+    def refresh(self):
+        """Reloads every stale dataset; returns the names reloaded."""
+        tokens = self._change_tokens()
+        self._stats['checks'] += 1
+        self._checked_at = time.monotonic()
+        with self._lock:
+            changed = {t for t, token in tokens.items() if self._tokens.get(t) != token} | self._dirty
+            self._dirty = set()
+        now = time.monotonic()
+
+        reloaded = []
+        for name, tables in self.datasets.items():
+            loaded = self._loaded.get(name)
+            if loaded is None or now - loaded[0] > self.max_age or changed.intersection(tables):
+                self._load(name)
+                reloaded.append(name)
+        self._tokens = tokens
+        return reloaded
+
+    def _load(self, name):
+        helper = getattr(database, name)
+        started = time.perf_counter()
+        # A write that lands during the load bumps the generation and the
+        # stale result is not published; the write also marks it dirty again
+        generation = query_cache.generation()
+        rows = helper.uncached()
+        query_cache.set(helper.cache_key(), rows, helper.cache_tags, ttl=SNAPSHOT_TTL, generation=generation)
+        self._loaded[name] = (time.monotonic(), len(rows))
+        self._stats['refreshes'] += 1
+        self._stats['refresh_seconds'] += time.perf_counter() - started
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        stats['seconds_since_check'] = time.monotonic() - self._checked_at if self._checked_at else None
+        return stats
+
+    def snapshots(self):
+        now = time.monotonic()
+        return {
+            name: {'rows': rows, 'age_seconds': round(now - loaded_at, 1)}
+            for name, (loaded_at, rows) in self._loaded.items()
+        }
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def start_refresher():
+    """Starts the process-wide refresher once; later calls return the same one."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = Refresher().start()
+    return _refresher
+
+
+def refresher_stats():
+    if _refresher is None:
+        return {'running': False}
+    return _refresher.stats()
+
+
+def snapshot_stats():
+    return _refresher.snapshots() if _refresher is not None else {}
@@ -0,0 +1,313 @@
+"""Local SQLite replica of the catalogue tables: Supplier, Supermarket and Customer.
+
+Read helpers in database.py and async_database.py run their queries against
+the replica instead of MySQL, so a cold page or a cache miss costs a local
+query instead of a round-trip. The replica follows MySQL the same way the
+in-memory indexes do (table_index.py):
+
+  * the first sync copies each table, streamed a batch at a time,
+  * later syncs read only the rows whose UpdatedAt reached the table's
+    high-water mark, less SYNC_OVERLAP for rows committed late,
+  * every max_age seconds, and after QueryCache.clear(), the primary keys are
+    compared with MySQL's so deleted rows drop out.
+
+A read syncs the tables it needs first if a write in this process
+invalidated them or their last sync is older than sync_interval; the
+refresher normally does that in the background. The replica lives in a
+file, one per database, so a restarted app starts from it. If MySQL cannot
+be reached, reads are served from the last synced rows, and the next sync is
+tried after OFFLINE_RETRY seconds.
+
+Only queries that SQLite runs as MySQL does belong here: plain selects with
+%s placeholders. Text columns compare case-insensitively, like MySQL's
+default collation.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from table_index import SYNC_OVERLAP
+from tracing import TracedSSCursor
+
+REPLICA_TABLES = ('Supplier', 'Supermarket', 'Customer')
+REPLICA_SYNC_INTERVAL = 5   # seconds a table is read without syncing it
+REPLICA_MAX_AGE = 600       # compare primary keys with MySQL at least this often
+OFFLINE_RETRY = 5           # seconds between syncs while MySQL cannot be reached
+COPY_BATCH = 10000
+
+# SQLite column type for each MySQL data type; other types are stored as text.
+# DECIMAL_TEXT has text affinity, so amounts keep their scale.
+SQLITE_TYPES = {
+    'tinyint': 'INTEGER',
+    'smallint': 'INTEGER',
+    'mediumint': 'INTEGER',
+    'int': 'INTEGER',
+    'bigint': 'INTEGER',
+    'float': 'REAL',
+    'double': 'REAL',
+    'decimal': 'DECIMAL_TEXT',
+    'date': 'DATE',
+    'datetime': 'DATETIME',
+    'timestamp': 'DATETIME',
+}
+
+STATE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS replica_state (
+        table_name TEXT PRIMARY KEY,
+        columns TEXT NOT NULL,
+        high_water DATETIME
+    )
+'''
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DECIMAL_TEXT', lambda value: Decimal(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _latest(high_water, rows, position):
+    for row in rows:
+        if row[position] is not None and (high_water is None or row[position] > high_water):
+            high_water = row[position]
+    return high_water
+
+
+def _column_sql(schema, column):
+    data_type = SQLITE_TYPES.get(schema.types[column])
+    return f'{column} {data_type}' if data_type else f'{column} TEXT COLLATE NOCASE'
+
+
+def _create_statements(schema):
+    columns = [_column_sql(schema, column) for column in schema.columns]
+    columns.append(f"PRIMARY KEY ({', '.join(schema.primary_key)})")
+    statements = [f"CREATE TABLE {schema.name} ({', '.join(columns)})"]
+    # The same B-tree indexes as in MySQL, so lookups such as a customer by name stay indexed
+    for name, index in schema.indexes.items():
+        if name != 'PRIMARY' and index['type'] == 'BTREE':
+            unique = 'UNIQUE ' if index['unique'] else ''
+            statements.append(
+                f"CREATE {unique}INDEX {schema.name}_{name} ON {schema.name} ({', '.join(index['columns'])})"
+            )
+    return statements
+
+
+class CatalogueReplica:
+    def __init__(self, connect, table_schema, path, tables=REPLICA_TABLES,
+                 sync_interval=REPLICA_SYNC_INTERVAL, max_age=REPLICA_MAX_AGE):
+        self._connect = connect
+        self._table_schema = table_schema  # table name -> schema_cache.TableSchema
+        self.path = path
+        self.tables = tables
+        self.sync_interval = sync_interval
+        self.max_age = max_age
+        self._writer = self._open()
+        self._writer.execute(STATE_SCHEMA)
+        self._readers = queue.SimpleQueue()
+        # table -> (columns, high_water) of the tables copied so far, kept across restarts
+        self._state = {
+            table: (columns.split(','), high_water)
+            for table, columns, high_water in self._writer.execute('SELECT * FROM replica_state')
+        }
+        self._synced_at = {}        # table -> last successful sync in this process
+        self._reconciled_at = {}    # table -> last primary-key comparison in this process
+        self._dirty = set()
+        self._retry_at = 0.0
+        self._offline = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'syncs': 0, 'copies': 0, 'rows_synced': 0, 'rows_deleted': 0,
+            'reads': 0, 'offline_reads': 0, 'errors': 0,
+        }
+
+    def _open(self):
+        db = sqlite3.connect(
+            self.path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+            isolation_level=None, timeout=30,
+        )
+        # Readers keep reading while a sync writes; a sync lost in a crash is redone from MySQL
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        return db
+
+    @contextmanager
+    def _reader(self):
+        try:
+            db = self._readers.get_nowait()
+        except queue.Empty:
+            db = self._open()
+        try:
+            yield db
+        finally:
+            self._readers.put(db)
+
+    # Called by QueryCache.invalidate(); must not block the writer
+    def on_invalidate(self, tags):
+        if not tags:
+            self._dirty.update(self.tables)
+            self._reconciled_at.clear()
+            return
+        self._dirty.update({tag.split('.', 1)[0] for tag in tags}.intersection(self.tables))
+
+    def warm(self):
+        """Syncs every table that is due, e.g. from a background thread."""
+        self._ensure_fresh(self.tables)
+
+    def query(self, tables, sql, params=()):
+        """Runs sql (with %s placeholders) on the replica once tables are synced.
+
+        Returns a list of row tuples, or None if one of the tables was never
+        copied and the caller has to ask MySQL.
+        """
+        if not self._ensure_fresh(tables):
+            return None
+        self._stats['reads'] += 1
+        self._stats['offline_reads'] += self._offline
+        with self._reader() as db:
+            return db.execute(sql.replace('%s', '?'), tuple(params)).fetchall()
+
+    def _due(self, tables):
+        now = time.monotonic()
+        return [
+            table for table in tables
+            if table in self._dirty or now - self._synced_at.get(table, float('-inf')) > self.sync_interval
+        ]
+
+    def _ensure_fresh(self, tables):
+        if self._due(tables) and time.monotonic() >= self._retry_at:
+            with self._lock:
+                # Another reader may have synced them while this one waited
+                due = self._due(tables)
+                if due and time.monotonic() >= self._retry_at:
+                    self._sync(due)
+        return all(table in self._state for table in tables)
+
+    def _sync(self, tables):
+        try:
+            with self._connect() as conn:
+                for table in tables:
+                    self._sync_table(conn, table)
+        except Exception as e:
+            # Serve the last synced rows rather than nothing
+            self._stats['errors'] += 1
+            self._offline = True
+            self._retry_at = time.monotonic() + OFFLINE_RETRY
+            print(f"Error syncing the catalogue replica: {e}")
+            return
+        self._offline = False
+
+    def _sync_table(self, conn, table):
+        # Cleared first, so a write during the sync marks the table again
+        self._dirty.discard(table)
+        schema = self._table_schema(table)
+        state = self._state.get(table)
+        if state is None or state[0] != schema.columns or 'UpdatedAt' not in schema.columns:
+            self._copy(conn, schema)
+        else:
+            now = time.monotonic()
+            # Before the changes, which put back rows inserted while the keys were read
+            if now - self._reconciled_at.get(table, float('-inf')) > self.max_age:
+                self._reconcile(conn, schema)
+            self._apply_changes(conn, schema, state[1])
+        self._synced_at[table] = time.monotonic()
+        self._stats['syncs'] += 1
+
+    def _copy(self, conn, schema):
+        table = schema.name
+        columns = schema.columns
+        updated = columns.index('UpdatedAt') if 'UpdatedAt' in columns else None
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+        high_water = None
+        rows_copied = 0
+        db = self._writer
+        with conn.cursor(TracedSSCursor) as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            db.execute('BEGIN')
+            try:
+                # Readers see the previous copy until the new one commits
+                db.execute(f'DROP TABLE IF EXISTS {table}')
+                for statement in _create_statements(schema):
+                    db.execute(statement)
+                while True:
+                    rows = cursor.fetchmany(COPY_BATCH)
+                    if not rows:
+                        break
+                    db.executemany(insert, rows)
+                    rows_copied += len(rows)
+                    if updated is not None:
+                        high_water = _latest(high_water, rows, updated)
+                db.execute(
+                    'INSERT OR REPLACE INTO replica_state VALUES (?, ?, ?)', (table, ','.join(columns), high_water)
+                )
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        self._state[table] = (list(columns), high_water)
+        self._reconciled_at[table] = time.monotonic()
+        self._stats['copies'] += 1
+        self._stats['rows_synced'] += rows_copied
+
+    def _apply_changes(self, conn, schema, high_water):
+        table = schema.name
+        columns = schema.columns
+        since = high_water - SYNC_OVERLAP if high_water is not None else date.min
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE UpdatedAt >= %s", (since,))
+            rows = cursor.fetchall()
+        if not rows:
+            return
+        high_water = _latest(high_water, rows, columns.index('UpdatedAt'))
+        db = self._writer
+        db.execute('BEGIN')
+        try:
+            db.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+            db.execute('UPDATE replica_state SET high_water = ? WHERE table_name = ?', (high_water, table))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        self._state[table] = (list(columns), high_water)
+        self._stats['rows_synced'] += len(rows)
+
+    def _reconcile(self, conn, schema):
+        """Deletes the rows whose primary key is no longer in MySQL."""
+        table = schema.name
+        keys = schema.primary_key
+        matches = ' AND '.join(f'k.{key} = {table}.{key}' for key in keys)
+        db = self._writer
+        with conn.cursor(TracedSSCursor) as cursor:
+            cursor.execute(f"SELECT {', '.join(keys)} FROM {table}")
+            db.execute('BEGIN')
+            try:
+                db.execute(f"CREATE TEMP TABLE live_keys ({', '.join(keys)}, PRIMARY KEY ({', '.join(keys)}))")
+                while True:
+                    rows = cursor.fetchmany(COPY_BATCH)
+                    if not rows:
+                        break
+                    db.executemany(f"INSERT INTO live_keys VALUES ({', '.join('?' * len(keys))})", rows)
+                deleted = db.execute(
+                    f'DELETE FROM {table} WHERE NOT EXISTS (SELECT 1 FROM live_keys k WHERE {matches})'
+                ).rowcount
+                db.execute('DROP TABLE live_keys')
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        self._reconciled_at[table] = time.monotonic()
+        self._stats['rows_deleted'] += deleted
+
+    def stats(self):
+        now = time.monotonic()
+        synced = [self._synced_at[table] for table in self.tables if table in self._synced_at]
+        return {
+            'offline': self._offline,
+            'tables_copied': len(self._state),
+            'seconds_since_sync': round(now - min(synced), 1) if len(synced) == len(self.tables) else None,
+            **self._stats,
+        }
@@ -0,0 +1,269 @@
+"""Sales rollups behind the Dashboard charts.
+
+SalesRollup reads the Purchase rows of Finance and the Purchase table and
+aggregates them with NumPy/pandas into two summary tables:
+
+  * SalesHourly: revenue, basket lines, baskets and units per hour,
+  * SalesDailyProduct: revenue, basket lines and units per day and product.
+
+A basket is one checkout: sp_checkout_basket writes its Finance rows in one
+statement, so they share CustomerID and TransactionDate. Category is joined
+from Supplier when the rollups are read, so recategorizing a product needs no
+rebuild. The Dashboard reads a few hundred summary rows instead of scanning
+Finance, however many rows Finance has.
+
+Each refresh recomputes the days from the one the previous refresh started
+in and replaces their rows, so it costs one day of sales whatever the length
+of the history. Rows written with an older date (back-dated imports,
+corrections) need their range rebuilt:
+
+    python sales_analytics.py --rebuild --from 2025-01-01
+"""
+import argparse
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from tracing import TracedSSCursor
+
+ROLLUP_INTERVAL = 10     # seconds between refreshes while writes keep coming
+ROLLUP_MAX_AGE = 60      # refresh at least this often, for writes from other processes
+ROLLUP_OVERLAP = timedelta(minutes=5)  # re-read rows committed late with an earlier timestamp
+REBUILD_WINDOW = timedelta(days=7)     # days aggregated per transaction by rebuild()
+FETCH_ROWS = 50000
+FAR_FUTURE = date(9999, 12, 31)
+TO_SECONDS_EPOCH = 62167219200  # TO_SECONDS('1970-01-01 00:00:00')
+
+# Integers only, so a chunk converts to one int64 array; cents keep the sums exact
+SALES_LINES_SQL = '''
+    SELECT TO_SECONDS(f.TransactionDate), COALESCE(p.ProductID, -1), COALESCE(f.CustomerID, -1),
+           CAST(f.Amount * 100 AS SIGNED)
+    FROM Finance f
+    LEFT JOIN Supplier p ON p.SupplierID = f.SupplierID
+    WHERE f.TransactionType = 'Purchase' AND f.TransactionDate >= %s AND f.TransactionDate < %s
+'''
+PURCHASE_UNITS_SQL = '''
+    SELECT TO_SECONDS(PurchaseDateTime), COALESCE(ProductID, -1), Quantity
+    FROM Purchase
+    WHERE PurchaseDateTime >= %s AND PurchaseDateTime < %s
+'''
+ROLLUP_STATE_SQL = 'SELECT NOW(), LEAST(MAX(SaleHour), NOW()) FROM SalesHourly'
+SALES_BOUNDS_SQL = '''
+    SELECT MIN(first), MAX(last) FROM (
+        SELECT MIN(TransactionDate) AS first, MAX(TransactionDate) AS last FROM Finance
+        UNION ALL
+        SELECT MIN(PurchaseDateTime), MAX(PurchaseDateTime) FROM Purchase
+    ) bounds
+'''
+INSERT_HOURLY_SQL = (
+    'INSERT INTO SalesHourly (SaleHour, Revenue, LineCount, Baskets, Units) VALUES (%s, %s, %s, %s, %s)'
+)
+INSERT_DAILY_PRODUCT_SQL = (
+    'INSERT INTO SalesDailyProduct (SaleDate, ProductID, Revenue, LineCount, Units) VALUES (%s, %s, %s, %s, %s)'
+)
+
+
+def _fetch_array(cursor, sql, params, width):
+    """Runs sql on an unbuffered cursor and returns its rows as an int64 array."""
+    cursor.execute(sql, params)
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.int64))
+    return np.concatenate(chunks) if chunks else np.empty((0, width), dtype=np.int64)
+
+
+def aggregate_sales(lines, units):
+    """Returns (hourly, daily_product) DataFrames for arrays of sales lines and purchase units.
+
+    lines has columns (seconds, ProductID, CustomerID, cents) and units
+    (seconds, ProductID, Quantity), with seconds as returned by TO_SECONDS().
+    """
+    lines = pd.DataFrame(lines, columns=['Seconds', 'ProductID', 'CustomerID', 'Cents'])
+    units = pd.DataFrame(units, columns=['Seconds', 'ProductID', 'Units'])
+    for frame in (lines, units):
+        frame['Hour'] = frame['Seconds'] // 3600
+        frame['Day'] = frame['Seconds'] // 86400
+
+    hourly = pd.concat([
+        lines.groupby('Hour').agg(Cents=('Cents', 'sum'), LineCount=('Cents', 'size')),
+        lines.drop_duplicates(['CustomerID', 'Seconds']).groupby('Hour').size().rename('Baskets'),
+        units.groupby('Hour')['Units'].sum(),
+    ], axis=1).fillna(0).astype(np.int64)
+
+    # Lines whose supplier has no product cannot be attributed to one
+    lines = lines[lines['ProductID'] >= 0]
+    units = units[units['ProductID'] >= 0]
+    daily_product = pd.concat([
+        lines.groupby(['Day', 'ProductID']).agg(Cents=('Cents', 'sum'), LineCount=('Cents', 'size')),
+        units.groupby(['Day', 'ProductID'])['Units'].sum(),
+    ], axis=1).fillna(0).astype(np.int64)
+    return hourly, daily_product
+
+
+def _to_datetimes(seconds):
+    return pd.to_datetime(seconds - TO_SECONDS_EPOCH, unit='s').to_pydatetime()
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class SalesRollup:
+    def __init__(self, connect, on_written=None, interval=ROLLUP_INTERVAL, max_age=ROLLUP_MAX_AGE):
+        self._connect = connect
+        self._on_written = on_written  # called after rollup rows are replaced, e.g. to invalidate caches
+        self.interval = interval
+        self.max_age = max_age
+        self._start = None        # first day the next refresh recomputes
+        self._refreshed_at = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'windows': 0, 'rows_read': 0, 'errors': 0, 'refresh_seconds': 0.0}
+
+    # Called by QueryCache.invalidate(); must not block the writer
+    def on_invalidate(self, tags):
+        tables = {tag.split('.', 1)[0] for tag in tags}
+        if not tags or tables & {'Finance', 'Purchase'}:
+            self._dirty = True
+
+    def warm(self):
+        """Refreshes the rollups if sales were written since the last refresh, or they are old."""
+        with self._lock:
+            age = time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+            if age is not None and age < self.max_age and (not self._dirty or age < self.interval):
+                return
+            try:
+                self._refresh()
+            except Exception as e:
+                # The Dashboard keeps reading the last rollups
+                self._stats['errors'] += 1
+                print(f"Error refreshing sales rollups: {e}")
+
+    def _refresh(self):
+        self._dirty = False
+        started = time.perf_counter()
+        with self._connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(ROLLUP_STATE_SQL)
+                now, last_hour = cursor.fetchone()
+            if self._start is None and last_hour is None:
+                # Nothing rolled up yet
+                self._rebuild(conn)
+            else:
+                start = self._start or last_hour.date()
+                self._rollup_window(conn, start, FAR_FUTURE)
+        self._start = (now - ROLLUP_OVERLAP).date()
+        self._refreshed_at = time.monotonic()
+        self._stats['refreshes'] += 1
+        self._stats['refresh_seconds'] += time.perf_counter() - started
+
+    def rebuild(self, start_date=None, end_date=None):
+        """Recomputes the rollups from start_date to end_date (inclusive), or all history.
+
+        Returns the number of sales lines and purchases read.
+        """
+        with self._lock:
+            with self._connect() as conn:
+                return self._rebuild(conn, start_date, end_date)
+
+    def _rebuild(self, conn, start_date=None, end_date=None):
+        with conn.cursor() as cursor:
+            cursor.execute(SALES_BOUNDS_SQL)
+            first, last = cursor.fetchone()
+        if first is None:
+            return 0
+        # Days before the first sale left in MySQL keep their rollups: archiver.py
+        # may have moved their rows to Parquet files
+        start = max(pd.to_datetime(start_date).date(), first.date()) if start_date is not None else first.date()
+        # Without an end the last window stays open, so nothing written meanwhile is missed
+        end = pd.to_datetime(end_date).date() + timedelta(days=1) if end_date is not None else None
+        stop = min(end, last.date() + timedelta(days=1)) if end is not None else last.date() + timedelta(days=1)
+        rows = 0
+        while True:
+            window_end = start + REBUILD_WINDOW
+            if window_end >= stop:
+                rows += self._rollup_window(conn, start, end or FAR_FUTURE)
+                return rows
+            rows += self._rollup_window(conn, start, window_end)
+            start = window_end
+
+    def _rollup_window(self, conn, start, end):
+        """Replaces the rollup rows of the days from start up to (not including) end."""
+        with conn.cursor(TracedSSCursor) as cursor:
+            lines = _fetch_array(cursor, SALES_LINES_SQL, (start, end), 4)
+            units = _fetch_array(cursor, PURCHASE_UNITS_SQL, (start, end), 3)
+        hourly, daily_product = aggregate_sales(lines, units)
+
+        hour_rows = list(zip(
+            _to_datetimes(hourly.index.to_numpy() * 3600), map(_money, hourly['Cents']),
+            hourly['LineCount'].tolist(), hourly['Baskets'].tolist(), hourly['Units'].tolist(),
+        ))
+        days = daily_product.index.get_level_values('Day').to_numpy()
+        product_rows = list(zip(
+            [d.date() for d in _to_datetimes(days * 86400)],
+            daily_product.index.get_level_values('ProductID').tolist(), map(_money, daily_product['Cents']),
+            daily_product['LineCount'].tolist(), daily_product['Units'].tolist(),
+        ))
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("START TRANSACTION")
+            cursor.execute('DELETE FROM SalesHourly WHERE SaleHour >= %s AND SaleHour < %s', (start, end))
+            cursor.execute('DELETE FROM SalesDailyProduct WHERE SaleDate >= %s AND SaleDate < %s', (start, end))
+            if hour_rows:
+                cursor.executemany(INSERT_HOURLY_SQL, hour_rows)
+            if product_rows:
+                cursor.executemany(INSERT_DAILY_PRODUCT_SQL, product_rows)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+        if self._on_written:
+            self._on_written()
+
+        self._stats['windows'] += 1
+        self._stats['rows_read'] += len(lines) + len(units)
+        return len(lines) + len(units)
+
+    def stats(self):
+        return {
+            'seconds_since_refresh': round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at else None,
+            'refreshing_from': self._start.isoformat() if self._start else None,
+            **self._stats,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh or rebuild the sales rollups behind the Dashboard charts.')
+    parser.add_argument('--rebuild', action='store_true', help='recompute a date range instead of the latest days')
+    parser.add_argument('--from', dest='start', help='first date (YYYY-MM-DD) to rebuild; defaults to the first sale')
+    parser.add_argument('--to', dest='end', help='last date (YYYY-MM-DD) to rebuild, inclusive')
+    args = parser.parse_args(argv)
+
+    # database.py creates the process-wide rollup; importing it here avoids a cycle
+    import database
+
+    started = time.perf_counter()
+    if args.rebuild:
+        rows = database.rebuild_sales_rollups(args.start, args.end)
+        if rows is None:
+            return 1
+        print(f"Rebuilt the sales rollups from {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    else:
+        database.sales_rollup.warm()
+        print(f"Refreshed the sales rollups in {time.perf_counter() - started:.1f}s: {database.sales_rollup.stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
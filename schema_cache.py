@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+
+SCHEMA_CHECK_INTERVAL = 60  # seconds between schema-version checks
+
+# pandas dtype for each MySQL data type
+PANDAS_DTYPES = {
+    'tinyint': 'Int64',
+    'smallint': 'Int64',
+    'mediumint': 'Int64',
+    'int': 'Int64',
+    'bigint': 'Int64',
+    'decimal': 'float64',
+    'float': 'float64',
+    'double': 'float64',
+    'date': 'datetime64[ns]',
+    'datetime': 'datetime64[ns]',
+    'timestamp': 'datetime64[ns]',
+}
+INTEGER_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'bigint'}
+# Low-cardinality text columns, stored once per distinct value in a DataFrame
+CATEGORICAL_COLUMNS = {'Category', 'TransactionType', 'PaymentMethod'}
+
+# Columns and indexes of every table in one round-trip
+_SCHEMA_QUERY = '''
+    SELECT 'column', TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE,
+           CHARACTER_MAXIMUM_LENGTH, COLUMN_DEFAULT IS NOT NULL, EXTRA
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    UNION ALL
+    SELECT 'index', TABLE_NAME, COLUMN_NAME, SEQ_IN_INDEX, INDEX_NAME, INDEX_TYPE, NON_UNIQUE,
+           NULL, NULL, NULL
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+'''
+
+# Changes whenever a table, column or index is added, dropped or rebuilt
+_VERSION_QUERY = '''
+    SELECT
+        (SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()),
+        (SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()),
+        (SELECT MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE())
+'''
+
+
+class TableSchema:
+    def __init__(self, name):
+        self.name = name
+        self.columns = []               # column names in table order
+        self.types = OrderedDict()      # column -> MySQL DATA_TYPE (e.g. 'varchar')
+        self.column_types = {}          # column -> full COLUMN_TYPE (e.g. 'varchar(100)')
+        self.nullable = {}
+        self.max_length = {}            # column -> character limit, text columns only
+        self.has_default = {}           # column -> True if an INSERT may omit it
+        self.auto_increment = set()
+        self.primary_key = ()
+        self.indexes = {}               # index name -> {'columns', 'unique', 'type'}
+
+    def dtypes(self):
+        dtypes = {}
+        for column, data_type in self.types.items():
+            if self.column_types[column] == 'tinyint(1)':
+                dtypes[column] = 'boolean'
+            elif data_type == 'enum' or column in CATEGORICAL_COLUMNS:
+                dtypes[column] = 'category'
+            elif data_type in INTEGER_TYPES and not self.nullable[column]:
+                # Nothing to mask, so a plain numpy column will do
+                dtypes[column] = 'int64'
+            else:
+                dtypes[column] = PANDAS_DTYPES.get(data_type, 'object')
+        return dtypes
+
+    def required_columns(self):
+        # Columns an INSERT must supply a non-NULL value for
+        return [
+            column for column in self.columns
+            if not self.nullable[column] and not self.has_default[column]
+        ]
+
+    def fulltext_columns(self):
+        return {
+            index['columns'][0] for index in self.indexes.values()
+            if index['type'] == 'FULLTEXT' and len(index['columns']) == 1
+        }
+
+    def indexed_prefix_columns(self):
+        # Columns that lead a B-tree index, so LIKE 'term%' can use it
+        return {
+            index['columns'][0] for index in self.indexes.values()
+            if index['type'] == 'BTREE'
+        }
+
+
+class SchemaCache:
+    """In-process copy of table metadata read from information_schema.
+
+    The whole schema is loaded in one query and kept until refresh() is
+    called or the cheap schema-version check notices a DDL change.
+    """
+
+    def __init__(self, connection_factory, check_interval=SCHEMA_CHECK_INTERVAL):
+        self._connection_factory = connection_factory
+        self.check_interval = check_interval
+        self._tables = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _query(self, sql):
+        with self._connection_factory() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                return cursor.fetchall()
+
+    def _load(self):
+        version = self._query(_VERSION_QUERY)[0]
+        tables = {}
+        index_parts = []
+        for kind, table, column, position, a, b, c, max_length, has_default, extra in self._query(_SCHEMA_QUERY):
+            schema = tables.setdefault(table, TableSchema(table))
+            if kind == 'column':
+                schema.columns.append((position, column))
+                schema.types[column] = a
+                schema.column_types[column] = b
+                schema.nullable[column] = c == 'YES'
+                schema.max_length[column] = max_length
+                auto_increment = 'auto_increment' in (extra or '')
+                schema.has_default[column] = bool(has_default) or auto_increment
+                if auto_increment:
+                    schema.auto_increment.add(column)
+            else:
+                index_parts.append((table, a, position, column, b, str(c) == '0'))
+
+        for schema in tables.values():
+            schema.columns.sort()
+            schema.columns = [column for _, column in schema.columns]
+            schema.types = OrderedDict((column, schema.types[column]) for column in schema.columns)
+
+        for table, index_name, _, column, index_type, unique in sorted(index_parts):
+            index = tables[table].indexes.setdefault(
+                index_name, {'columns': [], 'unique': unique, 'type': index_type}
+            )
+            index['columns'].append(column)
+        for schema in tables.values():
+            if 'PRIMARY' in schema.indexes:
+                schema.primary_key = tuple(schema.indexes['PRIMARY']['columns'])
+
+        self._tables = tables
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def _ensure_current(self):
+        with self._lock:
+            if self._tables is None:
+                self._load()
+            elif time.monotonic() - self._checked_at > self.check_interval:
+                if self._query(_VERSION_QUERY)[0] != self._version:
+                    self._load()
+                else:
+                    self._checked_at = time.monotonic()
+
+    def refresh(self):
+        with self._lock:
+            self._load()
+
+    def table(self, table_name):
+        self._ensure_current()
+        try:
+            return self._tables[table_name]
+        except KeyError:
+            # Lookups are case-insensitive on most MySQL installs
+            for name, schema in self._tables.items():
+                if name.lower() == table_name.lower():
+                    return schema
+            raise ValueError(f'Unknown table: {table_name}')
+
+    def tables(self):
+        self._ensure_current()
+        return dict(self._tables)
@@ -0,0 +1,170 @@
+"""Hammer one product with concurrent checkouts and check nothing is oversold.
+
+    python stock_loadtest.py --clients 16 --purchases 50 --stock 500
+
+Runs against the benchmark database (see benchmark.py generate) by default,
+because it resets the product's stock and creates one customer per purchase.
+Every client checks out the same ProductID through create_purchase(); every
+tenth purchase is submitted twice with the same idempotency key. Afterwards
+the units sold must match the stock that was taken, stock must not be
+negative and no more than the starting stock may have been sold.
+Clients beyond SUP_DB_POOL_SIZE queue for a connection, as app sessions do.
+"""
+import argparse
+import sys
+import threading
+import time
+
+import database
+from database import DB_CONFIG, get_connection
+
+BENCH_DATABASE = 'sup_bench'
+
+
+def _pick_product(cursor, product_id):
+    if product_id is None:
+        cursor.execute(
+            'SELECT s.ProductID FROM Supermarket s JOIN Supplier p ON p.ProductID = s.ProductID '
+            'ORDER BY s.ProductID LIMIT 1'
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise SystemExit('No products found; run benchmark.py generate first')
+        product_id = row[0]
+    return product_id
+
+
+def _stock(cursor, product_id):
+    cursor.execute('SELECT Quantity FROM Supermarket WHERE ProductID = %s', (product_id,))
+    shelf = cursor.fetchone()[0]
+    cursor.execute('SELECT MIN(AvailableStock) FROM Warehouse WHERE ProductID = %s', (product_id,))
+    return shelf, cursor.fetchone()[0]
+
+
+def setup(product_id, stock, customers):
+    """Resets the product's stock and creates fresh customers; returns (product_id, customer IDs)."""
+    run_id = int(time.time())
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            product_id = _pick_product(cursor, product_id)
+            cursor.execute('UPDATE Supermarket SET Quantity = %s WHERE ProductID = %s', (stock, product_id))
+            cursor.execute('UPDATE Warehouse SET AvailableStock = %s WHERE ProductID = %s', (stock, product_id))
+            cursor.executemany(
+                'INSERT INTO Customer (Name, PhoneNumber, Cost) VALUES (%s, %s, 0.00)',
+                [(f'Load {run_id} {i}', f'6{run_id % 10**4:04d}{i:05d}') for i in range(customers)]
+            )
+            cursor.execute(
+                'SELECT CustomerID FROM Customer WHERE Name LIKE %s ORDER BY CustomerID',
+                (f'Load {run_id} %',)
+            )
+            customer_ids = [row[0] for row in cursor.fetchall()]
+    database.query_cache.clear()
+    return product_id, customer_ids, run_id
+
+
+def run(clients=8, purchases=50, stock=None, quantity=1, product_id=None):
+    stock = stock if stock is not None else clients * purchases * quantity // 2
+    product_id, customer_ids, run_id = setup(product_id, stock, clients * purchases)
+
+    results = {'succeeded': 0, 'rejected': 0, 'replays': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(clients)
+
+    def client(n):
+        mine = customer_ids[n * purchases:(n + 1) * purchases]
+        start.wait()
+        for i, customer_id in enumerate(mine):
+            key = f'load-{run_id}-{n}-{i}'
+            ok = database.create_purchase(customer_id, product_id, quantity, 'Cash', idempotency_key=key)
+            replayed = False
+            if ok and i % 10 == 0:
+                # Resubmitting the same basket must not sell it again
+                replayed = database.create_purchase(customer_id, product_id, quantity, 'Cash', idempotency_key=key)
+            with lock:
+                results['succeeded' if ok else 'rejected'] += 1
+                results['replays'] += replayed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            shelf, warehouse = _stock(cursor, product_id)
+            cursor.execute(
+                "SELECT COALESCE(SUM(Quantity), 0) FROM Purchase WHERE ProductID = %s "
+                f"AND CustomerID IN ({', '.join(['%s'] * len(customer_ids))})",
+                [product_id] + customer_ids
+            )
+            sold = int(cursor.fetchone()[0])
+
+    attempts = clients * purchases
+    return {
+        'product_id': product_id,
+        'clients': clients,
+        'attempts': attempts,
+        'quantity': quantity,
+        'starting_stock': stock,
+        'units_requested': attempts * quantity,
+        'units_sold': sold,
+        'succeeded': results['succeeded'],
+        'rejected': results['rejected'],
+        'replays': results['replays'],
+        'shelf_stock': shelf,
+        'warehouse_stock': warehouse,
+        'seconds': elapsed,
+        'purchases_per_second': attempts / elapsed if elapsed else 0.0,
+        'pool': database.pool_stats(),
+    }
+
+
+def check(report):
+    """Returns the list of invariants the run broke."""
+    problems = []
+    if report['units_sold'] > report['starting_stock']:
+        problems.append(f"oversold: {report['units_sold']} sold from {report['starting_stock']}")
+    if report['units_sold'] != report['succeeded'] * report['quantity']:
+        problems.append(f"{report['succeeded']} successful checkouts but {report['units_sold']} units recorded")
+    for name in ('shelf_stock', 'warehouse_stock'):
+        expected = report['starting_stock'] - report['units_sold']
+        if report[name] != expected:
+            problems.append(f"{name} is {report[name]}, expected {expected}")
+    if report['units_requested'] > report['starting_stock'] and report['units_sold'] < report['starting_stock']:
+        problems.append(f"stock left unsold although demand exceeded it ({report['units_sold']} sold)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent checkout load test for one product.')
+    parser.add_argument('--database', default=BENCH_DATABASE, help=f'defaults to {BENCH_DATABASE}')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent tills')
+    parser.add_argument('--purchases', type=int, default=50, help='checkouts per client')
+    parser.add_argument('--stock', type=int, help='starting stock; defaults to half the demand')
+    parser.add_argument('--quantity', type=int, default=1, help='units per checkout')
+    parser.add_argument('--product-id', type=int, help='defaults to the lowest ProductID')
+    args = parser.parse_args(argv)
+
+    # Point the shared pool at the load-test database before first use
+    DB_CONFIG['database'] = args.database
+    report = run(args.clients, args.purchases, args.stock, args.quantity, args.product_id)
+
+    print(f"{report['attempts']:,} checkouts from {report['clients']} clients in {report['seconds']:.2f}s "
+          f"({report['purchases_per_second']:,.1f}/s)")
+    print(f"{report['succeeded']:,} succeeded, {report['rejected']:,} rejected, "
+          f"{report['replays']:,} resubmissions absorbed")
+    print(f"{report['units_sold']:,} of {report['starting_stock']:,} units sold; "
+          f"shelf {report['shelf_stock']}, warehouse {report['warehouse_stock']} left")
+    print(f"pool: {report['pool']['checkouts']:,} checkouts, {report['pool']['exhausted']} exhausted")
+
+    problems = check(report)
+    for problem in problems:
+        print(f'FAIL: {problem}', file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Store routing: which MySQL database holds each store's data.
+
+Every store has a database of its own with the schema of supermarket.sql and
+a one-row Store table naming it, so one store's Finance, Purchase and
+Warehouse rows never grow with the others'. The stores are listed in a JSON
+file named by SUP_STORES_FILE:
+
+    {
+        "1": {"name": "Indiranagar", "database": "sup_store1"},
+        "2": {"name": "Jayanagar", "host": "10.0.0.12", "database": "sup"}
+    }
+
+Settings a store leaves out (host, user, password, database) come from the
+SUP_DB_* variables. Without the file there is a single store, SUP_STORE_ID,
+in the SUP_DB_* database.
+
+A process (the app, the API, a CLI) works for one store, SUP_STORE_ID
+(default 1): database.py connects to that store's database, and every helper,
+cache and index in the process belongs to it. Reports across stores go
+through StoreRouter.scatter(), which runs a function against every store's
+database in parallel and collects the results by StoreID. A store that cannot
+be reached is reported with its error instead of failing the whole report.
+
+    python stores.py check                   # can every store be reached, and is it the right one?
+    python stores.py report --from 2025-01-01 --to 2025-01-31
+"""
+import argparse
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+
+from tracing import current_span, set_current_span
+
+CONNECTION_SETTINGS = ('host', 'user', 'password', 'database', 'port')
+SCATTER_WORKERS = 16
+SCATTER_TIMEOUT = 30   # seconds a cross-store report waits for the slowest store
+
+STORE_SQL = 'SELECT StoreID, StoreName FROM Store'
+
+
+def load_stores(path, defaults, store_id):
+    """Returns {StoreID: {'name': ..., 'connection': {...}}} from a stores file, or the one default store."""
+    if not path:
+        return OrderedDict([(store_id, {'name': f'Store {store_id}', 'connection': dict(defaults)})])
+    with open(path) as f:
+        listed = json.load(f)
+    stores = OrderedDict()
+    for key, settings in sorted(listed.items(), key=lambda item: int(item[0])):
+        unknown = set(settings) - set(CONNECTION_SETTINGS) - {'name'}
+        if unknown:
+            raise ValueError(f"Store {key} in {path} has unknown settings: {', '.join(sorted(unknown))}")
+        connection = {**defaults, **{k: v for k, v in settings.items() if k in CONNECTION_SETTINGS}}
+        stores[int(key)] = {'name': settings.get('name', f'Store {key}'), 'connection': connection}
+    if store_id not in stores:
+        raise ValueError(f'SUP_STORE_ID {store_id} is not listed in {path}')
+    return stores
+
+
+class StoreRouter:
+    """Connection pools per store, and parallel queries across stores."""
+
+    def __init__(self, stores, home_store, home_pool, make_pool, workers=SCATTER_WORKERS):
+        self.stores = stores
+        self.home_store = home_store
+        self._home_pool = home_pool    # returns the pool every helper in this process uses
+        self._make_pool = make_pool    # connection settings -> pool, for the other stores
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='store-scatter')
+
+    def name(self, store_id):
+        return self.stores[store_id]['name']
+
+    def pool(self, store_id):
+        if store_id not in self.stores:
+            raise ValueError(f'Unknown store: {store_id}')
+        if store_id == self.home_store:
+            return self._home_pool()
+        with self._lock:
+            if store_id not in self._pools:
+                self._pools[store_id] = self._make_pool(self.stores[store_id]['connection'])
+            return self._pools[store_id]
+
+    def connection(self, store_id):
+        return self.pool(store_id).connection()
+
+    def scatter(self, func, *args, store_ids=None, timeout=SCATTER_TIMEOUT):
+        """Runs func(store_id, connect, *args) for every store at once.
+
+        connect() returns a pooled connection to that store's database.
+        Returns ({StoreID: result}, {StoreID: error message}).
+        """
+        store_ids = list(store_ids) if store_ids is not None else list(self.stores)
+        parent = current_span()
+
+        def call(store_id):
+            # Time the queries as part of the caller's page
+            set_current_span(parent)
+            return func(store_id, partial(self.connection, store_id), *args)
+
+        futures = {store_id: self._executor.submit(call, store_id) for store_id in store_ids}
+        wait(futures.values(), timeout)
+        results, errors = OrderedDict(), OrderedDict()
+        for store_id, future in futures.items():
+            if not future.done():
+                future.cancel()
+                errors[store_id] = f'no answer within {timeout}s'
+            elif future.exception() is not None:
+                errors[store_id] = str(future.exception())
+            else:
+                results[store_id] = future.result()
+        return results, errors
+
+    def stats(self):
+        stats = {'stores': len(self.stores), 'home_store': self.home_store}
+        with self._lock:
+            pools = dict(self._pools)
+        for store_id, pool in pools.items():
+            stats[f'store_{store_id}_connects'] = pool.stats()['connects']
+        return stats
+
+
+def _check_store(store_id, connect):
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(STORE_SQL)
+            return cursor.fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the store databases or report across them.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('check', help='confirm every store database is reachable and names its store')
+    report = commands.add_parser('report', help='net profit and low stock of every store')
+    report.add_argument('--from', dest='start', required=True, help='first date (YYYY-MM-DD)')
+    report.add_argument('--to', dest='end', required=True, help='last date (YYYY-MM-DD), inclusive')
+    args = parser.parse_args(argv)
+
+    import database
+
+    router = database.store_router
+    if args.command == 'check':
+        results, errors = router.scatter(_check_store)
+        failed = dict(errors)
+        for store_id, rows in results.items():
+            if [row[0] for row in rows] != [store_id]:
+                failed[store_id] = f'its Store table says {rows or "nothing"}'
+        for store_id in router.stores:
+            database_name = router.stores[store_id]['connection']['database']
+            status = f'FAILED: {failed[store_id]}' if store_id in failed else 'ok'
+            print(f"{store_id:>4}  {router.name(store_id):<24} {database_name:<20} {status}")
+        return 1 if failed else 0
+
+    profits, profit_errors = database.get_net_profit_by_store(args.start, args.end)
+    low_stock, low_stock_errors = database.get_low_stock_by_store()
+    for store_id in router.stores:
+        if store_id in profits:
+            profit = f'net profit ₹{profits[store_id][0]:,.2f}'
+        else:
+            profit = f'net profit unavailable ({profit_errors[store_id]})'
+        if store_id in low_stock:
+            alerts = f'{len(low_stock[store_id])} low-stock products'
+        else:
+            alerts = f'low stock unavailable ({low_stock_errors[store_id]})'
+        print(f"{store_id:>4}  {router.name(store_id):<24} {profit}, {alerts}")
+    print(f"All stores: net profit ₹{sum(profit for profit, _ in profits.values()):,.2f}")
+    return 1 if profit_errors or low_stock_errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,7 +12,8 @@ CREATE TABLE Supplier (
     ContactNumber VARCHAR(100) NOT NULL UNIQUE,
     Category VARCHAR(50) NOT NULL,
     UnitCost DECIMAL(10,2) NOT NULL CHECK (UnitCost >= 0),
-    Quantity INT NOT NULL CHECK (Quantity >= 0)
+    Quantity INT NOT NULL CHECK (Quantity >= 0),
+    UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
 );
 
 -- Warehouse Table
@@ -35,7 +36,8 @@ CREATE TABLE Supermarket (
     Quantity INT NOT NULL CHECK (Quantity >= 0),
     IsNeeded BOOLEAN NOT NULL DEFAULT TRUE,
     ExpiryDate DATE NOT NULL,
-    Perishable BOOLEAN NOT NULL
+    Perishable BOOLEAN NOT NULL,
+    UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
 );
 
 -- Customer Table
@@ -44,20 +46,28 @@ CREATE TABLE Customer (
     Name VARCHAR(100) NOT NULL,
     PhoneNumber VARCHAR(100) NOT NULL UNIQUE,
     Cost DECIMAL(15,2) NOT NULL CHECK (Cost >= 0),
-    PurchaseDateTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    PurchaseDateTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
 );
 
+-- Finance, Transactions and Purchase are partitioned by month for archiver.py
+-- (see migrations/012_partitioning.sql). A partitioned table has no foreign
+-- keys and its primary key includes the date. Every row starts in pfuture;
+-- `python archiver.py partition` splits it into months.
+
 -- Finance Table
 CREATE TABLE Finance (
-    FinanceID INT AUTO_INCREMENT PRIMARY KEY,
+    FinanceID INT AUTO_INCREMENT,
     TransactionType VARCHAR(50) NOT NULL,
     PaymentMethod VARCHAR(50) NOT NULL,
     TransactionDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     Amount DECIMAL(15,2) NOT NULL CHECK (Amount >= 0),
     SupplierID INT NOT NULL,
     CustomerID INT,
-    FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID) ON DELETE CASCADE,
-    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE SET NULL
+    PRIMARY KEY (FinanceID, TransactionDate)
+)
+PARTITION BY RANGE (TO_DAYS(TransactionDate)) (
+    PARTITION pfuture VALUES LESS THAN MAXVALUE
 );
 
 -- Stock Feedback Table
@@ -70,24 +80,104 @@ CREATE TABLE StockFeedback (
 
 -- Transactions Table
 CREATE TABLE Transactions (
-    TransactionID INT AUTO_INCREMENT PRIMARY KEY,
+    TransactionID INT AUTO_INCREMENT,
     SupplierID INT NOT NULL,
     SupplierName VARCHAR(100) NOT NULL,
     TransactionDate DATE NOT NULL,
-    FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID) ON DELETE CASCADE
+    PRIMARY KEY (TransactionID, TransactionDate)
+)
+PARTITION BY RANGE (TO_DAYS(TransactionDate)) (
+    PARTITION pfuture VALUES LESS THAN MAXVALUE
 );
 
--- Purchase Table
+-- Purchase Table; sp_checkout_basket checks the customer and products
 CREATE TABLE Purchase (
+    PurchaseID INT AUTO_INCREMENT,
     CustomerID INT NOT NULL,
     ProductID INT,
     Quantity INT NOT NULL CHECK (Quantity >= 0),
     PurchaseDateTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (CustomerID, ProductID),
-    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE,
-    FOREIGN KEY (ProductID) REFERENCES Supermarket(ProductID) ON DELETE CASCADE
+    PRIMARY KEY (PurchaseID, PurchaseDateTime)
+)
+PARTITION BY RANGE (TO_DAYS(PurchaseDateTime)) (
+    PARTITION pfuture VALUES LESS THAN MAXVALUE
+);
+
+-- Daily Finance totals, kept up to date by the Finance triggers below
+CREATE TABLE FinanceDaily (
+    SummaryDate DATE NOT NULL,
+    TransactionType VARCHAR(50) NOT NULL,
+    PaymentMethod VARCHAR(50) NOT NULL,
+    TotalAmount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SummaryDate, TransactionType, PaymentMethod)
+);
+
+-- Checkouts already recorded, keyed by the client's idempotency key.
+-- FinanceBooked is FALSE until outbox.py has written a deferred checkout's Finance rows.
+CREATE TABLE PurchaseRequest (
+    IdempotencyKey VARCHAR(64) PRIMARY KEY,
+    CustomerID INT NOT NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FinanceBooked BOOLEAN NOT NULL DEFAULT TRUE,
+    INDEX idx_purchase_request_created (CreatedAt)
+);
+
+-- Low-stock and near-expiry alert thresholds per Supplier.Category; categories
+-- not listed use the defaults in alerts.py (10 units, 7 days)
+CREATE TABLE AlertThreshold (
+    Category VARCHAR(50) PRIMARY KEY,
+    LowStockBelow INT NOT NULL CHECK (LowStockBelow >= 0),
+    ExpiryWithinDays INT NOT NULL CHECK (ExpiryWithinDays >= 0)
+);
+
+-- Sales rollups for the Dashboard charts, rewritten by sales_analytics.py
+-- from the Purchase rows of Finance and the Purchase table
+CREATE TABLE SalesHourly (
+    SaleHour DATETIME PRIMARY KEY,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    LineCount INT NOT NULL DEFAULT 0,
+    Baskets INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE SalesDailyProduct (
+    SaleDate DATE NOT NULL,
+    ProductID INT NOT NULL,
+    Revenue DECIMAL(18,2) NOT NULL DEFAULT 0,
+    LineCount INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, ProductID)
 );
 
+-- The store this database holds; each store has a database of its own, and
+-- stores.py maps every StoreID to it
+CREATE TABLE Store (
+    StoreID INT PRIMARY KEY,
+    StoreName VARCHAR(100) NOT NULL
+);
+
+
+-- Search indexes (see migrations/001_search_indexes.sql)
+CREATE INDEX idx_supplier_name ON Supplier (SupplierName);
+CREATE INDEX idx_supplier_category ON Supplier (Category);
+CREATE FULLTEXT INDEX ft_supplier_address ON Supplier (Address);
+CREATE INDEX idx_warehouse_product_name ON Warehouse (ProductName);
+CREATE INDEX idx_supermarket_product_name ON Supermarket (ProductName);
+CREATE INDEX idx_customer_name ON Customer (Name, PhoneNumber);
+CREATE FULLTEXT INDEX ft_stockfeedback_review ON StockFeedback (BadReview);
+CREATE INDEX idx_transactions_supplier_name ON Transactions (SupplierName);
+
+-- Indexes for the hot queries in database.py (see migrations/004_hot_query_indexes.sql)
+CREATE INDEX idx_finance_date ON Finance (TransactionDate, TransactionType, PaymentMethod, Amount);
+
+-- Change detection for refresher.py (see migrations/007_change_tracking.sql)
+CREATE INDEX idx_supplier_updated ON Supplier (UpdatedAt);
+CREATE INDEX idx_supermarket_updated ON Supermarket (UpdatedAt);
+CREATE INDEX idx_customer_updated ON Customer (UpdatedAt);
+
+-- Sales rollup refreshes (see migrations/009_sales_rollups.sql)
+CREATE INDEX idx_purchase_datetime ON Purchase (PurchaseDateTime, ProductID, Quantity);
 
 -- Supplier (15 entries with varied Indian details)
 INSERT INTO Supplier(SupplierID, ProductID, SupplierName, Email, Address, ContactNumber, Category, UnitCost, Quantity) VALUES
@@ -107,6 +197,24 @@ INSERT INTO Supplier(SupplierID, ProductID, SupplierName, Email, Address, Contac
 (14, 114, 'Mithai Magic', 'mithaimagic@gmail.com', 'Hyderabad', '6543209876', 'Sweets', 70.00, 50),
 (15, 115, 'Tandoor Treats', 'tandoortreats@gmail.com', 'Mumbai', '5432109870', 'Baked Goods', 85.00, 60);
 
+-- Store (set StoreID to this store's entry in the stores file)
+INSERT INTO Store(StoreID, StoreName) VALUES (1, 'Main store');
+
+-- AlertThreshold (perishables are flagged earlier, shelf-stable goods later)
+INSERT INTO AlertThreshold(Category, LowStockBelow, ExpiryWithinDays) VALUES
+('Vegetables', 20, 3),
+('Leafy Greens', 20, 2),
+('Organic Veggies', 15, 3),
+('Fruits', 20, 3),
+('Dairy', 25, 2),
+('Seafood', 10, 2),
+('Poultry', 30, 5),
+('Baked Goods', 10, 2),
+('Grains', 25, 30),
+('Spices', 10, 30),
+('Confectionery', 10, 30),
+('Sweets', 10, 7);
+
 
 -- Warehouse (15 entries)
 INSERT INTO Warehouse(ProductID, ProductName, ArrivalDate, ExpiryDate, AvailableStock, GSTNo) VALUES
@@ -244,84 +352,165 @@ BEGIN
     DECLARE supID INT;
     DECLARE amount DECIMAL(15,2);
 
-    SELECT SupplierID, UnitCost * Quantity INTO supID, amount
-    FROM Supplier
-    WHERE ProductID = NEW.ProductID;
+    -- importer.py sets @bulk_import and writes these rows set-based instead
+    IF @bulk_import IS NULL THEN
+        SELECT SupplierID, UnitCost * Quantity INTO supID, amount
+        FROM Supplier
+        WHERE ProductID = NEW.ProductID;
 
-    INSERT INTO Finance(TransactionType, PaymentMethod, Amount, SupplierID)
-    VALUES ('Supply', 'Bank Transfer', amount, supID);
+        INSERT INTO Finance(TransactionType, PaymentMethod, Amount, SupplierID)
+        VALUES ('Supply', 'Bank Transfer', amount, supID);
+    END IF;
 END $$
 
 DELIMITER ;
 
--- Insert into Finance after a customer purchase
+-- Check out a basket for a customer: validates stock, decrements Warehouse and
+-- Supermarket, and writes one Purchase and one Finance row per product, each
+-- as one set-based statement over the basket. p_lines is a JSON array of
+-- [ProductID, Quantity] pairs. Called by create_basket_purchase in database.py;
+-- purchases must go through it, Purchase itself has no triggers.
+-- With p_defer_bookkeeping the Finance and low-stock StockFeedback rows are left
+-- to the write-behind queue in outbox.py, which finds the checkout by its
+-- idempotency key (required then) and books it once FinanceBooked is FALSE.
 DELIMITER $$
 
-CREATE TRIGGER trg_finance_after_purchase_insert
-AFTER INSERT ON Purchase
-FOR EACH ROW
-BEGIN
-    DECLARE cost DECIMAL(15,2);
-    DECLARE supID INT;
+CREATE PROCEDURE sp_checkout_basket(
+    IN p_customer_id INT,
+    IN p_lines JSON,
+    IN p_payment_method VARCHAR(50),
+    IN p_idempotency_key VARCHAR(64),
+    IN p_defer_bookkeeping BOOLEAN
+)
+checkout: BEGIN
+    DECLARE v_lines INT;
+    DECLARE v_product INT DEFAULT NULL;
+    DECLARE v_available INT;
+    DECLARE v_message VARCHAR(128);
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @defer_bookkeeping = NULL;
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_defer_bookkeeping AND p_idempotency_key IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Deferred bookkeeping needs an idempotency key';
+    END IF;
 
-    SET cost = NEW.Quantity * 50.00; -- Assume ₹50/unit
-    SELECT SupplierID INTO supID FROM Supplier WHERE ProductID = NEW.ProductID;
+    DROP TEMPORARY TABLE IF EXISTS checkout_lines;
+    CREATE TEMPORARY TABLE checkout_lines (
+        ProductID INT PRIMARY KEY,
+        Quantity INT NOT NULL,
+        SupplierID INT
+    );
+    INSERT INTO checkout_lines (ProductID, Quantity)
+    SELECT ProductID, SUM(Quantity)
+    FROM JSON_TABLE(p_lines, '$[*]' COLUMNS (ProductID INT PATH '$[0]', Quantity INT PATH '$[1]')) AS line
+    GROUP BY ProductID;
+    SET v_lines = ROW_COUNT();
+
+    IF v_lines = 0 OR EXISTS (SELECT 1 FROM checkout_lines WHERE Quantity <= 0 OR ProductID IS NULL) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Basket is empty or has a line without a positive quantity';
+    END IF;
 
-    INSERT INTO Finance(TransactionType, PaymentMethod, Amount, SupplierID, CustomerID)
-    VALUES ('Purchase', 'Cash', cost, supID, NEW.CustomerID);
-END $$
+    -- Purchase is partitioned and has no foreign key to check this
+    IF NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = p_customer_id) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Unknown customer';
+    END IF;
 
-DELIMITER ;
+    START TRANSACTION;
+
+    -- A key that is already recorded means this basket was checked out
+    IF p_idempotency_key IS NOT NULL THEN
+        INSERT IGNORE INTO PurchaseRequest (IdempotencyKey, CustomerID, FinanceBooked)
+        VALUES (p_idempotency_key, p_customer_id, NOT COALESCE(p_defer_bookkeeping, FALSE));
+        IF ROW_COUNT() = 0 THEN
+            ROLLBACK;
+            SELECT 'replayed' AS Outcome;
+            LEAVE checkout;
+        END IF;
+    END IF;
 
--- Insert into Transactions whenever new Warehouse stock is added
-DELIMITER $$
+    -- Locking reads see the current stock, not the transaction snapshot
+    SELECT l.ProductID, COALESCE(s.Quantity, 0) INTO v_product, v_available
+    FROM checkout_lines l
+    LEFT JOIN Supermarket s ON s.ProductID = l.ProductID
+    WHERE s.ProductID IS NULL OR s.Quantity < l.Quantity
+    ORDER BY l.ProductID
+    LIMIT 1
+    FOR UPDATE;
+
+    IF v_product IS NULL THEN
+        SELECT l.ProductID, COALESCE(w.AvailableStock, 0) INTO v_product, v_available
+        FROM checkout_lines l
+        LEFT JOIN Warehouse w ON w.ProductID = l.ProductID
+        WHERE w.ProductID IS NULL OR w.AvailableStock < l.Quantity
+        ORDER BY l.ProductID
+        LIMIT 1
+        FOR UPDATE;
+    END IF;
 
-CREATE TRIGGER trg_transaction_after_warehouse_insert
-AFTER INSERT ON Warehouse
-FOR EACH ROW
-BEGIN
-    DECLARE supID INT;
-    DECLARE supName VARCHAR(100);
+    IF v_product IS NOT NULL THEN
+        SET v_message = CONCAT('Not enough stock (product ', v_product, ': ', v_available, ' available)');
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
 
-    SELECT SupplierID, SupplierName INTO supID, supName
-    FROM Supplier
-    WHERE ProductID = NEW.ProductID;
+    UPDATE checkout_lines l
+    JOIN Supplier p ON p.ProductID = l.ProductID
+    SET l.SupplierID = p.SupplierID;
 
-    INSERT INTO Transactions(SupplierID, SupplierName, TransactionDate)
-    VALUES (supID, supName, CURDATE());
-END $$
+    SELECT ProductID INTO v_product FROM checkout_lines WHERE SupplierID IS NULL LIMIT 1;
+    IF v_product IS NOT NULL THEN
+        SET v_message = CONCAT('No supplier for product ', v_product);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
 
-DELIMITER ;
+    UPDATE Supermarket s
+    JOIN checkout_lines l ON l.ProductID = s.ProductID
+    SET s.Quantity = s.Quantity - l.Quantity;
 
--- Update AvailableStock in Warehouse when a purchase happens
-DELIMITER $$
+    -- trg_auto_feedback_on_low_stock leaves deferred checkouts to outbox.py
+    SET @defer_bookkeeping = IF(p_defer_bookkeeping, TRUE, NULL);
+    UPDATE Warehouse w
+    JOIN checkout_lines l ON l.ProductID = w.ProductID
+    SET w.AvailableStock = w.AvailableStock - l.Quantity;
+    SET @defer_bookkeeping = NULL;
 
-CREATE TRIGGER trg_reduce_stock_after_purchase
-AFTER INSERT ON Purchase
-FOR EACH ROW
-BEGIN
-    UPDATE Warehouse
-    SET AvailableStock = AvailableStock - NEW.Quantity
-    WHERE ProductID = NEW.ProductID;
+    INSERT INTO Purchase (CustomerID, ProductID, Quantity)
+    SELECT p_customer_id, ProductID, Quantity FROM checkout_lines;
+
+    IF NOT COALESCE(p_defer_bookkeeping, FALSE) THEN
+        INSERT INTO Finance (TransactionType, PaymentMethod, Amount, SupplierID, CustomerID)
+        SELECT 'Purchase', p_payment_method, Quantity * 50.00, SupplierID, p_customer_id  -- Assume ₹50/unit
+        FROM checkout_lines;
+    END IF;
+
+    COMMIT;
+    DROP TEMPORARY TABLE checkout_lines;
+    SELECT 'ok' AS Outcome;
 END $$
 
 DELIMITER ;
 
--- Validate stock availability BEFORE purchase
+-- Insert into Transactions whenever new Warehouse stock is added
 DELIMITER $$
 
-CREATE TRIGGER trg_check_stock_before_purchase
-BEFORE INSERT ON Purchase
+CREATE TRIGGER trg_transaction_after_warehouse_insert
+AFTER INSERT ON Warehouse
 FOR EACH ROW
 BEGIN
-    DECLARE available INT;
+    DECLARE supID INT;
+    DECLARE supName VARCHAR(100);
 
-    SELECT AvailableStock INTO available
-    FROM Warehouse
-    WHERE ProductID = NEW.ProductID;
+    -- importer.py sets @bulk_import and writes these rows set-based instead
+    IF @bulk_import IS NULL THEN
+        SELECT SupplierID, SupplierName INTO supID, supName
+        FROM Supplier
+        WHERE ProductID = NEW.ProductID;
 
-    IF available IS NULL OR available < NEW.Quantity THEN
-        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough stock available for the requested purchase';
+        INSERT INTO Transactions(SupplierID, SupplierName, TransactionDate)
+        VALUES (supID, supName, CURDATE());
     END IF;
 END $$
 
@@ -341,14 +530,16 @@ END $$
 
 DELIMITER ;
 
--- Suggest replenishment in StockFeedback if stock goes below a threshold
+-- Suggest replenishment in StockFeedback if stock goes below a threshold.
+-- Checkouts with deferred bookkeeping set @defer_bookkeeping; outbox.py
+-- writes their suggestions.
 DELIMITER $$
 
 CREATE TRIGGER trg_auto_feedback_on_low_stock
 AFTER UPDATE ON Warehouse
 FOR EACH ROW
 BEGIN
-    IF NEW.AvailableStock < 20 THEN
+    IF NEW.AvailableStock < 20 AND @defer_bookkeeping IS NULL THEN
         INSERT INTO StockFeedback(ProductID, QuantityNeeded, BadReview)
         VALUES (NEW.ProductID, 100, 'Stock too low — needs urgent restock')
         ON DUPLICATE KEY UPDATE QuantityNeeded = 100, BadReview = 'Stock too low — needs urgent restock';
@@ -357,32 +548,70 @@ END $$
 
 DELIMITER ;
 
--- Set IsNeeded to TRUE in Supermarket if stock falls below threshold
+-- Set IsNeeded to TRUE in Supermarket if stock falls below threshold.
+-- A trigger cannot UPDATE its own table, so the flag is set on the new row.
 DELIMITER $$
 
 CREATE TRIGGER trg_update_isneeded_on_low_stock
-AFTER UPDATE ON Supermarket
+BEFORE UPDATE ON Supermarket
 FOR EACH ROW
 BEGIN
     IF NEW.Quantity < 30 THEN
-        UPDATE Supermarket
-        SET IsNeeded = TRUE
-        WHERE ProductID = NEW.ProductID;
+        SET NEW.IsNeeded = TRUE;
     END IF;
 END $$
 
 DELIMITER ;
 
--- Trigger to update Supermarket quantity when any product is purchased
+-- Keep FinanceDaily in step with Finance
 DELIMITER $$
 
-CREATE TRIGGER trg_update_product_quantity
-AFTER INSERT ON Purchase
+CREATE TRIGGER trg_finance_daily_after_insert
+AFTER INSERT ON Finance
 FOR EACH ROW
 BEGIN
-    UPDATE Supermarket
-    SET Quantity = Quantity - NEW.Quantity
-    WHERE ProductID = NEW.ProductID;
+    INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+    VALUES (DATE(NEW.TransactionDate), NEW.TransactionType, NEW.PaymentMethod, NEW.Amount, 1)
+    ON DUPLICATE KEY UPDATE
+        TotalAmount = TotalAmount + NEW.Amount,
+        TransactionCount = TransactionCount + 1;
+END $$
+
+CREATE TRIGGER trg_finance_daily_after_update
+AFTER UPDATE ON Finance
+FOR EACH ROW
+BEGIN
+    UPDATE FinanceDaily
+    SET TotalAmount = TotalAmount - OLD.Amount,
+        TransactionCount = TransactionCount - 1
+    WHERE SummaryDate = DATE(OLD.TransactionDate)
+      AND TransactionType = OLD.TransactionType
+      AND PaymentMethod = OLD.PaymentMethod;
+
+    INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+    VALUES (DATE(NEW.TransactionDate), NEW.TransactionType, NEW.PaymentMethod, NEW.Amount, 1)
+    ON DUPLICATE KEY UPDATE
+        TotalAmount = TotalAmount + NEW.Amount,
+        TransactionCount = TransactionCount + 1;
+END $$
+
+CREATE TRIGGER trg_finance_daily_after_delete
+AFTER DELETE ON Finance
+FOR EACH ROW
+BEGIN
+    UPDATE FinanceDaily
+    SET TotalAmount = TotalAmount - OLD.Amount,
+        TransactionCount = TransactionCount - 1
+    WHERE SummaryDate = DATE(OLD.TransactionDate)
+      AND TransactionType = OLD.TransactionType
+      AND PaymentMethod = OLD.PaymentMethod;
 END $$
 
 DELIMITER ;
+
+-- Backfill FinanceDaily from existing Finance rows
+DELETE FROM FinanceDaily;
+INSERT INTO FinanceDaily(SummaryDate, TransactionType, PaymentMethod, TotalAmount, TransactionCount)
+SELECT DATE(TransactionDate), TransactionType, PaymentMethod, SUM(Amount), COUNT(*)
+FROM Finance
+GROUP BY DATE(TransactionDate), TransactionType, PaymentMethod;
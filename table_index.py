@@ -0,0 +1,118 @@
+"""Base class for in-memory indexes that follow a table through UpdatedAt.
+
+An index loads its table once, then reads only the rows whose UpdatedAt moved
+since the last sync. Writes in this process invalidate the table in the query
+cache, which makes the next read sync at once; writes from other processes
+are picked up every sync_interval seconds, and everything is reloaded every
+max_age seconds so deleted rows drop out. Subclasses supply the SQL and the
+data structures; every row they load ends with its UpdatedAt.
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+INDEX_SYNC_INTERVAL = 5          # seconds between syncs when nothing was invalidated
+INDEX_MAX_AGE = 600              # reload everything at least this often, e.g. for deleted rows
+SYNC_OVERLAP = timedelta(seconds=5)  # re-read recent rows committed after a later UpdatedAt
+
+
+class TableIndex:
+    name = None             # used in error messages
+    table = None            # invalidating this table triggers a sync
+    reload_tables = set()   # invalidating these triggers a full reload
+    changes_sql = None      # the load query filtered on UpdatedAt >= %s
+
+    def __init__(self, connect, sync_interval=INDEX_SYNC_INTERVAL, max_age=INDEX_MAX_AGE):
+        self._connect = connect
+        self.sync_interval = sync_interval
+        self.max_age = max_age
+        self._high_water = None  # latest UpdatedAt applied
+        self._loaded_at = None
+        self._synced_at = None
+        self._reload = True
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stats = {'reloads': 0, 'syncs': 0, 'rows_synced': 0, 'errors': 0}
+
+    # Called by QueryCache.invalidate(); must not block the writer
+    def on_invalidate(self, tags):
+        tables = {tag.split('.', 1)[0] for tag in tags}
+        if not tags or tables & self.reload_tables:
+            self._reload = True
+        elif self.table in tables:
+            self._dirty = True
+
+    def warm(self):
+        """Loads or syncs the index now, e.g. from a background thread."""
+        with self._lock:
+            self._ensure_fresh()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        try:
+            if self._reload or self._loaded_at is None or now - self._loaded_at > self.max_age:
+                self._load_all()
+            elif self._dirty or now - self._synced_at > self.sync_interval:
+                self._sync()
+        except Exception as e:
+            # Serve the last known state rather than nothing
+            self._stats['errors'] += 1
+            print(f"Error refreshing {self.name}: {e}")
+            if self._loaded_at is None:
+                raise
+
+    def _load_all(self):
+        self._reload = self._dirty = False
+        with self._connect() as conn:
+            with conn.cursor() as cursor:
+                rows = self._load(cursor)
+        self._reset()
+        self._high_water = None
+        for row in rows:
+            self._track(row)
+            self._apply(row[:-1])
+        self._finish_load()
+        self._loaded_at = self._synced_at = time.monotonic()
+        self._stats['reloads'] += 1
+
+    def _sync(self):
+        self._dirty = False
+        since = self._high_water - SYNC_OVERLAP if self._high_water is not None else date.min
+        with self._connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(self.changes_sql, (since,))
+                rows = cursor.fetchall()
+        for row in rows:
+            self._track(row)
+            self._apply(row[:-1], keep_sorted=True)
+        self._synced_at = time.monotonic()
+        self._stats['syncs'] += 1
+        self._stats['rows_synced'] += len(rows)
+
+    def _track(self, row):
+        updated_at = row[-1]
+        if updated_at is not None and (self._high_water is None or updated_at > self._high_water):
+            self._high_water = updated_at
+
+    def stats(self):
+        return {
+            'seconds_since_sync': round(time.monotonic() - self._synced_at, 1) if self._synced_at else None,
+            **self._stats,
+        }
+
+    # Subclass hooks
+
+    def _load(self, cursor):
+        """Runs the full load; returns the rows."""
+        raise NotImplementedError
+
+    def _reset(self):
+        """Empties the data structures before a full load."""
+        raise NotImplementedError
+
+    def _apply(self, row, keep_sorted=False):
+        """Adds or replaces one row; sorted lists may be sorted once in _finish_load instead."""
+        raise NotImplementedError
+
+    def _finish_load(self):
+        pass
@@ -0,0 +1,31 @@
+import io
+
+import pandas as pd
+
+from importer import _validate
+from schema_cache import TableSchema
+
+
+def _customer_schema():
+    schema = TableSchema('Customer')
+    for column, data_type, column_type, nullable in (
+        ('Name', 'varchar', 'varchar(100)', False),
+        ('PhoneNumber', 'varchar', 'varchar(15)', True),
+        ('Cost', 'decimal', 'decimal(10,2)', True),
+    ):
+        schema.columns.append(column)
+        schema.types[column] = data_type
+        schema.column_types[column] = column_type
+        schema.nullable[column] = nullable
+        schema.has_default[column] = False
+    schema.max_length = {'Name': 100, 'PhoneNumber': 15}
+    return schema
+
+
+def test_text_is_stripped_and_blank_text_is_missing():
+    chunk = pd.read_csv(io.StringIO('Name,PhoneNumber,Cost\n  Amit  , 9000000001 ,10\n   ,9000000002,5\n'),
+                        dtype={'PhoneNumber': str})
+    valid, rejected = _validate(chunk, _customer_schema(), ['Name', 'PhoneNumber', 'Cost'], 'Customer')
+    assert valid['Name'].tolist() == ['Amit']
+    assert valid['PhoneNumber'].tolist() == ['9000000001']
+    assert rejected['Reason'].tolist() == ['Name: required']
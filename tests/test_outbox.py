@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+import outbox
+from outbox import Bookkeeper, Outbox
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return Outbox(str(tmp_path / 'outbox.sqlite3'), pending_timeout=60)
+
+
+def _keys(events):
+    return [payload['key'] for _, _, payload, _ in events]
+
+
+def test_take_returns_released_events_in_queue_order(queue):
+    first = queue.reserve('checkout', {'key': 'a'})
+    second = queue.reserve('checkout', {'key': 'b'})
+    third = queue.reserve('checkout', {'key': 'c'})
+    assert queue.take() == []
+    assert queue.release(third)
+    assert queue.release(first)
+    assert _keys(queue.take()) == ['a', 'c']
+    queue.discard(second)
+    assert queue.counts() == {'pending': 0, 'ready': 2, 'parked': 0}
+
+
+def test_pending_event_is_taken_over_after_the_timeout(queue, monkeypatch):
+    event_id = queue.reserve('checkout', {'key': 'a'})
+    now = time.time()
+    monkeypatch.setattr(outbox.time, 'time', lambda: now + 61)
+    assert _keys(queue.take()) == ['a']
+    queue.done([event_id])
+    # The checkout reports back late; the caller must queue its event again
+    assert not queue.release(event_id)
+
+
+def test_late_release_of_an_undrained_event_reports_it(queue, monkeypatch):
+    event_id = queue.reserve('checkout', {'key': 'a'})
+    now = time.time()
+    monkeypatch.setattr(outbox.time, 'time', lambda: now + 61)
+    queue.take()
+    assert not queue.release(event_id)
+    assert queue.counts()['ready'] == 1
+
+
+def test_parked_event_is_not_taken(queue):
+    first = queue.reserve('checkout', {'key': 'a'})
+    queue.release(first)
+    queue.release(queue.reserve('checkout', {'key': 'b'}))
+    queue.failed(first, 'lock wait timeout')
+    events = queue.take()
+    assert _keys(events) == ['a', 'b'] and events[0][3] == 1
+    queue.failed(first, 'lock wait timeout', park=True)
+    assert _keys(queue.take()) == ['b']
+    assert queue.counts() == {'pending': 0, 'ready': 1, 'parked': 1}
+
+
+def _bookkeeper(queue, failing):
+    bookkeeper = Bookkeeper(queue, connect=None)
+    applied = []
+
+    def apply(payloads):
+        if any(payload['key'] in failing for payload in payloads):
+            raise RuntimeError('lock wait timeout')
+        applied.extend(payload['key'] for payload in payloads)
+    bookkeeper._apply = apply
+    return bookkeeper, applied
+
+
+def test_failing_event_holds_up_later_ones_until_parked(queue, capsys):
+    for key in 'abc':
+        queue.release(queue.reserve('checkout', {'key': key}))
+    bookkeeper, applied = _bookkeeper(queue, failing={'b'})
+    assert bookkeeper.drain() == 1
+    assert applied == ['a']
+    assert bookkeeper._backoff > 0
+    drains = 1
+    while not queue.counts()['parked']:
+        bookkeeper.drain()
+        drains += 1
+    assert drains == outbox.MAX_ATTEMPTS
+    assert applied == ['a', 'c']
+    assert queue.counts() == {'pending': 0, 'ready': 0, 'parked': 1}
+    # Nothing is held up any more, so the next drain does not wait
+    assert bookkeeper._backoff == 0
@@ -0,0 +1,40 @@
+from query_cache import QueryCache
+
+
+def test_write_to_another_table_keeps_read_in_flight():
+    cache = QueryCache()
+    generation = cache.generation()
+    cache.invalidate('Customer')
+    cache.set('suppliers', [(1, 'Acme')], ('Supplier',), generation=generation)
+    assert cache.get('suppliers') == (True, [(1, 'Acme')])
+
+
+def test_write_to_read_table_drops_read_in_flight():
+    cache = QueryCache()
+    generation = cache.generation()
+    cache.invalidate('Supplier')
+    cache.set('suppliers', [(1, 'Acme')], ('Supplier',), generation=generation)
+    assert cache.get('suppliers') == (False, None)
+
+
+def test_column_and_table_invalidations_follow_tag_matching():
+    cache = QueryCache()
+    generation = cache.generation()
+    cache.invalidate('Supermarket.Quantity')
+    cache.set('needed', [(1,)], ('Supermarket.IsNeeded',), generation=generation)
+    assert cache.get('needed') == (True, [(1,)])
+    cache.set('stock', [(1,)], ('Supermarket',), generation=generation)
+    assert cache.get('stock') == (False, None)
+
+    generation = cache.generation()
+    cache.invalidate('Supermarket')
+    cache.set('needed', [(2,)], ('Supermarket.IsNeeded',), generation=generation)
+    assert cache.get('needed') == (False, None)
+
+
+def test_clear_drops_read_in_flight():
+    cache = QueryCache()
+    generation = cache.generation()
+    cache.clear()
+    cache.set('suppliers', [(1, 'Acme')], ('Supplier',), generation=generation)
+    assert cache.get('suppliers') == (False, None)
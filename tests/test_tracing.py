@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from tracing import Tracer, fingerprint
+
+
+def test_fingerprint_folds_value_lists():
+    sql = "SELECT * FROM Customer WHERE CustomerID IN (1, 2, 3) AND Name = %s"
+    assert fingerprint(sql) == "SELECT * FROM Customer WHERE CustomerID IN (?) AND Name = %s"
+    sql = "INSERT INTO Finance (A, B) VALUES (%s, 'it\\'s'), (-1.5e3, NULL)"
+    assert fingerprint(sql) == "INSERT INTO Finance (A, B) VALUES (?), ..."
+
+
+def test_fingerprint_of_large_float_insert_is_fast():
+    rows = ', '.join(f'({i}, {i * 1.25}, {-i / 3:.6f}, NULL)' for i in range(5000))
+    sql = f'INSERT INTO Purchase (A, B, C, D) VALUES {rows}'
+    started = time.perf_counter()
+    assert fingerprint(sql) == 'INSERT INTO Purchase (A, B, C, D) VALUES (?), ...'
+    # A list of numbers that never closes used to backtrack exponentially
+    fingerprint('SELECT (' + '1.1' * 40 + ' x')
+    fingerprint('SELECT (' + '1.5, ' * 5000 + ' x')
+    assert time.perf_counter() - started < 1.0
+
+
+def test_traced_finishes_the_span_on_base_exceptions():
+    tracer = Tracer()
+
+    @tracer.traced
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        interrupted()
+    assert tracer.totals()[('helper', 'interrupted')]['count'] == 1
+
+
+def test_traced_coroutine_finishes_the_span_when_cancelled():
+    tracer = Tracer()
+
+    @tracer.traced
+    async def waiting():
+        await asyncio.sleep(60)
+
+    async def cancel():
+        task = asyncio.ensure_future(waiting())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert tracer.totals()[('helper', 'waiting')]['count'] == 1
@@ -0,0 +1,320 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pymysql
+
+SLOW_QUERY_MS = float(os.environ.get('SUP_SLOW_QUERY_MS', 200))
+RECENT_SPANS = 500
+SLOW_LOG_SIZE = 200
+MAX_SQL_LENGTH = 1000
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('kind', 'name', 'parent', 'started_at', 'start', 'duration', 'rows', 'bytes',
+                 'sql', 'params', 'error')
+
+    def __init__(self, kind, name, parent=None, sql=None, params=None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.rows = None
+        self.bytes = None
+        self.sql = sql
+        self.params = params
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'parent': self.parent.name if self.parent else None,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='milliseconds'),
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'sql': self.sql,
+            'params': _printable(self.params),
+            'error': self.error,
+        }
+
+
+def _printable(value):
+    if isinstance(value, (list, tuple)):
+        return [_printable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _printable(v) for k, v in value.items()}
+    if isinstance(value, (date, datetime, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        return f'<{len(value)} bytes>'
+    return value
+
+
+class Tracer:
+    """Collects timings for page sections, data helpers and SQL statements.
+
+    Finished spans are folded into per-name totals, the latest ones are kept
+    in a ring buffer, and SQL statements slower than slow_query_ms are kept
+    with their parameters in a separate slow-query ring buffer.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, recent=RECENT_SPANS, slow_log_size=SLOW_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self._recent = deque(maxlen=recent)
+        self._slow = deque(maxlen=slow_log_size)
+        self._totals = {}  # (kind, name) -> counters
+        self._lock = threading.Lock()
+
+    def start(self, kind, name, sql=None, params=None, root=False):
+        parent = None if root else _current_span.get()
+        span = Span(kind, name, parent, sql, params)
+        span_token = _current_span.set(span)
+        return span, span_token
+
+    def finish(self, span, token=None, rows=None, nbytes=None, error=None):
+        span.duration = time.perf_counter() - span.start
+        if rows is not None:
+            span.rows = rows
+        if nbytes is not None:
+            span.bytes = nbytes
+        if error is not None:
+            span.error = f'{type(error).__name__}: {error}'
+        # Helpers and pages report the rows and bytes of the statements they ran
+        parent = span.parent
+        if parent is not None:
+            if span.rows is not None:
+                parent.rows = (parent.rows or 0) + span.rows
+            if span.bytes is not None:
+                parent.bytes = (parent.bytes or 0) + span.bytes
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Finished from a different context than it was started in
+                _current_span.set(None)
+        self._record(span)
+
+    def _record(self, span):
+        with self._lock:
+            totals = self._totals.get((span.kind, span.name))
+            if totals is None:
+                totals = self._totals[(span.kind, span.name)] = {
+                    'count': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0,
+                }
+            totals['count'] += 1
+            totals['seconds'] += span.duration
+            totals['max_seconds'] = max(totals['max_seconds'], span.duration)
+            totals['rows'] += span.rows or 0
+            totals['bytes'] += span.bytes or 0
+            if span.error:
+                totals['errors'] += 1
+            self._recent.append(span)
+            if span.kind == 'query' and span.duration * 1000 >= self.slow_query_ms:
+                self._slow.append(span)
+
+    @contextmanager
+    def span(self, kind, name, root=False):
+        span, token = self.start(kind, name, root=root)
+        error = None
+        try:
+            yield span
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also when a BaseException such as Streamlit's rerun ends the block early
+            self.finish(span, token, error=error)
+
+    def traced(self, func):
+        """Decorator recording a span for every call of a data helper (plain or async)."""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                span, token = self.start('helper', func.__name__)
+                error = None
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    # Also when the task is cancelled
+                    self.finish(span, token, error=error)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                span, token = self.start('helper', func.__name__)
+                error = None
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    self.finish(span, token, error=error)
+        return wrapper
+
+    def totals(self):
+        with self._lock:
+            return {key: dict(value) for key, value in self._totals.items()}
+
+    def recent(self, kind=None):
+        with self._lock:
+            spans = list(self._recent)
+        return [s.to_dict() for s in spans if kind is None or s.kind == kind]
+
+    def slow_queries(self):
+        with self._lock:
+            spans = list(self._slow)
+        return sorted((s.to_dict() for s in spans), key=lambda s: s['duration_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._slow.clear()
+            self._totals.clear()
+
+    def prometheus_text(self, extra_gauges=None):
+        lines = []
+        totals = self.totals()
+        metrics = (
+            ('sup_span_seconds_total', 'seconds', 'counter'),
+            ('sup_span_count_total', 'count', 'counter'),
+            ('sup_span_errors_total', 'errors', 'counter'),
+            ('sup_span_rows_total', 'rows', 'counter'),
+            ('sup_span_bytes_total', 'bytes', 'counter'),
+            ('sup_span_max_seconds', 'max_seconds', 'gauge'),
+        )
+        for metric, field, metric_type in metrics:
+            lines.append(f'# TYPE {metric} {metric_type}')
+            for (kind, name), values in sorted(totals.items()):
+                lines.append(f'{metric}{{kind="{kind}",name="{_label(name)}"}} {values[field]}')
+        # Flat numeric stats such as cache_stats() and pool_stats()
+        for group, values in (extra_gauges or {}).items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE sup_{group}_{key} gauge')
+                    lines.append(f'sup_{group}_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def json_lines(self, kind=None):
+        return ''.join(json.dumps(span, default=str) + '\n' for span in self.recent(kind))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+_WHITESPACE = re.compile(r'\s+')
+# Each value can be matched only one way, so a list that does not match fails in linear time
+_VALUE = r"(?:%s|'(?:[^'\\]|\\.)*'|-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b|NULL\b)"
+_VALUE_LIST = re.compile(rf'\(\s*{_VALUE}(?:\s*,\s*{_VALUE})*\s*\)', re.I)
+_REPEATED_LISTS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+
+def fingerprint(sql):
+    """Statement text with literals and value lists folded, used to group queries."""
+    text = _WHITESPACE.sub(' ', sql).strip()
+    text = _VALUE_LIST.sub('(?)', text)
+    text = _REPEATED_LISTS.sub('(?), ...', text)
+    return text[:200]
+
+
+def _estimate_bytes(rows):
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            else:
+                total += 8
+    return total
+
+
+tracer = Tracer()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_current_span(span):
+    """Makes span the parent of spans started from here, e.g. in another thread."""
+    _current_span.set(span)
+
+
+def start_query(query, args=None):
+    return tracer.start('query', fingerprint(query), sql=query[:MAX_SQL_LENGTH], params=args)
+
+
+def finish_query(span, token, rows, rowcount=0):
+    rows = rows or ()
+    tracer.finish(span, token, rows=len(rows) if rows else max(rowcount, 0), nbytes=_estimate_bytes(rows))
+
+
+class TracedCursor(pymysql.cursors.Cursor):
+    """Cursor that records a span for every statement it runs."""
+
+    def execute(self, query, args=None):
+        span, token = start_query(query, args)
+        try:
+            result = super().execute(query, args)
+        except Exception as e:
+            tracer.finish(span, token, error=e)
+            raise
+        finish_query(span, token, self._rows, self.rowcount)
+        return result
+
+
+class TracedSSCursor(pymysql.cursors.SSCursor):
+    """Unbuffered cursor; its span times the statement until the first row is ready."""
+
+    def execute(self, query, args=None):
+        span, token = start_query(query, args)
+        try:
+            result = super().execute(query, args)
+        except Exception as e:
+            tracer.finish(span, token, error=e)
+            raise
+        finish_query(span, token, None)
+        return result
+
+
+_exporter = None
+
+
+def start_file_exporter(path, interval=15, extra_gauges=None):
+    """Rewrites path with Prometheus text every interval seconds (node_exporter textfile style)."""
+    global _exporter
+    if _exporter is not None:
+        return _exporter
+
+    def export():
+        while True:
+            text = tracer.prometheus_text(extra_gauges() if extra_gauges else None)
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w') as f:
+                f.write(text)
+            os.replace(tmp, path)
+            time.sleep(interval)
+
+    _exporter = threading.Thread(target=export, name='metrics-exporter', daemon=True)
+    _exporter.start()
+    return _exporter